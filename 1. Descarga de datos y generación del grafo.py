@@ -5,9 +5,11 @@ from modules.decoder import Decoder
 from modules.scrapper import Scrapper
 from modules.crawler import Crawler
 from modules.graphgen import build_graph
+from modules.instrumentation import stage, timed
 from time import perf_counter
 import os
 
+@timed('download_file')
 def download_file(path):
     # Tamaño del chunk para actualizar la barra de progreso (1kB)
     chunk_size = 1024
@@ -61,12 +63,14 @@ if __name__ == "__main__":
     authors_data = {}
 
     pbar = tqdm(total=len(ids), desc="Descargando datos de los investigadores")
-    for id in ids:
-        authors, props = crawler.crawl(id)
-        # Si al descargar los datos de un autor el servidor devuelve HTTP404 (Not found) se descarta ese autor
-        if props is not None:
-            authors_data[id] = props
-        pbar.update()
+    with stage('crawler.crawl') as st:
+        for id in ids:
+            authors, props = crawler.crawl(id)
+            # Si al descargar los datos de un autor el servidor devuelve HTTP404 (Not found) se descarta ese autor
+            if props is not None:
+                authors_data[id] = props
+            pbar.update()
+            st.add()
     pbar.close()
 
     # Generación del grafo
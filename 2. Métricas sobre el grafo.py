@@ -1,9 +1,11 @@
 import numpy as np, networkx as nx
 import os
-from tqdm import tqdm as tqdm
 import pandas as pd
 from networkx.algorithms import average_clustering, centrality
-from time import perf_counter
+from modules.instrumentation import timed
+from modules.compact import CompactGraph
+from modules import clustering, hyperanf
+from modules import centrality as spectral
 
 def build_nxGraph(graph):
     '''
@@ -40,14 +42,20 @@ def build_nxGraph(graph):
 
 
 
-def calculate_metrics(network):
+@timed('metrics.calculate_metrics', items=lambda metrics: metrics['n'])
+def calculate_metrics(network, compact=None):
     '''
     Calcula las métricas más importantes sobre la red y las devuelve en forma de diccionario
 
     Parameters
     ----------
         network : nx.Graph
-            Red de la que se quiere calcular las metricas 
+            Red de la que se quiere calcular las metricas
+
+        compact : CompactGraph
+            Misma red en formato compacto. Si se indica, el coeficiente de clustering se obtiene de los triángulos
+            almacenados en el grafo compacto en lugar de volver a contarlos, y se añaden los grados de separación
+            (distancia media y diámetro efectivo aproximados con HyperANF)
     
     Returns
     -------
@@ -85,7 +93,13 @@ def calculate_metrics(network):
     metrics['max_degree_p'] = max(degree_distribution, key=lambda degree_p: degree_p[1])
 
     # Coeficiente de clustering promedio
-    metrics['clustering_coefficient'] = average_clustering(network)
+    metrics['clustering_coefficient'] = clustering.average_clustering(compact) if compact is not None else average_clustering(network)
+
+    # Grados de separación: distancia media y diámetro efectivo (aproximados, sin una búsqueda en anchura por autor)
+    if compact is not None:
+        separation = hyperanf.separation(compact, runs=3)
+        metrics['average_distance'] = separation['average_distance']
+        metrics['effective_diameter'] = separation['effective_diameter']
 
     # Nodo con mayor centralidad promedio
     metrics['max_closeness_centrality'] = getprops(max(centrality.closeness_centrality(network).items(), key=lambda pair: pair[1]))
@@ -96,17 +110,17 @@ if __name__ == "__main__":
     # Directorio actual
     current_path = os.path.dirname(os.path.realpath(__file__))
 
-    # Directorio de datos
-    data_path = current_path + '\\data'
+    # Directorio de datos (GRAPHMINING_DATA si se ejecuta desde graphmining.py con --data)
+    data_path = os.environ.get('GRAPHMINING_DATA') or os.path.join(current_path, 'data')
 
-    # Directorio de resultados (aquí se exportarán los CSV)
-    results_path = current_path + '\\results'
+    # Directorio de resultados, aquí se exportarán los CSV (GRAPHMINING_RESULTS si se ejecuta desde graphmining.py con --results)
+    results_path = os.environ.get('GRAPHMINING_RESULTS') or os.path.join(current_path, 'results')
     if not os.path.exists(results_path):
         os.mkdir(results_path)
 
     # Carga del grafo
     try:
-        graph = np.load(data_path + '\\colab_graph.npy', allow_pickle=True).item()
+        graph = np.load(os.path.join(data_path, 'colab_graph.npy'), allow_pickle=True).item()
     except FileNotFoundError:
         print("No se ha encontrado el grafo de colaboración. Por favor, ejecute los scripts anteriores")
 
@@ -122,24 +136,41 @@ if __name__ == "__main__":
         sum([nx.closeness_centrality(network, auth) for auth in authors])/len(authors),
     ]for degree, authors in degree.items() if len(authors) > 0], columns=['degree', 'closeness'])
 
-    with open(results_path + '\\histogram_closeness.csv', 'wt') as f:
+    with open(os.path.join(results_path, 'histogram_closeness.csv'), 'wt') as f:
         dff.to_csv(f, line_terminator='\n', index=False)
-    '''
+
+    # Centralidades espectrales (vector propio, Katz y HITS) sobre la matriz de adyacencia ponderada, construida una vez
+    compact = CompactGraph.from_graph(graph)
+    for measure, values in spectral.centralities(compact).items():
+        df_centrality = pd.DataFrame([
+                    [author[10:], name, affiliation or None, value, 'dblp.org/pid/' + author[10:]]
+                for author, name, affiliation, value in sorted(zip(compact.ids.tolist(), compact.names.tolist(),
+                                                                   compact.affiliations.tolist(), values.tolist()),
+                                                               key=lambda node: node[3], reverse=True)],
+            columns=['id', 'name', 'affiliation', measure, 'link'])
+
+        with open(os.path.join(results_path, measure + '.csv'), 'wt') as fcentrality:
+            print("Se ha exportado el listado de autores ordenado por centralidad ({:s}) en: {:s}".format(measure, os.path.join(results_path, measure + '.csv')))
+            df_centrality.to_csv(fcentrality, sep=';', line_terminator='\n', index=False)
+
     graph_metrics = {}
 
+    # Triángulos del grafo compacto enumerados una única vez (compartidos por todas las métricas de clustering)
+    clustering.triangles(compact, n_jobs=os.cpu_count())
+
     # Cálculo de las métricas para el grafo original
-    graph_metrics['Grafo original'] = calculate_metrics(network)
+    graph_metrics['Grafo original'] = calculate_metrics(network, compact)
 
-    # Obtención de la componente más grande y sus métricas
-    largest_cc_nodes = sorted(nx.connected_components(network), key=len, reverse=True)[0]
-    largest_cc = network.subgraph(largest_cc_nodes)
+    # Obtención de la componente más grande (máscara sobre las etiquetas de componentes) y sus métricas
+    largest = compact.subgraph(compact.largest_component_mask())
+    largest_cc = largest.to_networkx()
 
-    graph_metrics['Máxima componente'] = calculate_metrics(largest_cc)
+    graph_metrics['Máxima componente'] = calculate_metrics(largest_cc, largest)
 
     # Exportación a CSV de todas las métricas obtenidas
     df_metrics = pd.DataFrame(graph_metrics).T
-    with open(results_path + '\\metrics.csv', 'wt') as fmetrics:
-        print("Se han exportado las métricas en: {:s}".format(results_path + '\\metrics.csv'))
+    with open(os.path.join(results_path, 'metrics.csv'), 'wt') as fmetrics:
+        print("Se han exportado las métricas en: {:s}".format(os.path.join(results_path, 'metrics.csv')))
         df_metrics.to_csv(fmetrics, sep=';', line_terminator='\n')
 
     # Función para generar el enlace a la página del autor
@@ -155,8 +186,8 @@ if __name__ == "__main__":
         ],
         columns=['id', 'name', 'affiliation', 'degree', 'link'])
 
-    with open(results_path + '\\degree.csv', 'wt') as fdegree:
-        print("Se ha exportado el listado de autores ordenado por grado en: {:s}".format(results_path + '\\degree.csv'))
+    with open(os.path.join(results_path, 'degree.csv'), 'wt') as fdegree:
+        print("Se ha exportado el listado de autores ordenado por grado en: {:s}".format(os.path.join(results_path, 'degree.csv')))
         df_degree.to_csv(fdegree, sep=';', line_terminator='\n', index=False)
 
     # Obtención y exportación a CSV de la distribución del grado ordenada por probabilidad
@@ -171,8 +202,8 @@ if __name__ == "__main__":
         reverse=True),
         columns=["deg", "P(deg)", "count"])
 
-    with open(results_path + '\\degree_distrib.csv', 'wt') as fpdegree:
-        print("Se ha exportado la distribución del grado en: {:s}".format(results_path + '\\degree_distrib.csv'))
+    with open(os.path.join(results_path, 'degree_distrib.csv'), 'wt') as fpdegree:
+        print("Se ha exportado la distribución del grado en: {:s}".format(os.path.join(results_path, 'degree_distrib.csv')))
         df_degree_distrib.to_csv(fpdegree, sep=';', line_terminator='\n', index=False)
 
     # Obtención y exportación a CSV del listado de autores ordenado por coeficiente de agrupamiento
@@ -183,11 +214,11 @@ if __name__ == "__main__":
                  cc,
                  nx.degree(network)[author],
                  gen_link(author[10:])]
-            for author, cc in sorted(nx.clustering(network).items(), key=lambda node: node[1], reverse=True)],
+            for author, cc in sorted(zip(compact.ids.tolist(), clustering.clustering(compact).tolist()), key=lambda node: node[1], reverse=True)],
         columns=['id', 'name', 'affiliation', 'cc', 'degree', 'link'])
 
-    with open(results_path + '\\clustering.csv', 'wt') as fclistering:
-        print("Se ha exportado el listado de autores ordenado por coeficiente de clustering en: {:s}".format(results_path + '\\clustering.csv'))
+    with open(os.path.join(results_path, 'clustering.csv'), 'wt') as fclistering:
+        print("Se ha exportado el listado de autores ordenado por coeficiente de clustering en: {:s}".format(os.path.join(results_path, 'clustering.csv')))
         df_cclustering.to_csv(fclistering, sep=';', line_terminator='\n', index=False)
 
     # Obtención y exportación a CSV de la centralidad por cercanía
@@ -200,8 +231,8 @@ if __name__ == "__main__":
             for author, closeness in sorted(nx.closeness_centrality(network).items(), reverse=True, key=lambda node: node[1])],
         columns=['id', 'name', 'affiliation', 'closeness', 'link'])
 
-    with open(results_path + '\\closeness.csv', 'wt') as fcloseness:
-        print("Se ha exportado el listado de autores ordenado por centralidad de cercanía en: {:s}".format(results_path + '\\closeness.csv'))
+    with open(os.path.join(results_path, 'closeness.csv'), 'wt') as fcloseness:
+        print("Se ha exportado el listado de autores ordenado por centralidad de cercanía en: {:s}".format(os.path.join(results_path, 'closeness.csv')))
         df_closeness.to_csv(fcloseness, sep=';', line_terminator='\n', index=False)
 
     df_comp_degree_closeness = pd.DataFrame([
@@ -216,8 +247,8 @@ if __name__ == "__main__":
         ],
         columns=['id', 'name', 'affiliation', 'closeness', 'degree', 'pos', 'link'])
 
-    with open(results_path + '\\closeness_comp.csv', 'wt') as fclosenesscomp:
-        print("Se ha exportado la comparación entre centralidad de cercanía y grado en: {:s}".format(results_path + '\\closeness_comp.csv'))
+    with open(os.path.join(results_path, 'closeness_comp.csv'), 'wt') as fclosenesscomp:
+        print("Se ha exportado la comparación entre centralidad de cercanía y grado en: {:s}".format(os.path.join(results_path, 'closeness_comp.csv')))
         df_comp_degree_closeness.to_csv(fclosenesscomp, sep=';', line_terminator='\n', index=False)
 
     df_betweenness = pd.DataFrame([
@@ -230,8 +261,8 @@ if __name__ == "__main__":
         ],
         columns=['id', 'name', 'affiliation', 'betweenness', 'link'])
 
-    with open(results_path + '\\betweenness.csv', 'wt') as fbetweenness:
-        print("Se ha exportado el listado de autores ordenado por centralidad de intermediación: {:s}".format(results_path + '\\betweenness.csv'))
+    with open(os.path.join(results_path, 'betweenness.csv'), 'wt') as fbetweenness:
+        print("Se ha exportado el listado de autores ordenado por centralidad de intermediación: {:s}".format(os.path.join(results_path, 'betweenness.csv')))
         df_betweenness.to_csv(fbetweenness, sep=';', line_terminator='\n', index=False)
 
     # Obtención de la centralidad por intermediación
@@ -247,6 +278,6 @@ if __name__ == "__main__":
         ],
         columns=['id', 'name', 'affiliation', 'closeness', 'degree', 'pos', 'link'])
 
-    with open(results_path + '\\betweenness_comp.csv', 'wt') as fbetweennesscomp:
-        print("Se ha exportado la comparación entre centralidad de intermediación y grado en: {:s}".format(results_path + '\\betweenness_comp.csv'))
-        df_comp_degree_closeness.to_csv(fbetweennesscomp, sep=';', line_terminator='\n', index=False)'''
\ No newline at end of file
+    with open(os.path.join(results_path, 'betweenness_comp.csv'), 'wt') as fbetweennesscomp:
+        print("Se ha exportado la comparación entre centralidad de intermediación y grado en: {:s}".format(os.path.join(results_path, 'betweenness_comp.csv')))
+        df_comp_degree_closeness.to_csv(fbetweennesscomp, sep=';', line_terminator='\n', index=False)
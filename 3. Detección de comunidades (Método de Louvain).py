@@ -1,9 +1,11 @@
-from community import best_partition
 import networkx as nx
 from networkx.algorithms import average_clustering, centrality
 import numpy as np
 import pandas as pd
 import os
+from modules.instrumentation import timed
+from modules.compact import CompactGraph
+from modules import clustering, communities, export
 
 
 def build_nxGraph(graph):
@@ -39,13 +41,15 @@ def build_nxGraph(graph):
 
     return network
 
+@timed('louvain.louvain_communities', items=len)
 def louvain_communties(G):
     '''
     Obtiene el conjunto de mejores particiones posibles para el grafo G con el algoritmo de Louvain basado en modularidad
+    (con el refinamiento de Leiden, sobre la representación compacta del grafo)
 
     Parameters
     ----------
-        G : nx.Graph
+        G : CompactGraph
             red de la que se quiere obtener las particiones    
     Returns
     -------
@@ -55,7 +59,7 @@ def louvain_communties(G):
     
     '''
     # Aplicamos el algoritmo de louvain
-    partition = best_partition(G)
+    partition = communities.best_partition(G)
 
     # Agrupamos los nodos en listas según su partición
     communties = {}
@@ -65,14 +69,19 @@ def louvain_communties(G):
     return list(communties.values())
 
 
-def calculate_metrics(network):
+@timed('louvain.calculate_metrics', items=lambda metrics: metrics['n'])
+def calculate_metrics(network, compact=None):
     '''
     Calcula las métricas más importantes sobre la red y las devuelve en forma de diccionario
 
     Parameters
     ----------
         network : nx.Graph
-            Red de la que se quiere calcular las metricas 
+            Red de la que se quiere calcular las metricas
+
+        compact : CompactGraph
+            Misma red en formato compacto. Si se indica, el coeficiente de clustering se obtiene de los triángulos
+            almacenados en el grafo compacto en lugar de volver a contarlos 
 
     Returns
     -------
@@ -112,7 +121,7 @@ def calculate_metrics(network):
     metrics['max_degree_p'] = max(degree_distribution, key=lambda degree_p: degree_p[1])[0]
 
     # Coeficiente de clustering promedio
-    metrics['clustering_coefficient'] = average_clustering(network)
+    metrics['clustering_coefficient'] = clustering.average_clustering(compact) if compact is not None else average_clustering(network)
 
     # Nodo con mayor centralidad promedio
     metrics['max_closeness_centrality'] = getprops(
@@ -124,27 +133,43 @@ if __name__ == "__main__":
     # Directorio actual
     current_path = os.path.dirname(os.path.realpath(__file__))
 
-    # Directorio de datos
-    data_path = current_path + '/data'
+    # Directorio de datos (GRAPHMINING_DATA si se ejecuta desde graphmining.py con --data)
+    data_path = os.environ.get('GRAPHMINING_DATA') or os.path.join(current_path, 'data')
 
-    # Directorio de resultados
-    results_path = current_path + '/results'
+    # Directorio de resultados (GRAPHMINING_RESULTS si se ejecuta desde graphmining.py con --results)
+    results_path = os.environ.get('GRAPHMINING_RESULTS') or os.path.join(current_path, 'results')
 
     graph_metrics = {}
 
     # Carga del grafo
     try:
-        graph = np.load(data_path + '/colab_graph.npy', allow_pickle=True).item()
+        graph = np.load(os.path.join(data_path, 'colab_graph.npy'), allow_pickle=True).item()
     except FileNotFoundError:
         print("No se ha encontrado el grafo de colaboración. Por favor, ejecute los scripts anteriores")
 
     network = build_nxGraph(graph)
 
-    largest_cc = nx.subgraph(network, sorted(nx.connected_components(network), key=len, reverse=True)[0])
+    # Componente más grande a partir de las etiquetas de componentes del grafo compacto
+    compact = CompactGraph.from_graph(graph)
+    largest = compact.subgraph(compact.largest_component_mask())
+
+    # Los triángulos se enumeran una vez y cada comunidad los restringe a sus nodos
+    clustering.triangles(compact, n_jobs=os.cpu_count())
+
+    # Comunidad de cada autor (-1 si no pertenece a la componente más grande)
+    community_labels = np.full(compact.n, -1, dtype=np.int32)
+
     # Detección de comunidades y sus métricas con el algoritmo de Clauset-Newman-Moore
-    for i, community in enumerate(sorted(louvain_communties(largest_cc), reverse=True, key=len)):
-        cm = nx.subgraph(network, list(community))
-        graph_metrics['Comunidad ' + str(i)] = calculate_metrics(cm)
+    for i, community in enumerate(sorted(louvain_communties(largest), reverse=True, key=len)):
+        community_mask = compact.mask(community)
+        community_labels[community_mask] = i
+        cm = compact.subgraph(community_mask)
+        graph_metrics['Comunidad ' + str(i)] = calculate_metrics(cm.to_networkx(), cm)
+
+    # Almacenamiento de las comunidades junto al grafo compacto, para exportarlas como atributo de los nodos
+    compact_path = os.path.join(data_path, 'colab_graph')
+    os.makedirs(compact_path, exist_ok=True)
+    communities.save_labels(compact_path, compact, community_labels)
 
     # Exportación a CSV
     df_metrics = pd.DataFrame(graph_metrics).T
@@ -156,5 +181,7 @@ if __name__ == "__main__":
     df_metrics['density'] = pd.to_numeric(df_metrics['density'])
     df_metrics['clustering_coefficient'] = pd.to_numeric(df_metrics['clustering_coefficient'])
     print(df_metrics[['size', 'av_degree', 'density', 'clustering_coefficient']].describe())
-    nx.write_gexf(network, results_path + '/prueba.gefx')
+
+    # Exportación del grafo con las comunidades para Gephi (escritura por bloques, sin construir el documento en memoria)
+    export.write_gexf(compact, os.path.join(results_path, 'prueba.gefx'), attributes={'community': community_labels})
         #df_m.to_csv(fcommunities, sep=';', line_terminator='\n')
\ No newline at end of file
@@ -1,12 +1,12 @@
-from community import best_partition
 import networkx as nx
 from networkx.algorithms import average_clustering, centrality
 import numpy as np
 import pandas as pd
 import os
 import re
-from matplotlib import pyplot as plt
-import json
+from modules.instrumentation import timed
+from modules.compact import CompactGraph
+from modules import clustering, communities
 
 
 def build_nxGraph(graph):
@@ -43,13 +43,15 @@ def build_nxGraph(graph):
     return network
 
 
+@timed('cliques.louvain_communities', items=len)
 def louvain_communties(G):
     '''
     Obtiene el conjunto de mejores particiones posibles para el grafo G con el algoritmo de Louvain basado en modularidad
+    (con el refinamiento de Leiden, sobre la representación compacta del grafo)
 
     Parameters
     ----------
-        G : nx.Graph
+        G : CompactGraph
             red de la que se quiere obtener las particiones
     Returns
     -------
@@ -59,7 +61,7 @@ def louvain_communties(G):
 
     '''
     # Aplicamos el algoritmo de louvain
-    partition = best_partition(G)
+    partition = communities.best_partition(G)
 
     # Agrupamos los nodos en listas según su partición
     communties = {}
@@ -69,7 +71,8 @@ def louvain_communties(G):
     return list(communties.values())
 
 
-def calculate_metrics(network):
+@timed('cliques.calculate_metrics', items=lambda metrics: metrics['n'])
+def calculate_metrics(network, compact=None):
     '''
     Calcula las métricas más importantes sobre la red y las devuelve en forma de diccionario
 
@@ -78,6 +81,10 @@ def calculate_metrics(network):
         network : nx.Graph
             Red de la que se quiere calcular las metricas
 
+        compact : CompactGraph
+            Misma red en formato compacto. Si se indica, el coeficiente de clustering se obtiene de los triángulos
+            almacenados en el grafo compacto en lugar de volver a contarlos
+
     Returns
     -------
         metrics : dict
@@ -116,7 +123,7 @@ def calculate_metrics(network):
     metrics['max_degree_p'] = max(degree_distribution, key=lambda degree_p: degree_p[1])
 
     # Coeficiente de clustering promedio
-    metrics['clustering_coefficient'] = average_clustering(network)
+    metrics['clustering_coefficient'] = clustering.average_clustering(compact) if compact is not None else average_clustering(network)
 
     # Nodo con mayor centralidad promedio
     metrics['max_closeness_centrality'] = getprops(
@@ -129,17 +136,17 @@ if __name__ == "__main__":
     # Directorio actual
     current_path = os.path.dirname(os.path.realpath(__file__))
 
-    # Directorio de datos
-    data_path = current_path + '/data'
+    # Directorio de datos (GRAPHMINING_DATA si se ejecuta desde graphmining.py con --data)
+    data_path = os.environ.get('GRAPHMINING_DATA') or os.path.join(current_path, 'data')
 
-    # Directorio de resultados
-    results_path = current_path + '/results'
+    # Directorio de resultados (GRAPHMINING_RESULTS si se ejecuta desde graphmining.py con --results)
+    results_path = os.environ.get('GRAPHMINING_RESULTS') or os.path.join(current_path, 'results')
 
     graph_metrics = {}
 
     # Carga del grafo
     try:
-        graph = np.load(data_path + '/colab_graph.npy', allow_pickle=True).item()
+        graph = np.load(os.path.join(data_path, 'colab_graph.npy'), allow_pickle=True).item()
     except FileNotFoundError:
         print("No se ha encontrado el grafo de colaboración. Por favor, ejecute los scripts anteriores")
 
@@ -148,17 +155,21 @@ if __name__ == "__main__":
     uclm_authors = [author for author, props in graph.items() if re.search(regex_uclm, props['affiliation'])]
 
     # A apartir del grafo general, obtenemos el subgrafo que incluye sólo a éstos
-    network = build_nxGraph(graph).subgraph(uclm_authors)
-
-    # Obtenemos la componente conexa más grande
-    largest_cc = nx.subgraph(network, sorted(nx.connected_components(network), key=len, reverse=True)[0])
+    compact = CompactGraph.from_graph(graph)
+    uclm = compact.subgraph(compact.mask(uclm_authors))
+    network = uclm.to_networkx()
+
+    # Obtenemos la componente conexa más grande (hereda los triángulos enumerados sobre el subgrafo UCLM)
+    clustering.triangles(uclm)
+    largest = uclm.subgraph(uclm.largest_component_mask())
+    largest_cc = largest.to_networkx()
     
     df_uclm = pd.DataFrame({
-        "Grafo completo": calculate_metrics(network),
-        "Máxima componente": calculate_metrics(largest_cc)
+        "Grafo completo": calculate_metrics(network, uclm),
+        "Máxima componente": calculate_metrics(largest_cc, largest)
     }).T
 
-    with open(results_path + '\\uclm.csv', 'wt') as fuclm:
+    with open(os.path.join(results_path, 'uclm.csv'), 'wt') as fuclm:
         df_uclm.to_csv(fuclm, sep=';', line_terminator='\n', index=False)
 
     df_uclm_degree = pd.DataFrame([
@@ -169,7 +180,7 @@ if __name__ == "__main__":
         columns=['id', 'name', 'degree'])
 
     # Exportación a CSV
-    with open(results_path + '\\uclm_degree.csv', 'wt') as fdegree:
+    with open(os.path.join(results_path, 'uclm_degree.csv'), 'wt') as fdegree:
         df_uclm_degree.to_csv(fdegree, sep=';', line_terminator='\n', index=False)
 
     # Obtención de todas las cliques del grafo (n > 3)
@@ -181,6 +192,6 @@ if __name__ == "__main__":
          ] for i, clique in enumerate(sorted([clique for clique in list(nx.find_cliques(largest_cc)) if len(clique) > 3], key=len, reverse=True))],
         columns=["clique no", "nodes", "total"])
 
-    with open(results_path + '\\uclm_cliques.csv', 'wt') as fcliques:
+    with open(os.path.join(results_path, 'uclm_cliques.csv'), 'wt') as fcliques:
         df_clique.to_csv(fcliques, sep=';', line_terminator='\n', index=False)
 
@@ -2,7 +2,10 @@ import os
 import numpy as np
 from collections import deque, defaultdict
 from tqdm import tqdm
+from modules.instrumentation import timed
+from modules.authors import load_authors
 
+@timed('graphgen.build_graph', items=len)
 def build_graph(data):
     '''
 
@@ -116,7 +119,7 @@ def build_graph(data):
 if __name__ == "__main__":
     data_path = os.path.dirname(os.path.realpath(__file__)) + '/data'
 
-    authors_data = np.load(data_path + '/authors_data.npy', allow_pickle=True).item()
+    authors_data = load_authors(data_path)
 
     graph = dict(build_graph(authors_data))
 
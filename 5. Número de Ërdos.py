@@ -1,11 +1,10 @@
-import networkx as nx
 import numpy as np
-from tqdm import tqdm
 from queue import Queue
 from argparse import ArgumentParser
-import pandas as pd
 import os
+from modules.instrumentation import timed
 
+@timed('erdos.calculate_erdos', items=len)
 def calculate_erdos(id, graph):
     # Identificador del autor
     author = "homepages/" + id
@@ -36,6 +35,8 @@ def calculate_erdos(id, graph):
     return erdos
 
 if __name__ == "__main__":
+    import pandas as pd
+
     arg_parser = ArgumentParser()
 
     # Obtenes los argumentos (id del autor)
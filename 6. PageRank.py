@@ -1,9 +1,10 @@
 import numpy as np
-import networkx as nx
-import pandas as pd
 import os
+from modules.instrumentation import timed
+from modules import pagerank as pagerank_state
 
-def pagerank(authors, d=0.85, alpha=0.0005):
+@timed('pagerank.pagerank', items=len)
+def pagerank(authors, d=0.85, alpha=0.0005, start=None):
     '''
     Devuelve un diccionario que contiene la ID de cada autor y su valor de PageRank asociado
 
@@ -17,6 +18,10 @@ def pagerank(authors, d=0.85, alpha=0.0005):
     
         alpha : float
             mínimo cambio que debe sufrir la media de los valores de PageRank de los autores en esa iteración para determinar que no ha convergido
+
+        start : dict
+            valores de PageRank de partida (por ejemplo, los de la ejecución anterior) con las IDs de los autores como clave. Los autores que no
+            aparecen parten del valor inicial
     
     Returns
     -------
@@ -36,7 +41,8 @@ def pagerank(authors, d=0.85, alpha=0.0005):
     #total_weight = sum([sum(coauthor['weight'] for coauthor in props['pubs']) for props in authors.values()])
 
     # Inicialización de los valores de PR para cada author
-    pagerank = {author: {'name': props['name'], 'affiliation': props['affiliation'], 'pr': init_pr} for author, props in authors.items()}
+    start = start or {}
+    pagerank = {author: {'name': props['name'], 'affiliation': props['affiliation'], 'pr': start.get(author, init_pr)} for author, props in authors.items()}
 
     convergence = False
 
@@ -66,10 +72,10 @@ def pagerank(authors, d=0.85, alpha=0.0005):
 
             # Una vez recorrida toda la lista de coautores, actualizar el valor de PageRank del autor
             new_pr = (1-d)*(sum_w/total_weight) + (d * sum_pr)
-            pagerank[author]['pr'] = new_pr
 
-            # Añadir al umbral de esta itereación el cambio en el valor de PageRank
+            # Añadir al umbral de esta itereación el cambio en el valor de PageRank (antes de sobrescribir el valor anterior)
             threshold += abs(props['pr'] - new_pr)
+            pagerank[author]['pr'] = new_pr
 
         # Calcular la condición de convergencia: si la media del cambio ocurrido en los valores de PageRank para todos los autores es inferior a alpha, se considera que el algoritmo ha convergido
         convergence = threshold/len(authors.keys()) < alpha
@@ -77,26 +83,37 @@ def pagerank(authors, d=0.85, alpha=0.0005):
     return pagerank
 
 if __name__ == "__main__":
+    import pandas as pd
+
     # Directorio actual
     current_path = os.path.dirname(os.path.realpath(__file__))
 
-    # Directorio de datos
-    data_path = current_path + '\\data'
+    # Directorio de datos (GRAPHMINING_DATA si se ejecuta desde graphmining.py con --data)
+    data_path = os.environ.get('GRAPHMINING_DATA') or os.path.join(current_path, 'data')
 
-    # Directorio de resultados
-    results_path = current_path + '\\results'
+    # Directorio de resultados (GRAPHMINING_RESULTS si se ejecuta desde graphmining.py con --results)
+    results_path = os.environ.get('GRAPHMINING_RESULTS') or os.path.join(current_path, 'results')
 
     if not os.path.exists(results_path):
-        os.mkdir(results_path)
+        os.makedirs(results_path)
 
     # Carga del grafo
     try:
-        graph = np.load(data_path + '\\colab_graph.npy', allow_pickle=True).item()
+        graph = np.load(os.path.join(data_path, 'colab_graph.npy'), allow_pickle=True).item()
     except FileNotFoundError:
         print("No se ha generado el grafo de colaboración. Por favor, ejecute los scripts anteriores")
 
-    # Obtención de los valores de PR
-    pagerank = pagerank(graph)
+    # Obtención de los valores de PR partiendo de los de la ejecución anterior (si existen). El vector se almacena junto al
+    # grafo compacto, el mismo que actualiza modules/pagerank.py (graphmining.py pagerank)
+    compact_path = os.path.join(data_path, 'colab_graph')
+    state = pagerank_state.load_state(compact_path)
+    last_pagerank = dict(zip(state[0].tolist(), state[1].tolist())) if state is not None else None
+
+    pagerank = pagerank(graph, start=last_pagerank)
+
+    if not os.path.exists(compact_path):
+        os.makedirs(compact_path)
+    pagerank_state.save_state(compact_path, list(pagerank.keys()), [props['pr'] for props in pagerank.values()])
 
     # Conversión a Pandas DataFrame y exportación a CSV
     pagerank_df = pd.DataFrame.from_dict({
@@ -112,5 +129,5 @@ if __name__ == "__main__":
         orient='index',
         columns=['id', 'name', 'affiliation', 'pr', 'link'])
 
-    with open(results_path + '\\pagerank.csv', 'wt') as fpr:
+    with open(os.path.join(results_path, 'pagerank.csv'), 'wt') as fpr:
         pagerank_df.to_csv(fpr, sep=";", line_terminator='\n', index=False)
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+from argparse import ArgumentParser
+from time import perf_counter
+
+current_path = os.path.dirname(os.path.realpath(__file__))
+root_path = os.path.dirname(current_path)
+
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+
+
+def load_graph(graph_path=None, n_authors=4000, seed=0):
+    '''
+    Componente más grande del grafo de colaboración almacenado (directorio del grafo compacto) o de un grafo sintético
+    '''
+    from modules.compact import CompactGraph
+
+    if graph_path is not None:
+        compact = CompactGraph.load(graph_path, mmap_mode=None)
+    else:
+        from benchmarks.synthetic import generate_authors_data
+        from modules.graphgen import build_graph
+
+        compact = CompactGraph.from_graph(build_graph(generate_authors_data(n_authors, seed=seed)))
+
+    return compact.subgraph(compact.largest_component_mask())
+
+
+def run(compact, seeds=(0, 1, 2)):
+    '''
+    Compara el motor de comunidades del proyecto (Louvain y Leiden) con python-louvain: tiempo, modularidad y número de
+    comunidades para varias semillas
+
+    Returns
+    -------
+        results : list
+            [{'method', 'seed', 'time_s', 'modularity', 'communities'}, ...]
+    '''
+    import numpy as np
+    from community import best_partition
+    from modules import communities
+
+    network = compact.to_networkx()
+    ids = np.asarray(compact.ids).tolist()
+
+    def python_louvain(seed):
+        partition = best_partition(network, random_state=seed)
+        return np.array([partition[author] for author in ids])
+
+    methods = {
+        "python-louvain": python_louvain,
+        "louvain": lambda seed: communities.leiden(compact, seed=seed, refine=False),
+        "leiden": lambda seed: communities.leiden(compact, seed=seed),
+    }
+
+    results = []
+    for method, function in methods.items():
+        for seed in seeds:
+            start = perf_counter()
+            labels = function(seed)
+            elapsed = perf_counter() - start
+            results.append({
+                "method": method,
+                "seed": seed,
+                "time_s": elapsed,
+                "modularity": communities.modularity(compact, labels),
+                "communities": int(len(np.unique(labels))),
+            })
+            print("{:<15s} {:d} {:>8.3f} s  Q={:.5f}".format(method, seed, elapsed, results[-1]["modularity"]), file=sys.stderr)
+
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--graph", default=None, help="Directorio del grafo compacto (por defecto, grafo sintético)")
+    arg_parser.add_argument("--authors", type=int, default=4000, help="Número de autores del grafo sintético")
+    arg_parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2], help="Semillas")
+
+    args = arg_parser.parse_args()
+
+    print(json.dumps(run(load_graph(args.graph, n_authors=args.authors), seeds=args.seeds), indent=2))
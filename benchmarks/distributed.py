@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+current_path = os.path.dirname(os.path.realpath(__file__))
+root_path = os.path.dirname(current_path)
+
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+
+from benchmarks.packed import load_graph
+
+
+def run(compact, task='betweenness', workers=(1, 2, 4), samples=400, block_size=16, crash=True, seed=0):
+    '''
+    Escalado de la ejecución distribuida con trabajadores locales (procesos independientes conectados por TCP al
+    coordinador): tiempo, orígenes por segundo y aceleración respecto a un trabajador. Con crash se repite la ejecución
+    con el mayor número de trabajadores haciendo que uno de ellos termine bruscamente, para medir el coste de los
+    reintentos y comprobar que el resultado no cambia
+
+    Returns
+    -------
+        results : dict
+    '''
+    import numpy as np
+    from modules import distributed
+
+    sources = distributed.select_sources(compact.n, samples, seed=seed)
+    results = {"authors": compact.n, "edges": compact.m, "task": task, "sources": len(sources), "cpus": os.cpu_count(), "runs": []}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        graph_path = os.path.join(workdir, 'colab_graph')
+        compact.save(graph_path)
+
+        reference = None
+        for n_workers in workers:
+            start = perf_counter()
+            result, coordinator = distributed.run_local(graph_path, task, sources, n_workers=n_workers, block_size=block_size)
+            elapsed = perf_counter() - start
+
+            reference = result if reference is None else reference
+            results["runs"].append({
+                "workers": n_workers,
+                "wall_s": elapsed,
+                "sources_per_s": len(sources) / elapsed,
+                "speedup": results["runs"][0]["wall_s"] / elapsed if results["runs"] else 1.0,
+                "batches": len(coordinator.batches),
+            })
+
+        if crash:
+            n_workers = max(workers)
+            start = perf_counter()
+            result, coordinator = distributed.run_local(graph_path, task, sources, n_workers=n_workers, block_size=block_size,
+                                                        crash_after={0: 1})
+            # Autores inalcanzables (distancia infinita) en el número de Erdös
+            finite = np.isfinite(reference)
+            results["crash"] = {
+                "workers": n_workers,
+                "wall_s": perf_counter() - start,
+                "retried_batches": coordinator.retried,
+                "max_abs_error": float(np.abs(result[finite] - reference[finite]).max()) if finite.any() else 0.0,
+            }
+
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--graph", default=None, help="Directorio del grafo compacto (por defecto, grafo sintético)")
+    arg_parser.add_argument("--authors", type=int, default=4000, help="Número de autores del grafo sintético")
+    arg_parser.add_argument("--task", default="betweenness", choices=["closeness", "betweenness", "erdos"], help="Tarea")
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Números de trabajadores a comparar")
+    arg_parser.add_argument("--samples", type=int, default=400, help="Número de orígenes")
+    arg_parser.add_argument("--block-size", type=int, default=16, help="Número de orígenes de cada lote")
+    arg_parser.add_argument("--no-crash", action="store_true", help="No medir la ejecución con un trabajador caído")
+
+    args = arg_parser.parse_args()
+
+    print(json.dumps(run(load_graph(args.graph, n_authors=args.authors), task=args.task, workers=args.workers,
+                         samples=args.samples, block_size=args.block_size, crash=not args.no_crash), indent=2))
@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+current_path = os.path.dirname(os.path.realpath(__file__))
+root_path = os.path.dirname(current_path)
+
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+
+
+def load_graph(graph_path=None, n_authors=4000, seed=0):
+    '''
+    Grafo de colaboración almacenado (directorio del grafo compacto) o un grafo sintético
+    '''
+    from modules.compact import CompactGraph
+
+    if graph_path is not None:
+        return CompactGraph.load(graph_path, mmap_mode=None)
+
+    from benchmarks.synthetic import generate_authors_data
+    from modules.graphgen import build_graph
+
+    return CompactGraph.from_graph(build_graph(generate_authors_data(n_authors, seed=seed)))
+
+
+def directory_size(path):
+    '''
+    Bytes que ocupan los ficheros del directorio
+    '''
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def best(function, repeat):
+    '''
+    Menor tiempo real de varias ejecuciones de la función
+    '''
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def run(compact, repeat=3, lookups=1000, seed=0):
+    '''
+    Compara el grafo comprimido con el grafo compacto: bytes por arista (listas de coautores y directorio completo, con
+    las cadenas) y velocidad de compresión, de descompresión completa, del recorrido por bloques y del acceso a listas
+    de coautores individuales
+
+    Returns
+    -------
+        results : dict
+    '''
+    import numpy as np
+    from modules.packed import PackedGraph
+
+    edges = max(len(compact.indices), 1)
+    csr_bytes = compact.indptr.nbytes + compact.indices.nbytes + compact.weights.nbytes
+
+    packed = PackedGraph.from_compact(compact)
+    authors = np.random.RandomState(seed).randint(0, compact.n, size=lookups)
+
+    def iterate():
+        for _ in packed.iter_neighbours():
+            pass
+
+    with tempfile.TemporaryDirectory() as workdir:
+        compact.save(os.path.join(workdir, 'compact'))
+        packed.save(os.path.join(workdir, 'packed'))
+        compact_disk = directory_size(os.path.join(workdir, 'compact'))
+        packed_disk = directory_size(os.path.join(workdir, 'packed'))
+
+    encode = best(lambda: PackedGraph.from_compact(compact), repeat)
+    decode = best(packed.to_compact, repeat)
+    scan = best(iterate, repeat)
+    lookup = best(lambda: [packed.neighbours(int(author)) for author in authors], repeat)
+
+    return {
+        "authors": compact.n,
+        "edges": compact.m,
+        "csr_bytes_per_edge": csr_bytes / edges,
+        "packed_bytes_per_edge": packed.nbytes() / edges,
+        "compact_directory_bytes": compact_disk,
+        "packed_directory_bytes": packed_disk,
+        "encode_edges_per_s": edges / encode,
+        "decode_edges_per_s": edges / decode,
+        "iter_neighbours_edges_per_s": edges / scan,
+        "neighbours_us": lookup / lookups * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--graph", default=None, help="Directorio del grafo compacto (por defecto, grafo sintético)")
+    arg_parser.add_argument("--authors", type=int, default=4000, help="Número de autores del grafo sintético")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Número de ejecuciones de cada medida")
+
+    args = arg_parser.parse_args()
+
+    print(json.dumps(run(load_graph(args.graph, n_authors=args.authors), repeat=args.repeat), indent=2))
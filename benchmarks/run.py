@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import platform
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime
+from time import perf_counter, process_time
+
+current_path = os.path.dirname(os.path.realpath(__file__))
+root_path = os.path.dirname(current_path)
+
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+
+from benchmarks.synthetic import generate_dblp_xml, generate_person_xml
+from modules.scripts import load_script
+
+# Número de autores de cada escala
+SCALES = {
+    "small": 250,
+    "medium": 1000,
+    "large": 4000,
+}
+
+
+def prepare_stages(workdir, n_authors, seed=0):
+    '''
+    Genera los datos sintéticos de una escala y prepara las etapas del proceso a medir
+
+    Parameters
+    ----------
+        workdir : str
+            directorio donde se almacenan los ficheros sintéticos
+
+        n_authors : int
+            número de autores de la escala
+
+        seed : int
+            semilla de los generadores
+
+    Returns
+    -------
+        stages : dict
+            {nombre de la etapa: (función sin argumentos, número de elementos procesados)}
+    '''
+    import numpy as np
+    from modules.decoder import Decoder
+    from modules.scrapper import Scrapper
+    from modules.crawler import Crawler
+    from modules.graphgen import build_graph
+    from modules.compact import CompactGraph
+    from modules import clustering, linkpred, hyperanf, centrality, paths
+    from modules.minhash import MinHashIndex
+    from modules.ego import ego_networks
+    from modules.packed import PackedGraph
+    from modules.walks import WalkEngine
+    from modules.external import build_graph_external
+    from modules.xmlindex import XmlIndex
+
+    metrics_script = load_script(2)
+    erdos_script = load_script(5)
+    pagerank_script = load_script(6)
+
+    xml_path = os.path.join(workdir, "dblp-{:d}.xml.gz".format(n_authors))
+    dtd_path = os.path.join(workdir, "dblp-{:d}.dtd".format(n_authors))
+    decoded_path = os.path.join(workdir, "decoded-dblp-{:d}.xml".format(n_authors))
+
+    authors_data = generate_dblp_xml(xml_path, dtd_path, n_authors, seed=seed)
+    pages = [generate_person_xml(author, props) for author, props in authors_data.items()]
+
+    decoder = Decoder(xml_path, decoded_path, dtd_path)
+    decoder.recode_file()
+
+    crawler = Crawler()
+    scrapper = Scrapper()
+
+    graph = build_graph(authors_data)
+    network = metrics_script.build_nxGraph(graph)
+
+    # Autor de mayor grado como origen del número de Erdös
+    source = max(graph.items(), key=lambda author: len(author[1]['pubs']))[0][10:]
+
+    return {
+        "Decoder.recode_file": (decoder.recode_file, n_authors),
+        "Scrapper.scrape": (lambda: scrapper.scrape(decoded_path, mask=None), n_authors),
+        "Scrapper.scrape[spain]": (lambda: scrapper.scrape(decoded_path, mask="spain"), n_authors),
+        "Scrapper.scrape_masks": (lambda: scrapper.scrape_masks(decoded_path, full=True), n_authors),
+        "XmlIndex.build": (lambda: XmlIndex.build(decoded_path), n_authors),
+        "Crawler.parse_XML": (lambda: [crawler.parse_XML(page) for page in pages], len(pages)),
+        "build_graph": (lambda: build_graph(authors_data), n_authors),
+        "MinHashIndex.build": (lambda: MinHashIndex.build(authors_data), n_authors),
+        "build_graph_external": (lambda: build_graph_external(authors_data.items(), os.path.join(workdir, "external"),
+                                                              memory_budget=64 << 20), n_authors),
+        "pagerank": (lambda: pagerank_script.pagerank(graph), len(graph)),
+        "calculate_erdos": (lambda: erdos_script.calculate_erdos(source, graph), len(graph)),
+        "calculate_metrics": (lambda: metrics_script.calculate_metrics(network), network.number_of_nodes()),
+        "clustering.average_clustering": (lambda: clustering.average_clustering(CompactGraph.from_graph(graph)), len(graph)),
+        "hyperanf": (lambda: hyperanf.hyperanf(CompactGraph.from_graph(graph)), len(graph)),
+        "ego.ego_networks": (lambda: ego_networks(CompactGraph.from_graph(graph), list(graph)), len(graph)),
+        "PackedGraph.from_compact": (lambda: PackedGraph.from_compact(CompactGraph.from_graph(graph)), len(graph)),
+        "PackedGraph.to_compact": (PackedGraph.from_compact(CompactGraph.from_graph(graph)).to_compact, len(graph)),
+        "WalkEngine.walks": (lambda: WalkEngine(CompactGraph.from_graph(graph), p=0.5, q=2).walks(
+            np.arange(len(graph)).repeat(10), 80, np.random.RandomState(seed)), 10 * len(graph)),
+        "centrality.centralities": (lambda: centrality.centralities(CompactGraph.from_graph(graph)), len(graph)),
+        "paths.closeness": (lambda: paths.closeness(CompactGraph.from_graph(graph)), len(graph)),
+        "paths.betweenness": (lambda: paths.betweenness(CompactGraph.from_graph(graph)), len(graph)),
+        "linkpred.recommend": (lambda: linkpred.recommend(CompactGraph.from_graph(graph)), len(graph)),
+    }
+
+
+def measure(function, repeat=3, memory=True):
+    '''
+    Mide el tiempo (real y de CPU) y el pico de memoria de una función
+
+    El pico de memoria se obtiene con tracemalloc en una ejecución adicional, ya que su sobrecoste distorsionaría los tiempos
+
+    Parameters
+    ----------
+        function : callable
+            función sin argumentos a medir
+
+        repeat : int
+            número de ejecuciones cronometradas
+
+        memory : bool
+            si se debe medir el pico de memoria
+
+    Returns
+    -------
+        result : dict
+            tiempos de cada ejecución y pico de memoria (bytes)
+    '''
+    wall, cpu = [], []
+    for _ in range(repeat):
+        start_wall, start_cpu = perf_counter(), process_time()
+        function()
+        wall.append(perf_counter() - start_wall)
+        cpu.append(process_time() - start_cpu)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {"wall_s": wall, "cpu_s": cpu, "wall_min_s": min(wall), "peak_memory_bytes": peak}
+
+
+def environment():
+    '''
+    Devuelve la descripción del entorno de ejecución para poder comparar resultados entre versiones
+    '''
+    commit = None
+    head = os.path.join(root_path, ".git", "HEAD")
+    if os.path.exists(head):
+        with open(head) as fhead:
+            ref = fhead.read().strip()
+        if ref.startswith("ref: "):
+            ref_path = os.path.join(root_path, ".git", ref[5:])
+            if os.path.exists(ref_path):
+                with open(ref_path) as fref:
+                    commit = fref.read().strip()
+        else:
+            commit = ref
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "commit": commit,
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    '''
+    Compara los resultados con los de una ejecución anterior y devuelve las etapas que han empeorado
+
+    Parameters
+    ----------
+        results : dict
+            resultados actuales (formato de run)
+
+        baseline : dict
+            resultados de referencia (formato de run)
+
+        tolerance : float
+            empeoramiento relativo permitido antes de considerarlo una regresión
+
+    Returns
+    -------
+        regressions : list
+            lista de (etapa, escala, métrica, valor de referencia, valor actual)
+    '''
+    reference = {(r["stage"], r["scale"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        ref = reference.get((result["stage"], result["scale"]))
+        if ref is None:
+            continue
+        for metric in ("wall_min_s", "peak_memory_bytes"):
+            if ref[metric] and result[metric] and result[metric] > ref[metric] * (1 + tolerance):
+                regressions.append((result["stage"], result["scale"], metric, ref[metric], result[metric]))
+
+    return regressions
+
+
+def run(scales, stages=None, repeat=3, memory=True, seed=0):
+    '''
+    Ejecuta el conjunto de pruebas de rendimiento sobre las escalas indicadas
+
+    Parameters
+    ----------
+        scales : list
+            nombres de las escalas (ver SCALES)
+
+        stages : list
+            etapas a medir (todas si es None)
+
+        repeat : int
+            número de ejecuciones cronometradas por etapa
+
+        memory : bool
+            si se debe medir el pico de memoria
+
+        seed : int
+            semilla de los generadores sintéticos
+
+    Returns
+    -------
+        results : dict
+            {'environment': {...}, 'results': [{'stage', 'scale', 'n_authors', 'items', 'wall_s', ...}, ...]}
+    '''
+    results = {"environment": environment(), "results": []}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in scales:
+            n_authors = SCALES[scale]
+            for stage, (function, items) in prepare_stages(workdir, n_authors, seed=seed).items():
+                if stages is not None and stage not in stages:
+                    continue
+                result = measure(function, repeat=repeat, memory=memory)
+                result.update({"stage": stage, "scale": scale, "n_authors": n_authors, "items": items,
+                               "items_per_s": items / result["wall_min_s"] if result["wall_min_s"] > 0 else None})
+                results["results"].append(result)
+                print("{:<25s} {:<7s} {:>10.4f} s".format(stage, scale, result["wall_min_s"]), file=sys.stderr)
+
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--scales", nargs="+", default=["small", "medium"], choices=list(SCALES.keys()), help="Escalas a medir")
+    arg_parser.add_argument("--stages", nargs="+", default=None, help="Etapas a medir (por defecto todas)")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Número de ejecuciones por etapa")
+    arg_parser.add_argument("--no-memory", action="store_true", help="No medir el pico de memoria")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Semilla de los generadores sintéticos")
+    arg_parser.add_argument("--output", default=None, help="Fichero JSON donde se almacenan los resultados")
+    arg_parser.add_argument("--baseline", default=None, help="Fichero JSON de una ejecución anterior con el que comparar")
+    arg_parser.add_argument("--tolerance", type=float, default=0.2, help="Empeoramiento relativo permitido frente a la referencia")
+
+    args = arg_parser.parse_args()
+
+    results = run(args.scales, stages=args.stages, repeat=args.repeat, memory=not args.no_memory, seed=args.seed)
+
+    if args.output is not None:
+        with open(args.output, "wt") as fresults:
+            json.dump(results, fresults, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    # Comparación con la ejecución de referencia (código de salida 1 si hay regresiones)
+    if args.baseline is not None:
+        with open(args.baseline) as fbaseline:
+            regressions = compare(results, json.load(fbaseline), tolerance=args.tolerance)
+        for stage, scale, metric, before, after in regressions:
+            print("REGRESIÓN {:s} ({:s}) {:s}: {} -> {}".format(stage, scale, metric, before, after), file=sys.stderr)
+        sys.exit(1 if regressions else 0)
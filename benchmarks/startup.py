@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+from argparse import ArgumentParser
+from time import perf_counter
+
+current_path = os.path.dirname(os.path.realpath(__file__))
+root_path = os.path.dirname(current_path)
+
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+
+# Tiempo máximo (segundos) de cada orden de la línea de comandos
+BUDGETS = {
+    "help": 0.5,
+    "erdos": 1.0,
+}
+
+
+def prepare_data(data_path, n_authors, seed=0):
+    '''
+    Genera y almacena un grafo sintético con el mismo formato que la orden build
+
+    Returns
+    -------
+        source : str
+            identificador del autor de mayor grado (origen del número de Erdös)
+    '''
+    from benchmarks.synthetic import generate_authors_data
+    from modules.graphgen import build_graph, save_graph
+
+    graph = dict(build_graph(generate_authors_data(n_authors, seed=seed)))
+    save_graph(graph, data_path)
+
+    return max(graph.items(), key=lambda author: len(author[1]['pubs']))[0][10:]
+
+
+def time_command(arguments, repeat=5):
+    '''
+    Ejecuta la orden en un proceso nuevo (incluyendo el arranque del intérprete y las importaciones) y devuelve el menor
+    tiempo real de las ejecuciones
+    '''
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        subprocess.run([sys.executable, os.path.join(root_path, "graphmining.py")] + arguments, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(perf_counter() - start)
+
+    return min(times)
+
+
+def run(n_authors=4000, repeat=5, seed=0):
+    '''
+    Mide el tiempo de arranque de las órdenes rápidas de la línea de comandos
+
+    Returns
+    -------
+        results : dict
+            {orden: menor tiempo real (segundos)}
+    '''
+    with tempfile.TemporaryDirectory() as workdir:
+        data_path = os.path.join(workdir, 'data')
+        os.mkdir(data_path)
+        source = prepare_data(data_path, n_authors, seed=seed)
+
+        return {
+            "help": time_command(["--help"], repeat=repeat),
+            "erdos": time_command(["--data", data_path, "--results", os.path.join(workdir, 'results'), "erdos", source],
+                                  repeat=repeat),
+        }
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--authors", type=int, default=4000, help="Número de autores del grafo sintético")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Número de ejecuciones por orden")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Semilla del generador sintético")
+
+    args = arg_parser.parse_args()
+
+    results = run(n_authors=args.authors, repeat=args.repeat, seed=args.seed)
+    print(json.dumps(results, indent=2))
+
+    # Código de salida 1 si alguna orden supera su tiempo máximo
+    exceeded = [command for command, elapsed in results.items() if elapsed > BUDGETS[command]]
+    for command in exceeded:
+        print("LENTO {:s}: {:.3f} s (máximo {:.1f} s)".format(command, results[command], BUDGETS[command]), file=sys.stderr)
+    sys.exit(1 if exceeded else 0)
@@ -0,0 +1,238 @@
+import gzip
+import html
+import numpy as np
+
+# Afiliaciones sintéticas. Algunas no incluyen el país para ejercitar la propagación de afiliaciones del Scrapper
+AFFILIATIONS = [
+    "University of Castilla-La Mancha, Spain",
+    "UCLM, Albacete, Spain",
+    "University of Málaga, Spain",
+    "University of Málaga",
+    "Universidad Politécnica de Madrid, España",
+    "Universidad Politécnica de Madrid",
+    "University of Granada, Spain",
+    "Massachusetts Institute of Technology, USA",
+    "University of Oxford, UK",
+    "Tsinghua University, China",
+    None,
+]
+
+# Nombres con entidades del DTD para que el Decoder tenga trabajo real
+FIRST_NAMES = ["Jos&eacute;", "Mar&iacute;a", "Jes&uacute;s", "Ana", "Luis", "J&uuml;rgen", "Fran&ccedil;ois", "Wei", "John", "Luc&iacute;a"]
+LAST_NAMES = ["G&aacute;mez", "Mart&iacute;nez", "L&oacute;pez", "Puerta", "M&uuml;ller", "Smith", "Zhang", "Ib&aacute;&ntilde;ez", "Garc&iacute;a", "O&apos;Neil"]
+
+# Subconjunto de entidades del DTD de dblp empleadas por los nombres sintéticos
+DTD_ENTITIES = {
+    "eacute": "&#233;", "iacute": "&#237;", "uacute": "&#250;", "aacute": "&#225;", "oacute": "&#243;",
+    "uuml": "&#252;", "ccedil": "&#231;", "ntilde": "&#241;", "apos": "&#39;",
+}
+
+VENUES = ["journals/tkde", "journals/ai", "conf/icml", "conf/nips", "journals/pr", "conf/aaai", "journals/ijar", "conf/ecai"]
+
+
+def author_name(rng):
+    '''
+    Genera un nombre de autor aleatorio (con entidades HTML sin resolver)
+
+    Parameters
+    ----------
+        rng : np.random.RandomState
+            generador de números aleatorios
+
+    Returns
+    -------
+        name : str
+            nombre del autor
+    '''
+    return "{:s} {:s}".format(FIRST_NAMES[rng.randint(len(FIRST_NAMES))], LAST_NAMES[rng.randint(len(LAST_NAMES))])
+
+
+def generate_authors_data(n_authors, pubs_per_author=8, exponent=2.1, max_paper_size=12, seed=0):
+    '''
+    Genera un diccionario autor -> publicaciones con el mismo formato que el almacenado por el Crawler en 'authors_data.npy'.
+
+    La productividad de los autores sigue una distribución de Zipf (ley de potencias) y el número de autores por publicación
+    sigue una distribución geométrica truncada, de forma que el grafo resultante tiene una distribución de grado de cola pesada
+    como la de dblp. Los coautores de cada publicación se eligen de forma preferencial según su productividad.
+
+    Parameters
+    ----------
+        n_authors : int
+            número de autores
+
+        pubs_per_author : float
+            número medio de publicaciones por autor
+
+        exponent : float
+            exponente de la ley de potencias de la productividad
+
+        max_paper_size : int
+            número máximo de autores por publicación
+
+        seed : int
+            semilla del generador de números aleatorios
+
+    Returns
+    -------
+        authors_data : dict
+            {
+                'homepages/x/y': {
+                    'name': 'nombre del autor',
+                    'affiliation': 'afiliación del autor',
+                    'pubs': [publicacion1, publicacion2, ...],
+                    'years': [año1, año2, ...]
+                }...
+            }
+    '''
+    rng = np.random.RandomState(seed)
+
+    ids = ["homepages/{:d}/{:d}".format(i % 100, i) for i in range(n_authors)]
+
+    # Productividad (ley de potencias) normalizada como probabilidad de ser elegido como coautor
+    productivity = rng.zipf(exponent, size=n_authors).astype(np.float64)
+    productivity = np.minimum(productivity, n_authors)
+    prob = productivity / productivity.sum()
+
+    # Número de publicaciones y tamaño de cada una (geométrica truncada)
+    n_pubs = max(1, int(n_authors * pubs_per_author / 3))
+    sizes = np.minimum(rng.geometric(0.35, size=n_pubs) + 1, min(max_paper_size, n_authors))
+    years = rng.randint(1990, 2021, size=n_pubs)
+
+    pubs = {author: [] for author in ids}
+    pub_years = {author: [] for author in ids}
+    for i in range(n_pubs):
+        key = "{:s}/{:s}{:d}".format(VENUES[i % len(VENUES)], "P", i)
+        for author in rng.choice(n_authors, size=sizes[i], replace=False, p=prob):
+            pubs[ids[author]].append(key)
+            pub_years[ids[author]].append(int(years[i]))
+
+    affiliations = rng.randint(len(AFFILIATIONS), size=n_authors)
+
+    return {
+        author: {
+            'name': html.unescape(author_name(rng)),
+            'affiliation': AFFILIATIONS[affiliations[i]],
+            'pubs': pubs[author],
+            'years': pub_years[author],
+        }
+        for i, author in enumerate(ids)
+    }
+
+
+def publication_authors(authors_data):
+    '''
+    Autores de cada publicación, {publicación: [(identificador, nombre), ...]}, para generar las páginas personales con
+    todos los coautores de cada registro
+    '''
+    authors = {}
+    for author, props in authors_data.items():
+        for key in props['pubs']:
+            authors.setdefault(key, []).append((author, props['name']))
+    return authors
+
+
+def generate_person_xml(author, props, pub_authors=None):
+    '''
+    Genera la página personal en formato XML (como la devuelta por dblp.org/pid/x/y.xml) de un autor
+
+    Parameters
+    ----------
+        author : str
+            identificador del autor ('homepages/x/y')
+
+        props : dict
+            propiedades del autor (nombre, afiliación, publicaciones y años)
+
+        pub_authors : dict
+            autores de cada publicación (ver publication_authors). Si se indica, cada registro incluye a todos sus autores
+            con su 'pid', como en dblp; si no, sólo al propio autor
+
+    Returns
+    -------
+        page : bytes
+            página personal en formato XML
+    '''
+    pid = author[10:]
+    lines = ['<?xml version="1.0" encoding="US-ASCII"?>',
+             '<dblpperson name="{:s}" pid="{:s}" n="{:d}">'.format(props['name'], pid, len(props['pubs'])),
+             '<person key="{:s}" mdate="2020-01-01">'.format(author),
+             '<author pid="{:s}">{:s}</author>'.format(pid, props['name'])]
+    # Crawler.parse_XML espera que la página siempre incluya una nota en el registro 'person'
+    if props['affiliation'] is not None:
+        lines.append('<note type="affiliation">{:s}</note>'.format(props['affiliation']))
+    else:
+        lines.append('<note type="uname">{:s}</note>'.format(props['name']))
+    lines.append('</person>')
+    for key, year in zip(props['pubs'], props.get('years', [2000] * len(props['pubs']))):
+        tag, venue = ('article', 'journal') if key.startswith('journals') else ('inproceedings', 'booktitle')
+        authors = pub_authors[key] if pub_authors is not None else [(author, props['name'])]
+        lines.append('<r><{0:s} key="{1:s}" mdate="2020-01-01">{2:s}'
+                     '<title>Title of {1:s}.</title><year>{3:d}</year><{4:s}>{5:s}</{4:s}></{0:s}></r>'.format(
+                         tag, key, ''.join('<author pid="{:s}">{:s}</author>'.format(coauthor[10:], name) for coauthor, name in authors),
+                         year, venue, key.split('/')[1].upper()))
+    lines.append('</dblpperson>')
+
+    return '\n'.join(lines).encode('ascii', 'xmlcharrefreplace')
+
+
+def generate_dblp_xml(xml_path, dtd_path, n_authors, pubs_per_author=8, seed=0):
+    '''
+    Genera un volcado sintético de dblp (comprimido con gzip y codificado en ISO-8859-1) y su fichero DTD de transcripciones.
+
+    El volcado contiene un registro 'www' (página personal) por autor y un registro por publicación, con la misma estructura
+    que el fichero original, por lo que puede procesarse con el Decoder y el Scrapper.
+
+    Parameters
+    ----------
+        xml_path : str
+            directorio donde se almacena el volcado comprimido
+
+        dtd_path : str
+            directorio donde se almacena el fichero DTD
+
+        n_authors : int
+            número de autores
+
+        pubs_per_author : float
+            número medio de publicaciones por autor
+
+        seed : int
+            semilla del generador de números aleatorios
+
+    Returns
+    -------
+        authors_data : dict
+            datos de los autores empleados para generar el volcado (ver generate_authors_data)
+    '''
+    rng = np.random.RandomState(seed)
+    authors_data = generate_authors_data(n_authors, pubs_per_author=pubs_per_author, seed=seed)
+
+    with open(dtd_path, 'wt', encoding='ISO-8859-1') as dtd_file:
+        for name, content in DTD_ENTITIES.items():
+            dtd_file.write('<!ENTITY {:s} "{:s}" >\n'.format(name, content))
+
+    # Agrupamos los autores por publicación para escribir los registros de publicaciones
+    publications = {}
+    for author, props in authors_data.items():
+        for key, year in zip(props['pubs'], props['years']):
+            publications.setdefault(key, (year, []))[1].append(author)
+
+    with gzip.open(xml_path, mode='wt', encoding='ISO-8859-1', newline='\n') as xml_file:
+        xml_file.write('<?xml version="1.0" encoding="ISO-8859-1"?>\n')
+        xml_file.write('<!DOCTYPE dblp SYSTEM "dblp.dtd">\n')
+        xml_file.write('<dblp>\n')
+        for author, props in authors_data.items():
+            name = author_name(rng)
+            xml_file.write('<www mdate="2020-01-01" key="{:s}">\n<author>{:s}</author>\n<title>Home Page</title>\n'.format(author, name))
+            if props['affiliation'] is not None:
+                xml_file.write('<note type="affiliation">{:s}</note>\n'.format(props['affiliation']))
+            xml_file.write('</www>\n')
+        for key, (year, authors) in publications.items():
+            tag = 'article' if key.startswith('journals') else 'inproceedings'
+            xml_file.write('<{:s} mdate="2020-01-01" key="{:s}">\n'.format(tag, key))
+            for author in authors:
+                xml_file.write('<author>{:s}</author>\n'.format(author_name(rng)))
+            xml_file.write('<title>Title of {:s}.</title>\n<year>{:d}</year>\n</{:s}>\n'.format(key, year, tag))
+        xml_file.write('</dblp>\n')
+
+    return authors_data
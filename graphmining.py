@@ -0,0 +1,665 @@
+import os
+import sys
+import csv
+from argparse import ArgumentParser
+
+# Directorio actual
+current_path = os.path.dirname(os.path.realpath(__file__))
+
+# Las dependencias pesadas (networkx, pandas, scipy, lxml...) se importan dentro de cada subcomando, de forma que
+# cada orden sólo paga el coste de importación de lo que realmente utiliza
+
+
+def download(args):
+    '''
+    Descarga el volcado de dblp y lo decodifica a UTF-8
+    '''
+    from modules.scripts import load_script
+    from modules.decoder import Decoder
+
+    if not os.path.exists(args.files):
+        os.mkdir(args.files)
+
+    xml_path, dtd_path = load_script(1).download_file(args.files)
+    Decoder(xml_path, os.path.join(args.files, 'decoded-dblp.xml'), dtd_path).recode_file()
+
+
+def scrape(args):
+    '''
+    Obtiene los identificadores de los autores del fichero XML decodificado. Todas las máscaras indicadas (o todas las del
+    registro con --all-masks) se evalúan en un único recorrido del fichero
+    '''
+    from modules.scrapper import Scrapper, MaskRegistry
+
+    scrapper = Scrapper(MaskRegistry.from_file(args.masks_file) if args.masks_file is not None else None)
+
+    if args.all_masks:
+        authors_ids = scrapper.scrape_masks(xml_path=args.xml_path)
+    elif args.mask:
+        authors_ids = scrapper.scrape_masks(xml_path=args.xml_path, masks=args.mask)
+    else:
+        authors_ids = {None: scrapper.scrape(xml_path=args.xml_path)}
+
+    if not os.path.exists(args.data):
+        os.mkdir(args.data)
+
+    for mask, ids in authors_ids.items():
+        filename = os.path.join(args.data, "{:s}-ids.txt".format(mask) if mask is not None else "full-db-ids.txt")
+        with open(filename, 'w') as fids:
+            fids.write("\n".join(ids))
+
+        print("Se han almacenado {:d} identificadores en {:s}".format(len(ids), filename))
+
+
+def index(args):
+    '''
+    Indexa los registros del fichero XML decodificado (posición en bytes de cada uno) y muestra los indicados
+    '''
+    from modules import xmlindex
+
+    xml_path = args.xml_path
+    if args.compress is not None:
+        xml_path = xmlindex.compress_blocked(xml_path, args.compress)
+
+    index = xmlindex.load_index(xml_path)
+    print("{:d} registros indexados en {:s}".format(len(index), xmlindex.index_path(xml_path)))
+
+    for key in args.key:
+        raw = index.raw(key)
+        print(raw.decode('utf-8') if raw is not None else "No se ha encontrado el registro {:s}".format(key))
+
+
+def crawl(args):
+    '''
+    Descarga las páginas de los autores y almacena sus publicaciones
+    '''
+    import json
+    from tqdm import tqdm
+    from modules.crawler import Crawler
+    from modules.authors import AuthorStore, STORE_NAME
+    from modules.instrumentation import stage
+
+    crawler = Crawler()
+    authors_data = {}
+
+    seeds = list(args.seeds or [])
+    if args.seeds_file is not None:
+        with open(args.seeds_file) as seeds_file:
+            seeds.extend(seed[10:] if seed.startswith('homepages/') else seed for seed in seeds_file.read().splitlines() if seed)
+
+    if seeds:
+        # Descarga en bola de nieve: los coautores de cada página descargada forman la frontera
+        name = 'crawler.snowball'
+        pages = ((author, props) for author, props, _ in crawler.snowball(['homepages/' + seed for seed in seeds],
+                                                                           hops=args.hops, budget=args.budget))
+    else:
+        if args.mask is not None:
+            from modules.scrapper import MaskRegistry
+
+            # Máscaras del registro (predefinidas y, si se indica, las del fichero de configuración usado en scrape)
+            registry = MaskRegistry.from_file(args.masks_file) if args.masks_file is not None else MaskRegistry()
+            if args.mask not in registry:
+                sys.exit("Máscara desconocida: {:s} (disponibles: {:s})".format(args.mask, ', '.join(registry.names)))
+
+        filename = os.path.join(args.data, "{:s}-ids.txt".format(args.mask) if args.mask is not None else "full-db-ids.txt")
+        with open(filename) as data_file:
+            data = data_file.read().splitlines()
+
+        name = 'crawler.crawl'
+        pages = (crawler.crawl(id) for id in data)
+
+    # Con --stream cada autor se añade a un fichero JSON lines según se descarga (sin acumularlos en memoria)
+    fstream = open(os.path.join(args.data, 'authors_data.jsonl'), 'at', encoding='utf-8') if args.stream else None
+
+    with stage(name) as st:
+        for author, props in tqdm(pages, desc="Procesando investigadores"):
+            # None si HTTP404
+            if props is not None:
+                if fstream is not None:
+                    fstream.write(json.dumps(dict(props, id=author)) + '\n')
+                else:
+                    authors_data[author] = props
+            st.add()
+
+    if fstream is not None:
+        fstream.close()
+    else:
+        AuthorStore.from_authors(authors_data.items()).save(os.path.join(args.data, STORE_NAME))
+
+
+def build(args):
+    '''
+    Genera el grafo de colaboración (diccionario y versión compacta) a partir de los datos de los autores
+    '''
+    from modules.authors import load_authors, STORE_NAME
+
+    # Construcción en memoria externa: sólo se genera la versión compacta del grafo
+    if args.external:
+        from modules.external import build_graph_external, iter_authors
+
+        authors_path = os.path.join(args.data, 'authors_data.jsonl')
+        if not os.path.exists(authors_path):
+            authors_path = os.path.join(args.data, STORE_NAME)
+        if not os.path.exists(authors_path):
+            authors_path = os.path.join(args.data, 'authors_data.npy')
+
+        build_graph_external(iter_authors(authors_path), os.path.join(args.data, 'colab_graph'),
+                             memory_budget=args.memory << 20, workdir=args.workdir)
+        print("Se ha almacenado el grafo generado en {:s}".format(os.path.join(args.data, 'colab_graph')))
+        return
+
+    from modules.graphgen import build_graph, save_graph
+
+    authors_data = load_authors(args.data)
+    save_graph(dict(build_graph(authors_data)), args.data)
+
+    print("Se ha almacenado el grafo generado en {:s}".format(os.path.join(args.data, 'colab_graph.npy')))
+
+
+def run_script(number):
+    '''
+    Devuelve un subcomando que ejecuta el bloque principal de uno de los scripts de análisis numerados. Los directorios de
+    datos y resultados (--data, --results) se pasan al script en las variables de entorno GRAPHMINING_DATA y
+    GRAPHMINING_RESULTS
+    '''
+    def run(args):
+        import glob
+        import runpy
+
+        if not os.path.exists(args.results):
+            os.makedirs(args.results)
+
+        os.environ['GRAPHMINING_DATA'] = args.data
+        os.environ['GRAPHMINING_RESULTS'] = args.results
+
+        path = sorted(glob.glob(os.path.join(current_path, "{:d}. *.py".format(number))))[0]
+        sys.argv = [path]
+        runpy.run_path(path, run_name="__main__")
+
+    return run
+
+
+def write_csv(path, columns, rows):
+    '''
+    Exporta las filas a CSV separado por ';' con el módulo csv (sin importar pandas)
+    '''
+    with open(path, 'wt', newline='', encoding='utf-8') as fcsv:
+        writer = csv.writer(fcsv, delimiter=';', lineterminator='\n')
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+    print("Se han exportado los resultados en: {:s}".format(path))
+
+
+def erdos(args):
+    '''
+    Número de Erdös (distancia colaborativa) de todos los autores respecto al autor indicado. Si existe la versión compacta
+    del grafo se proyecta en memoria y se recorre por niveles, sin cargar el grafo completo en formato diccionario. Con
+    --length la distancia se pondera por el número de publicaciones compartidas (ver modules/paths.py)
+    '''
+    import numpy as np
+
+    author = "homepages/" + args.id
+    compact_path = os.path.join(args.data, 'colab_graph')
+
+    if os.path.isdir(compact_path):
+        from modules.compact import CompactGraph
+
+        compact = CompactGraph.load(compact_path)
+        ids = np.asarray(compact.ids)
+        source = np.flatnonzero(ids == author)
+        if len(source) == 0:
+            sys.exit("No se ha encontrado el autor {:s}".format(args.id))
+
+        if args.length is not None:
+            # Distancia ponderada por el número de publicaciones compartidas
+            from modules.paths import erdos as weighted_erdos
+
+            distances = weighted_erdos(compact, int(source[0]), length=args.length)
+            reached = np.flatnonzero(np.isfinite(distances))
+        else:
+            distances = compact.distances(int(source[0]))
+            reached = np.flatnonzero(distances >= 0)
+        reached = reached[np.argsort(distances[reached], kind='stable')]
+        rows = ((id[10:], name, affiliation or None, no, 'dblp.org/pid/{:s}'.format(id[10:]))
+                for id, name, affiliation, no in zip(ids[reached].tolist(), np.asarray(compact.names)[reached].tolist(),
+                                                     np.asarray(compact.affiliations)[reached].tolist(),
+                                                     distances[reached].tolist()))
+    else:
+        from modules.scripts import load_script
+
+        if args.length is not None:
+            sys.exit("La distancia ponderada requiere el grafo compacto")
+
+        graph = np.load(os.path.join(args.data, 'colab_graph.npy'), allow_pickle=True).item()
+        if author not in graph:
+            sys.exit("No se ha encontrado el autor {:s}".format(args.id))
+
+        erdos = load_script(5).calculate_erdos(args.id, graph)
+        rows = ((id[10:], graph[id]['name'], graph[id]['affiliation'], no, 'dblp.org/pid/{:s}'.format(id[10:]))
+                for id, no in sorted(erdos.items(), key=lambda author: author[1]))
+
+    if not os.path.exists(args.results):
+        os.mkdir(args.results)
+
+    write_csv(os.path.join(args.results, 'erdos.csv'), ["id", "name", "affiliation", "number", "link"], rows)
+
+
+def separation(args):
+    '''
+    Grados de separación (distancia media y diámetro efectivo) del grafo compacto aproximados con HyperANF
+    '''
+    from modules.compact import CompactGraph
+    from modules import hyperanf
+
+    registers = hyperanf.registers_for(args.error) if args.error is not None else args.registers
+    result = hyperanf.separation(CompactGraph.load(os.path.join(args.data, 'colab_graph')), registers=registers, runs=args.runs)
+
+    for metric, value in result.items():
+        print("{:<25s} {}".format(metric, value))
+
+
+def walks(args):
+    '''
+    Rutas aleatorias ponderadas (node2vec) desde cada autor, almacenadas para entrenar representaciones de los autores
+    (con --embed se entrenan con skip-gram, si gensim está instalado)
+    '''
+    import numpy as np
+    from modules.compact import CompactGraph
+    from modules.walks import write_walks, train_embeddings
+
+    compact = CompactGraph.load(os.path.join(args.data, 'colab_graph'))
+    walks_path = os.path.join(args.data, 'walks.npy')
+
+    total = write_walks(compact, walks_path, walks_per_node=args.walks, length=args.length, p=args.p, q=args.q, n_jobs=args.jobs)
+    print("Se han almacenado {:d} rutas en {:s}".format(total, walks_path))
+
+    if args.embed:
+        embeddings_path = os.path.join(args.data, 'embeddings.npy')
+        np.save(embeddings_path, train_embeddings(compact, walks_path, dimensions=args.dimensions, window=args.window, n_jobs=args.jobs))
+        print("Se han almacenado las representaciones de los autores en {:s}".format(embeddings_path))
+
+
+def pack(args):
+    '''
+    Comprime el grafo compacto para archivarlo o transferirlo (o lo descomprime con --unpack)
+    '''
+    from modules.compact import CompactGraph
+    from modules.packed import PackedGraph
+
+    compact_path = os.path.join(args.data, 'colab_graph')
+    output = args.output or os.path.join(args.data, 'colab_graph.packed')
+
+    if args.unpack:
+        PackedGraph.load(output).to_compact().save(compact_path)
+        print("Se ha descomprimido el grafo en {:s}".format(compact_path))
+        return
+
+    compact = CompactGraph.load(compact_path)
+    packed = PackedGraph.from_compact(compact)
+    packed.save(output)
+    print("Se ha almacenado el grafo comprimido en {:s} ({:.2f} bytes/arista)".format(output, packed.nbytes() / max(len(compact.indices), 1)))
+
+
+def similar(args):
+    '''
+    Autores cuya producción más se solapa con la de los indicados y posibles perfiles duplicados (índice MinHash/LSH sobre
+    sus publicaciones, que se reconstruye cuando cambian los datos de los autores)
+    '''
+    from modules.authors import AuthorStore, load_authors
+    from modules.minhash import load_index, duplicates
+
+    store = load_authors(args.data)
+    if not isinstance(store, AuthorStore):
+        store = AuthorStore.from_authors(store.items())
+
+    index = load_index(args.data, store=store)
+
+    for id in args.id:
+        print(id)
+        for author, similarity in index.similar("homepages/" + id, k=args.k):
+            print("    {:<30s} {:.3f}".format(author[10:], similarity))
+
+    if args.duplicates is not None:
+        for u, v, jaccard in duplicates(index, store, threshold=args.duplicates):
+            print("{:<30s} {:<30s} {:.3f}".format(u[10:], v[10:], jaccard))
+
+
+def ego(args):
+    '''
+    Redes ego de los autores indicados exportadas a un fichero por autor (con la distancia de cada coautor al autor)
+    '''
+    from modules.compact import CompactGraph
+    from modules.ego import ego_networks
+    from modules.export import export_graph
+
+    compact = CompactGraph.load(os.path.join(args.data, 'colab_graph'))
+
+    ids = list(args.id)
+    if args.ids_file is not None:
+        with open(args.ids_file) as ids_file:
+            ids.extend(id[10:] if id.startswith('homepages/') else id for id in ids_file.read().splitlines() if id)
+
+    missing = [id for id in ids if 'homepages/' + id not in compact.index]
+    if missing:
+        sys.exit("No se han encontrado los autores: {:s}".format(', '.join(missing)))
+
+    output = os.path.join(args.results, 'ego')
+    if not os.path.exists(output):
+        os.makedirs(output)
+
+    egos = ego_networks(compact, ['homepages/' + id for id in ids], radius=args.radius, n_jobs=args.jobs)
+    for id, network in zip(ids, egos):
+        path = os.path.join(output, id.replace('/', '-') + ('.' + args.format if args.format in ('gexf', 'graphml') else ''))
+        export_graph(network, path, format=args.format)
+
+    print("Se han exportado {:d} redes ego en: {:s}".format(len(egos), output))
+
+
+def centrality(args):
+    '''
+    Centralidades espectrales (vector propio, Katz y HITS) de todos los autores sobre el grafo compacto, partiendo de los
+    vectores de la versión anterior del grafo
+    '''
+    import numpy as np
+    from modules.compact import CompactGraph
+    from modules import centrality as engine
+
+    compact_path = os.path.join(args.data, 'colab_graph')
+    compact = CompactGraph.load(compact_path)
+    results = engine.centralities(compact, measures=args.measures, path=compact_path, weighted=not args.unweighted,
+                                  tol=args.tol, method=args.method, warm=not args.cold)
+
+    if not os.path.exists(args.results):
+        os.mkdir(args.results)
+
+    ids, names, affiliations = np.asarray(compact.ids), np.asarray(compact.names), np.asarray(compact.affiliations)
+    for measure, values in results.items():
+        order = np.argsort(-values, kind='stable')
+        rows = ((id[10:], name, affiliation or None, value, 'dblp.org/pid/{:s}'.format(id[10:]))
+                for id, name, affiliation, value in zip(ids[order].tolist(), names[order].tolist(),
+                                                        affiliations[order].tolist(), values[order].tolist()))
+        write_csv(os.path.join(args.results, measure + '.csv'), ['id', 'name', 'affiliation', measure, 'link'], rows)
+
+
+def paths(args):
+    '''
+    Cercanía e intermediación de todos los autores con caminos mínimos ponderados por el número de publicaciones
+    compartidas, repartiendo las búsquedas desde cada autor entre varios procesos
+    '''
+    import numpy as np
+    from modules.compact import CompactGraph
+    from modules import paths as engine
+
+    compact = CompactGraph.load(os.path.join(args.data, 'colab_graph'))
+    functions = {
+        'closeness': lambda: engine.closeness(compact, length=args.length, n_jobs=args.jobs),
+        'betweenness': lambda: engine.betweenness(compact, length=args.length, k=args.samples, n_jobs=args.jobs),
+    }
+
+    if not os.path.exists(args.results):
+        os.mkdir(args.results)
+
+    ids, names, affiliations = np.asarray(compact.ids), np.asarray(compact.names), np.asarray(compact.affiliations)
+    for measure in args.measures:
+        values = functions[measure]()
+        order = np.argsort(-values, kind='stable')
+        rows = ((id[10:], name, affiliation or None, value, 'dblp.org/pid/{:s}'.format(id[10:]))
+                for id, name, affiliation, value in zip(ids[order].tolist(), names[order].tolist(),
+                                                        affiliations[order].tolist(), values[order].tolist()))
+        write_csv(os.path.join(args.results, 'weighted-' + measure + '.csv'), ['id', 'name', 'affiliation', measure, 'link'], rows)
+
+
+def coordinator(args):
+    '''
+    Coordinador de una ejecución distribuida: reparte por TCP lotes de autores de origen entre los trabajadores (que
+    cargan el mismo grafo compacto) y exporta el resultado. Con --local se lanzan también trabajadores en esta máquina.
+    Para escuchar en una dirección que no sea local se debe definir la clave compartida en GRAPHMINING_AUTHKEY
+    '''
+    import numpy as np
+    from modules.compact import CompactGraph
+    from modules import distributed
+
+    compact_path = os.path.join(args.data, 'colab_graph')
+    compact = CompactGraph.load(compact_path)
+
+    if args.id:
+        missing = [id for id in args.id if 'homepages/' + id not in compact.index]
+        if missing:
+            sys.exit("No se han encontrado los autores: {:s}".format(', '.join(missing)))
+        sources = np.array([compact.index['homepages/' + id] for id in args.id])
+    elif args.task == 'erdos':
+        sys.exit("El número de Erdös requiere los autores de origen")
+    else:
+        sources = distributed.select_sources(compact.n, args.samples)
+
+    params = {'radius': args.radius}
+    if args.length is not None:
+        params['length'] = args.length
+
+    try:
+        server = distributed.Coordinator(compact_path, args.task, sources, compact.n, params=params,
+                                         address=distributed.parse_address(args.address), block_size=args.block_size,
+                                         lease=args.lease, max_retries=args.retries)
+    except ValueError as error:
+        sys.exit(str(error))
+    print("Coordinador escuchando en {:s}:{:d}".format(*server.address))
+
+    workers = distributed.start_workers(server, args.local)
+    try:
+        result = server.run()
+    finally:
+        server.close()
+        distributed.stop_workers(workers)
+
+    if not os.path.exists(args.results):
+        os.mkdir(args.results)
+
+    ids, names, affiliations = np.asarray(compact.ids), np.asarray(compact.names), np.asarray(compact.affiliations)
+    path = os.path.join(args.results, 'distributed-' + args.task + '.csv')
+    if args.task == 'ego':
+        rows = ((ids[source][10:], names[source], affiliations[source] or None, len(nodes), m, 'dblp.org/pid/{:s}'.format(ids[source][10:]))
+                for source, (nodes, m) in sorted(result.items()))
+        write_csv(path, ['id', 'name', 'affiliation', 'authors', 'collaborations', 'link'], rows)
+        return
+
+    if args.task == 'erdos':
+        order = np.flatnonzero(np.isfinite(result))
+        order = order[np.argsort(result[order], kind='stable')]
+    else:
+        order = np.argsort(-result, kind='stable')
+    rows = ((id[10:], name, affiliation or None, value, 'dblp.org/pid/{:s}'.format(id[10:]))
+            for id, name, affiliation, value in zip(ids[order].tolist(), names[order].tolist(),
+                                                    affiliations[order].tolist(), result[order].tolist()))
+    write_csv(path, ['id', 'name', 'affiliation', 'number' if args.task == 'erdos' else args.task, 'link'], rows)
+
+
+def worker(args):
+    '''
+    Trabajador de una ejecución distribuida: procesa los lotes del coordinador hasta que termina (con la clave compartida
+    de GRAPHMINING_AUTHKEY)
+    '''
+    from modules import distributed
+
+    try:
+        done = distributed.work(distributed.parse_address(args.address))
+    except ValueError as error:
+        sys.exit(str(error))
+    print("Lotes procesados: {:d}".format(done))
+
+
+def pagerank(args):
+    '''
+    Valor de PageRank de todos los autores
+    '''
+    import numpy as np
+
+    compact_path = os.path.join(args.data, 'colab_graph')
+
+    if os.path.isdir(compact_path):
+        # Sobre el grafo compacto se parte del vector de la versión anterior del grafo y se almacena el nuevo
+        from modules.compact import CompactGraph
+        from modules import pagerank as engine
+
+        compact = CompactGraph.load(compact_path)
+        values = engine.pagerank(compact, compact_path, d=args.d, tol=args.tol, local=args.local, warm=not args.cold)
+        order = np.argsort(-values, kind='stable')
+        rows = ((id[10:], name, affiliation or None, pr, 'dblp.org/pid/{:s}'.format(id[10:]))
+                for id, name, affiliation, pr in zip(np.asarray(compact.ids)[order].tolist(), np.asarray(compact.names)[order].tolist(),
+                                                     np.asarray(compact.affiliations)[order].tolist(), values[order].tolist()))
+    else:
+        from modules.scripts import load_script
+
+        graph = np.load(os.path.join(args.data, 'colab_graph.npy'), allow_pickle=True).item()
+        pagerank = load_script(6).pagerank(graph, d=args.d, alpha=args.alpha)
+        rows = ((author[10:], props['name'], props['affiliation'], props['pr'], 'dblp.org/pid/{:s}'.format(author[10:]))
+                for author, props in sorted(pagerank.items(), reverse=True, key=lambda author_pr: author_pr[1]['pr']))
+
+    if not os.path.exists(args.results):
+        os.mkdir(args.results)
+
+    write_csv(os.path.join(args.results, 'pagerank.csv'), ['id', 'name', 'affiliation', 'pr', 'link'], rows)
+
+
+def make_parser():
+    '''
+    Construye el analizador de argumentos con un subcomando por cada etapa del proceso
+    '''
+    arg_parser = ArgumentParser(description="Minería del grafo de colaboración de dblp")
+
+    # Obtención de los argumentos comunes
+    arg_parser.add_argument("--data", default=os.path.join(current_path, 'data'), help="Directorio de datos")
+    arg_parser.add_argument("--results", default=os.path.join(current_path, 'results'), help="Directorio de resultados")
+    arg_parser.add_argument("--files", default=os.path.join(current_path, 'files'), help="Directorio de los ficheros descargados")
+
+    subparsers = arg_parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    parser = subparsers.add_parser("download", help="Descarga y decodifica el volcado de dblp")
+    parser.set_defaults(function=download)
+
+    parser = subparsers.add_parser("scrape", help="Obtiene los identificadores de los autores del XML decodificado")
+    parser.add_argument("xml_path", help="Ubicación del fichero XML decodificado (descomprimido)", type=str)
+    parser.add_argument("--mask", nargs="+", default=None, help="Máscaras a aplicar (opcional, por ejemplo spain uclm)")
+    parser.add_argument("--masks-file", default=None, help="Fichero JSON con máscaras adicionales {nombre: expresión regular}")
+    parser.add_argument("--all-masks", action="store_true", help="Aplicar todas las máscaras del registro")
+    parser.set_defaults(function=scrape)
+
+    parser = subparsers.add_parser("index", help="Indexa los registros del XML decodificado para acceder a ellos individualmente")
+    parser.add_argument("xml_path", help="Ubicación del fichero XML decodificado (sin comprimir o comprimido por bloques)", type=str)
+    parser.add_argument("--compress", default=None, help="Comprimir por bloques el fichero en la ruta indicada e indexar el resultado")
+    parser.add_argument("--key", nargs="*", default=[], help="Claves de los registros a mostrar")
+    parser.set_defaults(function=index)
+
+    parser = subparsers.add_parser("crawl", help="Descarga los datos de los autores")
+    parser.add_argument("--mask", default=None, help="Máscara del registro que se ha aplicado para obtener los IDs")
+    parser.add_argument("--masks-file", default=None, help="Fichero JSON con máscaras adicionales (el mismo que en scrape)")
+    parser.add_argument("--stream", action="store_true", help="Almacenar los autores en JSON lines según se descargan")
+    parser.add_argument("--seeds", nargs="*", default=None, help="IDs de los autores semilla (descarga en bola de nieve, sin el volcado)")
+    parser.add_argument("--seeds-file", default=None, help="Fichero con los IDs de los autores semilla (uno por línea)")
+    parser.add_argument("--hops", type=int, default=2, help="Distancia máxima a las semillas en la descarga en bola de nieve")
+    parser.add_argument("--budget", type=int, default=None, help="Número máximo de páginas en la descarga en bola de nieve")
+    parser.set_defaults(function=crawl)
+
+    parser = subparsers.add_parser("build", help="Genera el grafo de colaboración")
+    parser.add_argument("--external", action="store_true", help="Construcción en memoria externa (sólo el grafo compacto)")
+    parser.add_argument("--memory", type=int, default=1024, help="Memoria máxima en memoria externa (MB)")
+    parser.add_argument("--workdir", default=None, help="Directorio de los ficheros temporales en memoria externa")
+    parser.set_defaults(function=build)
+
+    parser = subparsers.add_parser("metrics", help="Métricas sobre el grafo (script 2)")
+    parser.set_defaults(function=run_script(2))
+
+    parser = subparsers.add_parser("louvain", help="Detección de comunidades con el método de Louvain (script 3)")
+    parser.set_defaults(function=run_script(3))
+
+    parser = subparsers.add_parser("cliques", help="Detección de cliques de la UCLM (script 4)")
+    parser.set_defaults(function=run_script(4))
+
+    parser = subparsers.add_parser("erdos", help="Número de Erdös respecto a un autor")
+    parser.add_argument("id", help="ID del autor a partir del cual se calcula la distancia colaborativa", type=str)
+    parser.add_argument("--length", default=None, choices=["inverse", "log"], help="Distancia ponderada (1 / peso o -log del peso normalizado)")
+    parser.set_defaults(function=erdos)
+
+    parser = subparsers.add_parser("separation", help="Distancia media y diámetro efectivo aproximados (HyperANF)")
+    parser.add_argument("--registers", type=int, default=64, help="Registros de cada contador HyperLogLog (potencia de 2)")
+    parser.add_argument("--error", type=float, default=None, help="Error relativo por nodo deseado (determina los registros)")
+    parser.add_argument("--runs", type=int, default=3, help="Número de ejecuciones independientes")
+    parser.set_defaults(function=separation)
+
+    parser = subparsers.add_parser("walks", help="Rutas aleatorias (node2vec) y representaciones de los autores")
+    parser.add_argument("--walks", type=int, default=10, help="Número de rutas desde cada autor")
+    parser.add_argument("--length", type=int, default=80, help="Número de autores de cada ruta")
+    parser.add_argument("-p", type=float, default=1.0, help="Parámetro de retorno de node2vec")
+    parser.add_argument("-q", type=float, default=1.0, help="Parámetro de entrada-salida de node2vec")
+    parser.add_argument("--jobs", type=int, default=1, help="Número de procesos")
+    parser.add_argument("--embed", action="store_true", help="Entrenar las representaciones con skip-gram (requiere gensim)")
+    parser.add_argument("--dimensions", type=int, default=128, help="Dimensión de las representaciones")
+    parser.add_argument("--window", type=int, default=10, help="Tamaño de la ventana de skip-gram")
+    parser.set_defaults(function=walks)
+
+    parser = subparsers.add_parser("pack", help="Comprime el grafo compacto para archivarlo o transferirlo")
+    parser.add_argument("--output", default=None, help="Directorio del grafo comprimido (por defecto, colab_graph.packed)")
+    parser.add_argument("--unpack", action="store_true", help="Descomprimir el grafo en el directorio de datos")
+    parser.set_defaults(function=pack)
+
+    parser = subparsers.add_parser("similar", help="Autores con publicaciones más solapadas y perfiles duplicados (MinHash/LSH)")
+    parser.add_argument("id", nargs="*", help="IDs de los autores de los que buscar los más similares", type=str)
+    parser.add_argument("-k", type=int, default=10, help="Número de autores similares")
+    parser.add_argument("--duplicates", type=float, default=None, help="Mostrar los pares con similitud de Jaccard mayor o igual")
+    parser.set_defaults(function=similar)
+
+    parser = subparsers.add_parser("ego", help="Redes ego de los autores")
+    parser.add_argument("id", nargs="*", help="IDs de los autores", type=str)
+    parser.add_argument("--ids-file", default=None, help="Fichero con los IDs de los autores (uno por línea)")
+    parser.add_argument("--radius", type=int, default=1, help="Distancia máxima al autor")
+    parser.add_argument("--format", default="gexf", choices=["gexf", "graphml", "csv", "parquet"], help="Formato de exportación")
+    parser.add_argument("--jobs", type=int, default=1, help="Número de procesos")
+    parser.set_defaults(function=ego)
+
+    parser = subparsers.add_parser("centrality", help="Centralidad de vector propio, Katz y HITS de los autores")
+    parser.add_argument("--measures", nargs="+", default=["eigenvector", "katz", "hits"], choices=["eigenvector", "katz", "hits"], help="Medidas")
+    parser.add_argument("--method", default="power", choices=["power", "krylov"], help="Iteración de potencias o métodos de Krylov (ARPACK)")
+    parser.add_argument("--tol", type=float, default=1e-6, help="Tolerancia")
+    parser.add_argument("--unweighted", action="store_true", help="Ignorar el número de publicaciones compartidas")
+    parser.add_argument("--cold", action="store_true", help="No partir de los vectores de la versión anterior del grafo")
+    parser.set_defaults(function=centrality)
+
+    parser = subparsers.add_parser("paths", help="Cercanía e intermediación con caminos ponderados por el número de publicaciones")
+    parser.add_argument("--measures", nargs="+", default=["closeness", "betweenness"], choices=["closeness", "betweenness"], help="Medidas")
+    parser.add_argument("--length", default="inverse", choices=["inverse", "log", "hops"], help="Longitud de las aristas (1 / peso, -log del peso normalizado o 1)")
+    parser.add_argument("--samples", type=int, default=None, help="Orígenes de la estimación de la intermediación (por defecto, todos)")
+    parser.add_argument("--jobs", type=int, default=1, help="Número de procesos")
+    parser.set_defaults(function=paths)
+
+    parser = subparsers.add_parser("coordinator", help="Coordinador de una ejecución distribuida entre varios procesos o máquinas")
+    parser.add_argument("task", choices=["closeness", "betweenness", "erdos", "ego"], help="Tarea")
+    parser.add_argument("id", nargs="*", help="IDs de los autores de origen (por defecto, todos)", type=str)
+    parser.add_argument("--address", default="127.0.0.1:5100", help="Dirección donde escucha el coordinador (host:puerto, con GRAPHMINING_AUTHKEY si no es local)")
+    parser.add_argument("--local", type=int, default=0, help="Número de trabajadores a lanzar en esta máquina")
+    parser.add_argument("--samples", type=int, default=None, help="Número de orígenes elegidos al azar (por defecto, todos)")
+    parser.add_argument("--length", default=None, choices=["inverse", "log", "hops"], help="Longitud de las aristas")
+    parser.add_argument("--radius", type=int, default=1, help="Distancia máxima al autor de las redes ego")
+    parser.add_argument("--block-size", type=int, default=64, help="Número de orígenes de cada lote")
+    parser.add_argument("--lease", type=float, default=300.0, help="Segundos sin devolver un lote ni renovar su cesión antes de reasignarlo")
+    parser.add_argument("--retries", type=int, default=3, help="Número máximo de asignaciones de un lote")
+    parser.set_defaults(function=coordinator)
+
+    parser = subparsers.add_parser("worker", help="Trabajador de una ejecución distribuida")
+    parser.add_argument("address", help="Dirección del coordinador (host:puerto)")
+    parser.set_defaults(function=worker)
+
+    parser = subparsers.add_parser("pagerank", help="PageRank de los autores")
+    parser.add_argument("-d", type=float, default=0.85, help="Factor de amortiguamiento")
+    parser.add_argument("--alpha", type=float, default=0.0005, help="Cambio medio mínimo para considerar que no ha convergido (grafo en diccionario)")
+    parser.add_argument("--tol", type=float, default=1e-6, help="Tolerancia (norma L1) sobre el grafo compacto")
+    parser.add_argument("--local", action="store_true", help="Actualizar el vector anterior con empujes locales")
+    parser.add_argument("--cold", action="store_true", help="No partir del vector de la versión anterior del grafo")
+    parser.set_defaults(function=pagerank)
+
+    return arg_parser
+
+
+if __name__ == "__main__":
+    args = make_parser().parse_args()
+    args.function(args)
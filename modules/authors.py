@@ -0,0 +1,306 @@
+import os
+import argparse
+import numpy as np
+from array import array
+from collections.abc import Mapping
+
+try:
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from scripts import data_dir
+
+# Nombre del directorio (dentro del directorio de datos) con los datos de los autores en formato columnar
+STORE_NAME = 'authors_data'
+
+# Tablas de cadenas del almacén
+STRING_TABLES = ('ids', 'names', 'affiliations', 'pub_keys', 'venues')
+
+
+class StringTable:
+    '''
+    Tabla de cadenas codificadas en UTF-8 y concatenadas en un único vector de bytes, con la posición de inicio de cada una
+    (como el CSR del grafo compacto). Ocupa lo mismo que el texto, frente a los vectores de ancho fijo de numpy o los
+    objetos str de Python, y se puede proyectar en memoria
+
+    Parameters
+    ----------
+        data : np.ndarray
+            bytes de todas las cadenas (uint8)
+
+        offsets : np.ndarray
+            posición de inicio de cada cadena en data (int64), con la longitud total al final
+    '''
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        '''
+        Construye la tabla a partir de una lista de cadenas (None se almacena como cadena vacía)
+        '''
+        encoded = [(string or '').encode('utf-8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def tolist(self):
+        '''
+        Todas las cadenas de la tabla
+        '''
+        data, offsets = self.data.tobytes(), self.offsets.tolist()
+        return [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def save(self, path, name):
+        np.save(os.path.join(path, name + '.npy'), self.data)
+        np.save(os.path.join(path, name + '_ptr.npy'), self.offsets)
+
+    @classmethod
+    def load(cls, path, name, mmap_mode='r'):
+        return cls(np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode),
+                   np.load(os.path.join(path, name + '_ptr.npy'), mmap_mode=mmap_mode))
+
+
+class AuthorStore(Mapping):
+    '''
+    Datos de los autores (los descargados por el Crawler) en formato columnar. Las claves de las publicaciones se internan
+    (cada una se almacena una vez y se identifica por un entero) y las publicaciones de cada autor se almacenan como CSR:
+
+        pub_ptr : posición de inicio de las publicaciones de cada autor en pubs (int64)
+        pubs : identificador de cada publicación de cada autor (int32)
+        pub_years : año de cada publicación (int16, 0 si no consta; sólo si los datos incluyen el año)
+        pub_venues : revista o congreso de cada publicación (int32, posición en venues, -1 si no consta)
+
+    y los identificadores, nombres, afiliaciones, claves de publicación y revistas en tablas de cadenas (ver StringTable).
+
+    Se comporta como el diccionario que almacenaba el Crawler en 'authors_data.npy' ({autor: {'name', 'affiliation',
+    'pubs', 'years', 'venues'}}), construyendo las propiedades de cada autor al acceder a ellas, por lo que se puede pasar
+    directamente a build_graph. Con interned=True (por defecto) 'pubs' contiene los identificadores enteros de las
+    publicaciones en lugar de sus claves: para construir el grafo sólo importa qué publicaciones comparten los autores,
+    y comparar enteros es más rápido y ocupa menos memoria
+
+    Parameters
+    ----------
+        tables : dict
+            {nombre: StringTable} para cada una de STRING_TABLES
+
+        pub_ptr, pubs, pub_years, pub_venues : np.ndarray
+            publicaciones de cada autor (pub_years puede ser None)
+
+        interned : bool
+            si 'pubs' contiene los identificadores enteros (True) o las claves de las publicaciones (False)
+    '''
+    def __init__(self, tables, pub_ptr, pubs, pub_years, pub_venues, interned=True):
+        self.tables = tables
+        self.pub_ptr = pub_ptr
+        self.pubs = pubs
+        self.pub_years = pub_years
+        self.pub_venues = pub_venues
+        self.interned = interned
+        self._positions = None
+
+    @classmethod
+    def from_authors(cls, authors):
+        '''
+        Construye el almacén a partir de los autores, recorriéndolos una única vez (puede ser un generador, ver
+        external.iter_authors)
+
+        Parameters
+        ----------
+            authors : iterable
+                (identificador, propiedades) de cada autor, con el formato del Crawler
+
+        Returns
+        -------
+            store : AuthorStore
+        '''
+        ids, names, affiliations = [], [], []
+        pub_ids, pub_keys, venue_ids, venues = {}, [], {}, []
+        years, pub_venues = array('h'), array('i')
+        pub_ptr, pubs = array('q', [0]), array('i')
+        has_years = False
+
+        for author, props in authors:
+            ids.append(author)
+            names.append(props['name'])
+            affiliations.append(props['affiliation'])
+
+            author_years = props.get('years') or []
+            author_venues = props.get('venues') or []
+            has_years = has_years or bool(author_years)
+
+            for i, key in enumerate(props.get('pubs', [])):
+                pub = pub_ids.get(key)
+                if pub is None:
+                    # Primera aparición de la publicación: se interna junto a su año y revista
+                    pub = pub_ids[key] = len(pub_keys)
+                    pub_keys.append(key)
+                    years.append((author_years[i] or 0) if i < len(author_years) else 0)
+                    venue = author_venues[i] if i < len(author_venues) else None
+                    if venue is not None and venue not in venue_ids:
+                        venue_ids[venue] = len(venues)
+                        venues.append(venue)
+                    pub_venues.append(venue_ids[venue] if venue is not None else -1)
+                pubs.append(pub)
+
+            pub_ptr.append(len(pubs))
+
+        tables = {
+            'ids': StringTable.from_strings(ids),
+            'names': StringTable.from_strings(names),
+            'affiliations': StringTable.from_strings(affiliations),
+            'pub_keys': StringTable.from_strings(pub_keys),
+            'venues': StringTable.from_strings(venues),
+        }
+
+        return cls(tables, np.frombuffer(pub_ptr, dtype=np.int64), np.frombuffer(pubs, dtype=np.int32),
+                   np.frombuffer(years, dtype=np.int16) if has_years else None, np.frombuffer(pub_venues, dtype=np.int32))
+
+    def save(self, path):
+        '''
+        Almacena los datos como ficheros .npy en el directorio indicado
+        '''
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        for name, table in self.tables.items():
+            table.save(path, name)
+
+        np.save(os.path.join(path, 'pub_ptr.npy'), self.pub_ptr)
+        np.save(os.path.join(path, 'pubs.npy'), self.pubs)
+        np.save(os.path.join(path, 'pub_venues.npy'), self.pub_venues)
+        if self.pub_years is not None:
+            np.save(os.path.join(path, 'pub_years.npy'), self.pub_years)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r', interned=True):
+        '''
+        Carga los datos almacenados con save. Por defecto los vectores se proyectan en memoria
+
+        Parameters
+        ----------
+            path : str
+                directorio donde se almacenaron los datos
+
+            mmap_mode : str
+                modo de proyección en memoria de np.load (None para cargarlos completamente)
+
+            interned : bool
+                si 'pubs' contiene los identificadores enteros de las publicaciones (True) o sus claves (False)
+
+        Returns
+        -------
+            store : AuthorStore
+        '''
+        load = lambda name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+        years_path = os.path.join(path, 'pub_years.npy')
+
+        return cls({name: StringTable.load(path, name, mmap_mode=mmap_mode) for name in STRING_TABLES},
+                   load('pub_ptr'), load('pubs'), np.load(years_path, mmap_mode=mmap_mode) if os.path.exists(years_path) else None,
+                   load('pub_venues'), interned=interned)
+
+    def __len__(self):
+        return len(self.pub_ptr) - 1
+
+    def __iter__(self):
+        return iter(self.tables['ids'].tolist())
+
+    def __contains__(self, author):
+        return author in self.positions()
+
+    def __getitem__(self, author):
+        return self.props(self.positions()[author])
+
+    def positions(self):
+        '''
+        Posición de cada autor en el almacén, {identificador: posición}
+        '''
+        if self._positions is None:
+            self._positions = {author: i for i, author in enumerate(self.tables['ids'].tolist())}
+        return self._positions
+
+    def pub_indices(self, i):
+        '''
+        Identificadores enteros de las publicaciones del autor en la posición i
+        '''
+        return self.pubs[self.pub_ptr[i]:self.pub_ptr[i + 1]]
+
+    def props(self, i):
+        '''
+        Propiedades del autor en la posición i con el formato del Crawler
+
+        Returns
+        -------
+            props : dict
+                {'name', 'affiliation', 'pubs', 'venues'} y 'years' si los datos incluyen el año
+        '''
+        pubs = self.pub_indices(i)
+        venues = self.tables['venues']
+        props = {
+            'name': self.tables['names'][i],
+            'affiliation': self.tables['affiliations'][i] or None,
+            'pubs': pubs.tolist() if self.interned else [self.tables['pub_keys'][pub] for pub in pubs.tolist()],
+            'venues': [venues[venue] if venue >= 0 else None for venue in self.pub_venues[pubs].tolist()],
+        }
+        if self.pub_years is not None:
+            props['years'] = [year or None for year in self.pub_years[pubs].tolist()]
+        return props
+
+    def items(self):
+        '''
+        (identificador, propiedades) de cada autor, en el orden en que se almacenaron
+        '''
+        return zip(self.tables['ids'].tolist(), (self.props(i) for i in range(len(self))))
+
+    def copy(self):
+        '''
+        Diccionario {autor: propiedades} con todos los autores (build_graph copia sus datos de entrada para ir
+        eliminando los autores ya procesados)
+        '''
+        return dict(self.items())
+
+
+def load_authors(data_path, mmap_mode='r'):
+    '''
+    Datos de los autores del directorio de datos: el almacén columnar si existe o, si no, el diccionario de
+    'authors_data.npy' de versiones anteriores
+
+    Returns
+    -------
+        authors_data : AuthorStore or dict
+    '''
+    store_path = os.path.join(data_path, STORE_NAME)
+    if os.path.isdir(store_path):
+        return AuthorStore.load(store_path, mmap_mode=mmap_mode)
+    return np.load(os.path.join(data_path, 'authors_data.npy'), allow_pickle=True).item()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    # Directorio de datos
+    data_path = data_dir()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--authors", default=data_path + '/authors_data.npy', help="Datos de los autores a convertir (JSON lines o .npy)")
+    arg_parser.add_argument("--output", default=data_path + '/' + STORE_NAME, help="Directorio del almacén columnar")
+
+    args = arg_parser.parse_args()
+
+    try:
+        from modules.external import iter_authors
+    except ImportError:
+        # Ejecución directa del módulo (python modules/xxx.py)
+        from external import iter_authors
+
+    store = AuthorStore.from_authors(iter_authors(args.authors))
+    store.save(args.output)
+
+    print("Se han almacenado {:d} autores y {:d} publicaciones en {:s}".format(len(store), len(store.tables['pub_keys']), args.output))
@@ -0,0 +1,345 @@
+import os
+import inspect
+import numpy as np
+from argparse import ArgumentParser
+
+try:
+    from modules.instrumentation import timed, count
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from instrumentation import timed, count
+    from scripts import data_dir
+
+# Fichero, dentro del directorio del grafo compacto, donde se almacenan los últimos vectores de centralidad
+STATE_FILE = 'centrality.npz'
+
+# Medidas de centralidad disponibles
+MEASURES = ('eigenvector', 'katz', 'hits')
+
+# Métodos de cálculo: iteración de potencias (admite vector inicial) o métodos de Krylov de scipy (ARPACK / gradiente
+# conjugado)
+METHODS = ('power', 'krylov')
+
+
+def matrix(compact, weighted=True):
+    '''
+    Matriz de adyacencia del grafo (ponderada por el número de publicaciones compartidas o binaria) en formato
+    scipy.sparse.csr_matrix de coma flotante, construida una sola vez y almacenada en la caché del grafo compacto
+    '''
+    from scipy import sparse
+
+    if weighted:
+        return compact.cached('adjacency_float', lambda: compact.adjacency().astype(np.float64))
+    return compact.cached('pattern', lambda: sparse.csr_matrix(
+        (np.ones(len(compact.indices)), compact.indices, compact.indptr), shape=(compact.n, compact.n)))
+
+
+def spectral_radius(compact, weighted=True, tol=1e-8):
+    '''
+    Mayor valor propio de la matriz de adyacencia (ARPACK), almacenado en la caché del grafo compacto (como número, por lo
+    que no se guarda junto al grafo)
+    '''
+    from scipy.sparse.linalg import eigsh
+
+    def radius():
+        if compact.n < 3:
+            return float(np.abs(np.linalg.eigvalsh(matrix(compact, weighted).toarray())).max()) if compact.n else 0.0
+        return float(eigsh(matrix(compact, weighted), k=1, which='LA', tol=tol, return_eigenvectors=False)[0])
+
+    return compact.cached('spectral_radius' if weighted else 'spectral_radius_pattern', radius)
+
+
+def power_iteration(operator, start, tol=1e-6, max_iter=1000, normalize=True, name='power'):
+    '''
+    Iteración de punto fijo x <- operator(x) común a todas las medidas, hasta que el cambio (norma L1, relativo a la
+    norma del vector) entre dos iteraciones sea menor que tol
+
+    Parameters
+    ----------
+        operator : callable
+            función que aplica una iteración al vector
+
+        start : np.ndarray
+            vector inicial (por ejemplo, el de la versión anterior del grafo, ver remap)
+
+        tol : float
+            cambio relativo máximo para considerar que ha convergido
+
+        max_iter : int
+            número máximo de iteraciones
+
+        normalize : bool
+            si el vector se normaliza (suma 1) en cada iteración, para las medidas definidas por un vector propio
+
+        name : str
+            nombre de la medida en las métricas de instrumentación
+
+    Returns
+    -------
+        (values, iterations) : (np.ndarray, int)
+    '''
+    values = np.asarray(start, dtype=np.float64).copy()
+    if normalize and values.sum() > 0:
+        values /= values.sum()
+
+    iterations = 0
+    while iterations < max_iter:
+        iterations += 1
+        new_values = operator(values)
+        if normalize:
+            total = new_values.sum()
+            if total == 0:
+                break
+            new_values /= total
+
+        change = np.abs(new_values - values).sum() / max(np.abs(new_values).sum(), 1e-300)
+        values = new_values
+        if change < tol:
+            break
+
+    count('centrality_iterations_total', iterations, measure=name)
+    return values, iterations
+
+
+def _start(compact, start):
+    '''
+    Vector inicial: el indicado o el uniforme
+    '''
+    return np.full(compact.n, 1.0 / max(compact.n, 1)) if start is None else np.asarray(start, dtype=np.float64)
+
+
+def _unit(values, order=2):
+    '''
+    Vector con norma 1 (L2 como networkx para vector propio y Katz, L1 para HITS) y componentes no negativas
+    '''
+    values = values * np.sign(values.sum()) if values.sum() != 0 else values
+    norm = np.linalg.norm(values, order)
+    return values / norm if norm > 0 else values
+
+
+@timed('centrality.eigenvector', items=len)
+def eigenvector(compact, weighted=True, tol=1e-6, start=None, method='power', max_iter=1000):
+    '''
+    Centralidad de vector propio: vector propio del mayor valor propio de la matriz de adyacencia. La iteración de
+    potencias se hace sobre A + I (mismos vectores propios, sin oscilar en componentes bipartitas), como networkx
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        weighted : bool
+            si las aristas se ponderan por el número de publicaciones compartidas
+
+        tol : float
+            tolerancia (cambio relativo en norma L1 para la iteración de potencias, precisión de ARPACK)
+
+        start : np.ndarray
+            vector inicial (por ejemplo, el de la versión anterior del grafo)
+
+        method : str
+            'power' (iteración de potencias) o 'krylov' (ARPACK)
+
+        max_iter : int
+            número máximo de iteraciones
+
+    Returns
+    -------
+        values : np.ndarray
+            centralidad de cada autor (norma L2 igual a 1)
+    '''
+    adjacency = matrix(compact, weighted)
+
+    if method == 'krylov' and compact.n > 2:
+        from scipy.sparse.linalg import eigsh
+
+        v0 = _start(compact, start) + 1.0 / compact.n
+        vectors = eigsh(adjacency, k=1, which='LA', v0=v0, tol=tol, maxiter=max_iter * compact.n)[1]
+        return _unit(vectors[:, 0])
+
+    values, _ = power_iteration(lambda x: adjacency @ x + x, _start(compact, start), tol=tol, max_iter=max_iter, name='eigenvector')
+    return _unit(values)
+
+
+@timed('centrality.katz', items=len)
+def katz(compact, alpha=None, beta=1.0, weighted=True, tol=1e-6, start=None, method='power', max_iter=1000):
+    '''
+    Centralidad de Katz: solución de x = alpha A x + beta, que cuenta los caminos de cada longitud k hacia cada autor
+    atenuados por alpha^k. Por defecto alpha es 0.85 veces el inverso del radio espectral (el máximo para el que converge)
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        alpha : float
+            factor de atenuación (menor que 1 / radio espectral)
+
+        beta : float
+            centralidad base de cada autor
+
+        weighted, tol, start, method, max_iter
+            ver eigenvector ('krylov' resuelve el sistema (I - alpha A) x = beta con gradiente conjugado)
+
+    Returns
+    -------
+        values : np.ndarray
+            centralidad de cada autor (norma L2 igual a 1)
+    '''
+    from scipy import sparse
+
+    adjacency = matrix(compact, weighted)
+    radius = spectral_radius(compact, weighted)
+    alpha = 0.85 / radius if alpha is None and radius > 0 else (alpha if alpha is not None else 0.1)
+    if alpha * radius >= 1:
+        raise ValueError("alpha debe ser menor que el inverso del radio espectral ({:.6g})".format(1 / radius))
+
+    base = np.full(compact.n, float(beta))
+    if start is None:
+        start = base
+    else:
+        # El vector anterior está normalizado: se escala por mínimos cuadrados para que se ajuste a x = alpha A x + beta
+        start = np.asarray(start, dtype=np.float64)
+        residual = start - alpha * (adjacency @ start)
+        scale = residual @ base / (residual @ residual) if residual @ residual > 0 else 1.0
+        start = start * scale
+
+    if method == 'krylov':
+        from scipy.sparse.linalg import cg
+
+        system = sparse.identity(compact.n, format='csr') - alpha * adjacency
+        tolerance = {'rtol': tol} if 'rtol' in inspect.signature(cg).parameters else {'tol': tol}
+        values, info = cg(system, base, x0=start, maxiter=max_iter, **tolerance)
+        count('centrality_iterations_total', max(info, 0), measure='katz')
+        return _unit(values)
+
+    values, _ = power_iteration(lambda x: alpha * (adjacency @ x) + base, start, tol=tol, max_iter=max_iter, normalize=False, name='katz')
+    return _unit(values)
+
+
+@timed('centrality.hits', items=lambda result: len(result[0]))
+def hits(compact, weighted=True, tol=1e-6, start=None, method='power', max_iter=1000):
+    '''
+    Puntuaciones de concentrador y autoridad de HITS: vectores propios principales de A A^T y A^T A. El grafo de
+    colaboración es no dirigido (A simétrica), por lo que ambas coinciden con el vector propio principal de A, y se
+    calculan una sola vez con eigenvector. Se normalizan para que sumen 1, como networkx
+
+    Returns
+    -------
+        (hubs, authorities) : (np.ndarray, np.ndarray)
+    '''
+    values = _unit(eigenvector(compact, weighted=weighted, tol=tol, start=start, method=method, max_iter=max_iter), order=1)
+    return values, values.copy()
+
+
+def save_state(path, compact, results):
+    '''
+    Almacena los vectores de centralidad junto al grafo compacto (con los identificadores, para poder reasignarlos)
+    '''
+    np.savez(os.path.join(path, STATE_FILE), ids=np.asarray(compact.ids), **results)
+
+
+def load_state(path):
+    '''
+    Últimos vectores de centralidad almacenados junto al grafo, (ids, {medida: valores}), o None si no existen
+    '''
+    state_path = os.path.join(path, STATE_FILE)
+    if not os.path.exists(state_path):
+        return None
+    with np.load(state_path) as state:
+        return state['ids'], {name: state[name] for name in state.files if name != 'ids'}
+
+
+def remap(previous_ids, previous_values, compact):
+    '''
+    Reasigna un vector de centralidad a los autores de una nueva versión del grafo. Los autores nuevos parten del valor
+    medio del vector anterior
+
+    Returns
+    -------
+        start : np.ndarray
+            vector inicial para la nueva versión
+    '''
+    previous_values = np.asarray(previous_values, dtype=np.float64)
+    start = np.full(compact.n, previous_values.mean() if len(previous_values) else 1.0)
+    previous = dict(zip(np.asarray(previous_ids).tolist(), previous_values.tolist()))
+    for i, author in enumerate(np.asarray(compact.ids).tolist()):
+        if author in previous:
+            start[i] = previous[author]
+    return start
+
+
+def centralities(compact, measures=MEASURES, path=None, weighted=True, tol=1e-6, method='power', warm=True):
+    '''
+    Calcula varias medidas de centralidad sobre la misma matriz de adyacencia, partiendo, si existen, de los vectores
+    calculados sobre la versión anterior del grafo y almacenando los resultados para la siguiente actualización
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        measures : tuple
+            medidas a calcular (ver MEASURES)
+
+        path : str
+            directorio del grafo compacto donde se almacenan los vectores (None para no almacenarlos)
+
+        weighted, tol, method
+            ver eigenvector
+
+        warm : bool
+            si se parte de los vectores anteriores
+
+    Returns
+    -------
+        results : dict
+            {medida: centralidad de cada autor} (para HITS, la puntuación de autoridad)
+    '''
+    functions = {
+        'eigenvector': lambda start: eigenvector(compact, weighted=weighted, tol=tol, start=start, method=method),
+        'katz': lambda start: katz(compact, weighted=weighted, tol=tol, start=start, method=method),
+        'hits': lambda start: hits(compact, weighted=weighted, tol=tol, start=start, method=method)[1],
+    }
+
+    state = load_state(path) if path is not None and warm else None
+    previous = state[1] if state is not None else {}
+
+    results = {}
+    for measure in measures:
+        start = remap(state[0], previous[measure], compact) if measure in previous else None
+        results[measure] = functions[measure](start)
+
+    if path is not None:
+        # Las medidas no calculadas se conservan, reasignadas a los autores de esta versión del grafo
+        stored = {measure: remap(state[0], values, compact) for measure, values in previous.items()}
+        stored.update(results)
+        save_state(path, compact, stored)
+
+    return results
+
+
+if __name__ == "__main__":
+    data_path = data_dir()
+
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--graph", default=data_path + '/colab_graph', help="Directorio del grafo compacto")
+    arg_parser.add_argument("--measures", nargs="+", default=list(MEASURES), choices=MEASURES, help="Medidas de centralidad")
+    arg_parser.add_argument("--method", default='power', choices=METHODS, help="Método de cálculo")
+    arg_parser.add_argument("--top", type=int, default=10, help="Número de autores a mostrar por medida")
+
+    args = arg_parser.parse_args()
+
+    try:
+        from modules.compact import CompactGraph
+    except ImportError:
+        from compact import CompactGraph
+
+    compact = CompactGraph.load(args.graph)
+    for measure, values in centralities(compact, measures=args.measures, path=args.graph, method=args.method).items():
+        print(measure)
+        for i in np.argsort(-values, kind='stable')[:args.top].tolist():
+            print("    {:<30s} {:.6f}".format(compact.ids[i][10:], values[i]))
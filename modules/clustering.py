@@ -0,0 +1,209 @@
+import numpy as np
+
+try:
+    from modules.compact import worker_pool, worker_shared
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from compact import worker_pool, worker_shared
+
+# Número máximo aproximado de caminos de longitud 2 (cuñas) que se expanden a la vez en cada bloque de nodos
+BLOCK_WEDGES = 4000000
+
+
+def orient(compact):
+    '''
+    Orienta cada arista del nodo de menor grado al de mayor grado (desempatando por índice), de forma que cada triángulo
+    se encuentra exactamente una vez y el número de vecinos de salida de cada nodo está acotado por O(sqrt(m))
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+    Returns
+    -------
+        oriented : tuple
+            (indptr, indices, weights, keys) del grafo orientado en formato CSR, con los vecinos de cada nodo ordenados, y
+            claves u * n + v de sus aristas u -> v (ordenadas, para buscarlas con np.searchsorted)
+    '''
+    degrees = compact.degrees()
+    rank = np.empty(compact.n, dtype=np.int64)
+    rank[np.lexsort((np.arange(compact.n), degrees))] = np.arange(compact.n)
+
+    rows = np.repeat(np.arange(compact.n), degrees)
+    keep = rank[rows] < rank[compact.indices]
+
+    indptr = np.zeros(compact.n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows[keep], minlength=compact.n), out=indptr[1:])
+
+    indices = np.asarray(compact.indices[keep], dtype=np.int64)
+    keys = rows[keep].astype(np.int64) * compact.n + indices
+
+    return indptr, indices, np.asarray(compact.weights[keep], dtype=np.float64), keys
+
+
+def _block_triangles(bounds, oriented=None):
+    '''
+    Enumera los triángulos cuyo vértice de menor rango está en el bloque [start, end) mediante la intersección de las listas
+    de adyacencia ordenadas: para cada cuña u -> v -> w se comprueba con una búsqueda binaria si existe la arista u -> w
+
+    Returns
+    -------
+        (triangles, geometric) : (np.ndarray, np.ndarray)
+            vértices de cada triángulo (k, 3) y media geométrica de los pesos de sus aristas
+    '''
+    indptr, indices, weights, keys = worker_shared(oriented)
+    start, end = bounds
+    n = len(indptr) - 1
+
+    # Aristas u -> v del bloque
+    edges = np.arange(indptr[start], indptr[end])
+    us = np.repeat(np.arange(start, end), np.diff(indptr[start:end + 1]))
+    vs = indices[edges]
+
+    # Expansión de las cuñas u -> v -> w
+    counts = indptr[vs + 1] - indptr[vs]
+    total = counts.sum()
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    vw = np.repeat(indptr[vs], counts) + offsets
+    uv = np.repeat(edges, counts)
+    u = np.repeat(us, counts)
+    w = indices[vw]
+
+    # Comprobación de la arista u -> w (las claves u*n + w del grafo orientado, calculadas una vez en orient, están ordenadas)
+    query = u * n + w
+    uw = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    found = keys[uw] == query
+
+    triangles = np.stack((u[found], indices[uv[found]], w[found]), axis=1).astype(np.int32)
+    geometric = np.cbrt(weights[uv[found]] * weights[vw[found]] * weights[uw[found]])
+
+    return triangles, geometric
+
+
+def triangles(compact, n_jobs=1):
+    '''
+    Enumera una única vez todos los triángulos del grafo y los almacena en la caché del grafo compacto, junto con la media
+    geométrica de los pesos de sus aristas. Todas las métricas de clustering (local, promedio, ponderado y transitividad)
+    se derivan de esta enumeración, también para cualquier subgrafo o comunidad restringiendo los triángulos a sus nodos.
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        n_jobs : int
+            número de procesos entre los que se reparten los bloques de nodos
+
+    Returns
+    -------
+        (triangles, geometric) : (np.ndarray, np.ndarray)
+            vértices de cada triángulo (k, 3) y media geométrica (sin normalizar) de los pesos de sus aristas
+    '''
+    if 'triangles' in compact.cache:
+        return compact.cache['triangles'], compact.cache['triangle_weights']
+
+    oriented = orient(compact)
+    indptr, indices, _, _ = oriented
+
+    # División en bloques de nodos con un número de cuñas acotado
+    wedges = np.cumsum(np.bincount(np.repeat(np.arange(compact.n), np.diff(indptr)),
+                                   weights=np.diff(indptr)[indices], minlength=compact.n))
+    cuts = np.searchsorted(wedges, np.arange(BLOCK_WEDGES, wedges[-1] if len(wedges) else 0, BLOCK_WEDGES))
+    bounds = list(zip(np.r_[0, cuts], np.r_[cuts, compact.n]))
+
+    if n_jobs > 1 and len(bounds) > 1:
+        with worker_pool(n_jobs, oriented) as executor:
+            results = list(executor.map(_block_triangles, bounds))
+    else:
+        results = [_block_triangles(block, oriented) for block in bounds]
+
+    compact.cache['triangles'] = np.concatenate([r[0] for r in results]) if results else np.zeros((0, 3), dtype=np.int32)
+    compact.cache['triangle_weights'] = np.concatenate([r[1] for r in results]) if results else np.zeros(0)
+
+    return compact.cache['triangles'], compact.cache['triangle_weights']
+
+
+def _restrict(compact, mask):
+    '''
+    Restringe los triángulos almacenados a los nodos de la máscara (el subgrafo inducido conserva los triángulos
+    cuyos tres vértices pertenecen a él)
+
+    Returns
+    -------
+        (triangles, geometric, degrees, max_weight) : tuple
+            triángulos reindexados, sus pesos, grado de cada nodo y peso máximo dentro del subgrafo
+    '''
+    tri, geometric = triangles(compact)
+    if mask is None:
+        return tri, geometric, compact.degrees(), compact.weights.max() if len(compact.weights) else 1
+
+    mask = np.asarray(mask, dtype=bool)
+    new_index = np.cumsum(mask) - 1
+    keep = mask[tri].all(axis=1)
+
+    rows = np.repeat(np.arange(compact.n), compact.degrees())
+    inner = mask[rows] & mask[compact.indices]
+    degrees = np.bincount(new_index[rows[inner]], minlength=int(mask.sum()))
+
+    return new_index[tri[keep]], geometric[keep], degrees, compact.weights[inner].max() if inner.any() else 1
+
+
+def triangle_counts(compact, mask=None):
+    '''
+    Número de triángulos de cada nodo (del subgrafo inducido por la máscara, si se indica)
+    '''
+    tri, _, degrees, _ = _restrict(compact, mask)
+    return np.bincount(tri.ravel(), minlength=len(degrees))
+
+
+def clustering(compact, mask=None, weighted=False):
+    '''
+    Coeficiente de clustering local de cada nodo, con la misma definición que nx.clustering
+
+    En la versión ponderada el peso de cada triángulo es la media geométrica de los pesos de sus aristas normalizados por
+    el peso máximo del (sub)grafo
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        mask : np.ndarray
+            máscara booleana de los nodos del subgrafo (None para el grafo completo)
+
+        weighted : bool
+            si se usa el coeficiente de clustering ponderado
+
+    Returns
+    -------
+        clustering : np.ndarray
+            coeficiente de clustering de cada nodo (del subgrafo)
+    '''
+    tri, geometric, degrees, max_weight = _restrict(compact, mask)
+    if weighted:
+        counts = np.bincount(tri.ravel(), weights=np.repeat(geometric / max_weight, 3), minlength=len(degrees))
+    else:
+        counts = np.bincount(tri.ravel(), minlength=len(degrees))
+
+    pairs = degrees * (degrees - 1.0)
+    return np.divide(2 * counts, pairs, out=np.zeros(len(degrees)), where=pairs > 0)
+
+
+def average_clustering(compact, mask=None, weighted=False, count_zeros=True):
+    '''
+    Coeficiente de clustering promedio (equivalente a nx.average_clustering)
+    '''
+    values = clustering(compact, mask=mask, weighted=weighted)
+    if not count_zeros:
+        values = values[values > 0]
+    return float(values.mean()) if len(values) else 0.0
+
+
+def transitivity(compact, mask=None):
+    '''
+    Transitividad del grafo: proporción de tripletes conectados que forman triángulo (equivalente a nx.transitivity)
+    '''
+    tri, _, degrees, _ = _restrict(compact, mask)
+    triads = (degrees * (degrees - 1.0)).sum()
+    return float(6 * len(tri) / triads) if triads > 0 else 0.0
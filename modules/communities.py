@@ -0,0 +1,288 @@
+import os
+import numpy as np
+
+try:
+    from modules.instrumentation import timed
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from instrumentation import timed
+
+# Mejora mínima de modularidad de una pasada de movimiento de nodos para continuar iterando (como python-louvain)
+MIN_GAIN = 1e-7
+
+# Fichero, dentro del directorio del grafo compacto, donde se almacena la última partición en comunidades
+STATE_FILE = 'communities.npz'
+
+
+def _neighbours(indptr, indices, weights):
+    '''
+    Listas de (vecino, peso) de cada nodo como listas de Python, para recorrerlas nodo a nodo sin el coste de numpy
+    '''
+    indices, weights = indices.tolist(), weights.tolist()
+    return [list(zip(indices[start:end], weights[start:end])) for start, end in zip(indptr[:-1].tolist(), indptr[1:].tolist())]
+
+
+def _move_nodes(neighbours, k, membership, m2, resolution, order):
+    '''
+    Fase de movimiento local de Louvain: cada nodo pasa a la comunidad vecina que más aumenta la modularidad, repitiendo
+    pasadas hasta que la mejora de una pasada es inferior a MIN_GAIN
+
+    Returns
+    -------
+        membership : list
+            comunidad de cada nodo
+    '''
+    tot = [0.0] * len(k)
+    for i, c in enumerate(membership):
+        tot[c] += k[i]
+
+    improvement = MIN_GAIN + 1
+    while improvement > MIN_GAIN:
+        improvement = 0.0
+        for i in order:
+            ci, ki = membership[i], k[i]
+
+            # Peso de las aristas del nodo hacia cada comunidad vecina
+            links = {}
+            for j, w in neighbours[i]:
+                if j != i:
+                    cj = membership[j]
+                    links[cj] = links.get(cj, 0.0) + w
+
+            tot[ci] -= ki
+            best = ci
+            current = best_gain = links.get(ci, 0.0) - resolution * tot[ci] * ki / m2
+            for c, w in links.items():
+                gain = w - resolution * tot[c] * ki / m2
+                if gain > best_gain:
+                    best, best_gain = c, gain
+            tot[best] += ki
+
+            if best != ci:
+                membership[i] = best
+                improvement += 2 * (best_gain - current) / m2
+
+    return membership
+
+
+def _refine(neighbours, k, membership, m2, resolution, order):
+    '''
+    Fase de refinamiento de Leiden: dentro de cada comunidad se parte de nodos aislados y cada nodo aún aislado y bien
+    conectado con su comunidad se une a la subcomunidad (también bien conectada) con mayor aumento de modularidad. De esta
+    forma las comunidades agregadas en el siguiente nivel están siempre conectadas
+
+    Returns
+    -------
+        refined : list
+            subcomunidad de cada nodo (cada una contenida en una comunidad de membership)
+    '''
+    tot = [0.0] * len(k)
+    for i, c in enumerate(membership):
+        tot[c] += k[i]
+
+    # Peso de las aristas de cada nodo hacia el resto de su comunidad
+    internal = [sum(w for j, w in neighbours[i] if j != i and membership[j] == membership[i]) for i in range(len(k))]
+
+    refined = list(range(len(k)))
+    sub_tot = list(k)
+    external = list(internal)
+    size = [1] * len(k)
+
+    for v in order:
+        # Sólo se mueven los nodos que siguen aislados en su subcomunidad
+        if size[refined[v]] > 1:
+            continue
+        cv, kv = membership[v], k[v]
+        if internal[v] < resolution * kv * (tot[cv] - kv) / m2:
+            continue
+
+        # Peso de las aristas del nodo hacia cada subcomunidad de su misma comunidad
+        links = {}
+        for u, w in neighbours[v]:
+            if u != v and membership[u] == cv:
+                links[refined[u]] = links.get(refined[u], 0.0) + w
+
+        best, best_gain = refined[v], 0.0
+        for c, w in links.items():
+            # Sólo se consideran subcomunidades bien conectadas con el resto de la comunidad
+            if c == refined[v] or external[c] < resolution * sub_tot[c] * (tot[cv] - sub_tot[c]) / m2:
+                continue
+            gain = w - resolution * kv * sub_tot[c] / m2
+            if gain > best_gain:
+                best, best_gain = c, gain
+
+        if best != refined[v]:
+            old = refined[v]
+            sub_tot[old] -= kv
+            size[old] -= 1
+            refined[v] = best
+            sub_tot[best] += kv
+            size[best] += 1
+            external[best] += internal[v] - 2 * links[best]
+
+    return refined
+
+
+def _renumber(labels):
+    '''
+    Renumera las etiquetas de forma consecutiva (0..C-1)
+    '''
+    return np.unique(np.asarray(labels), return_inverse=True)[1]
+
+
+def _aggregate(indptr, indices, weights, labels, size):
+    '''
+    Grafo agregado en el que cada comunidad es un nodo: los pesos entre comunidades (y los de cada comunidad consigo
+    misma en la diagonal) se suman de forma vectorizada como P^T A P
+    '''
+    from scipy import sparse
+
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    aggregated = sparse.coo_matrix((weights, (labels[rows], labels[indices])), shape=(size, size)).tocsr()
+    aggregated.sum_duplicates()
+    aggregated.sort_indices()
+    return aggregated.indptr, aggregated.indices, aggregated.data
+
+
+@timed('communities.leiden', items=len)
+def leiden(compact, resolution=1.0, seed=0, refine=True, max_levels=None):
+    '''
+    Detección de comunidades por optimización de la modularidad con el método de Louvain y, opcionalmente, el paso de
+    refinamiento del método de Leiden, sobre la representación compacta (CSR) del grafo ponderado.
+
+    En cada nivel se mueven los nodos entre comunidades, se refinan las comunidades y se agrega el grafo (una comunidad
+    refinada por nodo, partiendo de la partición sin refinar). El orden de los nodos se obtiene de un generador con semilla,
+    por lo que el resultado es determinista
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        resolution : float
+            parámetro de resolución de la modularidad (valores mayores generan comunidades más pequeñas)
+
+        seed : int
+            semilla del orden de recorrido de los nodos
+
+        refine : bool
+            si se aplica el refinamiento de Leiden (False para el método de Louvain original)
+
+        max_levels : int
+            número máximo de niveles de agregación (None sin límite)
+
+    Returns
+    -------
+        labels : np.ndarray
+            comunidad de cada nodo, numeradas de mayor a menor tamaño
+    '''
+    random = np.random.RandomState(seed)
+
+    indptr, indices = np.asarray(compact.indptr), np.asarray(compact.indices)
+    weights = np.asarray(compact.weights, dtype=np.float64)
+    m2 = weights.sum()
+
+    # Nodo del nivel actual al que pertenece cada nodo original
+    node_level = np.arange(compact.n)
+    membership = list(range(compact.n))
+    labels = np.arange(compact.n)
+    level = 0
+
+    while m2 > 0 and (max_levels is None or level < max_levels):
+        n = len(indptr) - 1
+        neighbours = _neighbours(indptr, indices, weights)
+        k = np.bincount(np.repeat(np.arange(n), np.diff(indptr)), weights=weights, minlength=n).tolist()
+
+        order = random.permutation(n).tolist()
+        communities = _renumber(_move_nodes(neighbours, k, membership, m2, resolution, order))
+        labels = communities[node_level]
+
+        # Ningún nodo del nivel se ha unido a otro: la partición es estable
+        if communities.max() + 1 == n:
+            break
+
+        if refine:
+            refined = _renumber(_refine(neighbours, k, communities.tolist(), m2, resolution, random.permutation(n).tolist()))
+        else:
+            refined = communities
+
+        # El refinamiento no ha unido ningún nodo: no se puede agregar el grafo
+        size = refined.max() + 1
+        if size == n:
+            break
+        indptr, indices, weights = _aggregate(indptr, indices, weights, refined, size)
+        node_level = refined[node_level]
+
+        # La partición de partida del siguiente nivel es la de las comunidades sin refinar
+        level_membership = np.empty(size, dtype=np.int64)
+        level_membership[refined] = communities
+        membership = level_membership.tolist()
+        level += 1
+
+    # Numeración de las comunidades de mayor a menor tamaño
+    sizes = np.bincount(labels)
+    rank = np.empty(len(sizes), dtype=np.int64)
+    rank[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes))
+    return rank[labels]
+
+
+def best_partition(compact, resolution=1.0, seed=0, refine=True):
+    '''
+    Partición con el mismo formato que community.best_partition (python-louvain)
+
+    Returns
+    -------
+        partition : dict
+            {identificador del autor: comunidad}
+    '''
+    return dict(zip(np.asarray(compact.ids).tolist(), leiden(compact, resolution=resolution, seed=seed, refine=refine).tolist()))
+
+
+def modularity(compact, labels, resolution=1.0):
+    '''
+    Modularidad ponderada de una partición (equivalente a community.modularity y nx.community.modularity)
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        labels : np.ndarray
+            comunidad de cada nodo
+
+        resolution : float
+            parámetro de resolución
+
+    Returns
+    -------
+        modularity : float
+    '''
+    labels = np.asarray(labels)
+    weights = np.asarray(compact.weights, dtype=np.float64)
+    m2 = weights.sum()
+    if m2 == 0:
+        return 0.0
+
+    rows = np.repeat(np.arange(compact.n), compact.degrees())
+    internal = weights[labels[rows] == labels[np.asarray(compact.indices)]].sum()
+    tot = np.bincount(labels, weights=np.bincount(rows, weights=weights, minlength=compact.n))
+
+    return float(internal / m2 - resolution * ((tot / m2) ** 2).sum())
+
+
+def save_labels(path, compact, labels):
+    '''
+    Almacena la comunidad de cada autor junto al grafo compacto (con los identificadores, para poder reasignarla)
+    '''
+    np.savez(os.path.join(path, STATE_FILE), ids=np.asarray(compact.ids), labels=np.asarray(labels))
+
+
+def load_labels(path):
+    '''
+    Última partición almacenada junto al grafo, (ids, labels), o None si no existe
+    '''
+    state_path = os.path.join(path, STATE_FILE)
+    if not os.path.exists(state_path):
+        return None
+    with np.load(state_path) as state:
+        return state['ids'], state['labels']
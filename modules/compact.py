@@ -0,0 +1,408 @@
+import os
+import numpy as np
+
+
+class CompactGraph:
+    '''
+    Representación compacta del grafo de colaboración en formato CSR (Compressed Sparse Row) sobre índices enteros.
+
+    Los autores se identifican por su posición (0..n-1) y los coautores de cada autor i son indices[indptr[i]:indptr[i+1]],
+    con el número de publicaciones compartidas en la misma posición de weights. Cada arista aparece en las dos direcciones.
+
+    Los resultados estructurales costosos (componentes conexas y números de núcleo) se calculan una única vez y quedan
+    almacenados junto al grafo, de forma que obtener la componente más grande o el k-núcleo se reduce a aplicar una máscara.
+
+    Parameters
+    ----------
+        ids : np.ndarray
+            identificadores de los autores ('homepages/x/y')
+
+        indptr : np.ndarray
+            posición de inicio de la lista de coautores de cada autor (longitud n+1)
+
+        indices : np.ndarray
+            índices de los coautores
+
+        weights : np.ndarray
+            número de publicaciones compartidas de cada arista
+
+        names : np.ndarray
+            nombres de los autores
+
+        affiliations : np.ndarray
+            afiliaciones de los autores ('' si no tienen)
+
+    Attributes
+    ----------
+        cache : dict
+            resultados calculados sobre el grafo (etiquetas de componentes, números de núcleo...)
+    '''
+    def __init__(self, ids, indptr, indices, weights, names=None, affiliations=None):
+        self.ids = ids
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.names = names if names is not None else np.full(len(ids), '', dtype='U1')
+        self.affiliations = affiliations if affiliations is not None else np.full(len(ids), '', dtype='U1')
+        self.cache = {}
+
+    @classmethod
+    def from_graph(cls, graph):
+        '''
+        Construye la representación compacta a partir del grafo en formato diccionario generado por build_graph
+
+        Parameters
+        ----------
+            graph : dict
+                {
+                    autor: {
+                        'name': 'nombre del autor',
+                        'affiliation': 'afiliación del autor'
+                        'pubs': {
+                            coautor: { 'weight': int },
+                            ...
+                        }
+                    }...
+                }
+
+        Returns
+        -------
+            compact : CompactGraph
+        '''
+        ids = list(graph.keys())
+        index = {author: i for i, author in enumerate(ids)}
+
+        degrees = np.fromiter((len(props.get('pubs', {})) for props in graph.values()), dtype=np.int64, count=len(ids))
+        indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=indptr[1:])
+
+        indices = np.fromiter((index[coauthor] for props in graph.values() for coauthor in props.get('pubs', {})),
+                              dtype=np.int32, count=indptr[-1])
+        weights = np.fromiter((edge['weight'] for props in graph.values() for edge in props.get('pubs', {}).values()),
+                              dtype=np.int32, count=indptr[-1])
+
+        # Ordenamos los coautores de cada autor para poder intersecar listas de adyacencia directamente
+        order = np.lexsort((indices, np.repeat(np.arange(len(ids)), degrees)))
+
+        return cls(np.array(ids), indptr, indices[order], weights[order],
+                   names=np.array([props['name'] or '' for props in graph.values()]),
+                   affiliations=np.array([props['affiliation'] or '' for props in graph.values()]))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        '''
+        Carga un grafo almacenado con save. Por defecto los vectores se proyectan en memoria (no se leen hasta que se usan).
+        Si el directorio contiene un grafo comprimido (ver packed.PackedGraph) se descomprime
+
+        Parameters
+        ----------
+            path : str
+                directorio donde se almacenó el grafo
+
+            mmap_mode : str
+                modo de proyección en memoria de np.load (None para cargarlo completamente)
+
+        Returns
+        -------
+            compact : CompactGraph
+        '''
+        if os.path.exists(os.path.join(path, 'blocks.npy')) and not os.path.exists(os.path.join(path, 'indices.npy')):
+            try:
+                from modules.packed import PackedGraph
+            except ImportError:
+                # Ejecución directa del módulo (python modules/xxx.py)
+                from packed import PackedGraph
+            return PackedGraph.load(path, mmap_mode=mmap_mode).to_compact()
+
+        load = lambda name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+
+        compact = cls(load('ids'), load('indptr'), load('indices'), load('weights'), load('names'), load('affiliations'))
+
+        # Resultados almacenados junto al grafo
+        for name in os.listdir(path):
+            if name.startswith('cache.'):
+                compact.cache[name[6:-4]] = np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        return compact
+
+    def save(self, path):
+        '''
+        Almacena el grafo (y los resultados calculados) como ficheros .npy en el directorio indicado
+
+        Parameters
+        ----------
+            path : str
+                directorio de destino
+        '''
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        for name in ('ids', 'indptr', 'indices', 'weights', 'names', 'affiliations'):
+            np.save(os.path.join(path, name + '.npy'), getattr(self, name))
+
+        for name, value in self.cache.items():
+            if isinstance(value, np.ndarray):
+                np.save(os.path.join(path, 'cache.' + name + '.npy'), value)
+
+    def cached(self, name, function):
+        '''
+        Devuelve el resultado almacenado con el nombre 'name' o lo calcula con function y lo almacena
+        '''
+        if name not in self.cache:
+            self.cache[name] = function()
+        return self.cache[name]
+
+    @property
+    def n(self):
+        '''
+        Número de nodos
+        '''
+        return len(self.ids)
+
+    @property
+    def m(self):
+        '''
+        Número de aristas (no dirigidas)
+        '''
+        return len(self.indices) // 2
+
+    @property
+    def index(self):
+        '''
+        Diccionario identificador -> posición
+        '''
+        if 'index' not in self.cache:
+            self.cache['index'] = {author: i for i, author in enumerate(self.ids.tolist())}
+        return self.cache['index']
+
+    def degrees(self):
+        '''
+        Grado de cada nodo
+        '''
+        return np.diff(self.indptr)
+
+    def adjacency(self):
+        '''
+        Matriz de adyacencia ponderada en formato scipy.sparse.csr_matrix (se construye una sola vez, sin copiar los vectores)
+        '''
+        if 'adjacency' not in self.cache:
+            from scipy import sparse
+            self.cache['adjacency'] = sparse.csr_matrix((self.weights, self.indices, self.indptr), shape=(self.n, self.n))
+        return self.cache['adjacency']
+
+    def distances(self, source):
+        '''
+        Distancia (número de saltos) desde un nodo a todos los demás mediante una búsqueda en anchura por niveles: en cada
+        nivel se expanden a la vez las listas de coautores de toda la frontera
+
+        Parameters
+        ----------
+            source : int
+                posición del nodo de origen
+
+        Returns
+        -------
+            distances : np.ndarray
+                distancia de cada nodo al origen (-1 si no es alcanzable)
+        '''
+        distances = np.full(self.n, -1, dtype=np.int32)
+        distances[source] = 0
+        frontier = np.array([source], dtype=np.int64)
+        level = 0
+
+        while len(frontier) > 0:
+            level += 1
+            starts = np.asarray(self.indptr[frontier])
+            counts = np.asarray(self.indptr[frontier + 1]) - starts
+            positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            neighbours = np.unique(np.asarray(self.indices[positions]))
+            frontier = neighbours[distances[neighbours] < 0]
+            distances[frontier] = level
+
+        return distances
+
+    def component_labels(self):
+        '''
+        Etiqueta de la componente conexa de cada nodo, calculada en una única pasada con scipy.sparse.csgraph
+
+        Returns
+        -------
+            labels : np.ndarray
+                componente a la que pertenece cada nodo
+        '''
+        from scipy.sparse import csgraph
+        return self.cached('component_labels', lambda: csgraph.connected_components(self.adjacency(), directed=False)[1])
+
+    def component_sizes(self):
+        '''
+        Número de nodos de cada componente conexa (indexado por etiqueta)
+        '''
+        return np.bincount(self.component_labels())
+
+    def largest_component_mask(self):
+        '''
+        Máscara booleana de los nodos de la componente conexa más grande
+        '''
+        return self.component_labels() == np.argmax(self.component_sizes())
+
+    def core_numbers(self):
+        '''
+        Número de núcleo (k-core) de cada nodo, calculado con el algoritmo de eliminación sucesiva de Batagelj y Zaversnik
+        vectorizado: en cada paso se eliminan a la vez todos los nodos con grado residual menor o igual que k.
+
+        Returns
+        -------
+            core : np.ndarray
+                número de núcleo de cada nodo
+        '''
+        def peel():
+            adjacency = self.adjacency()
+            degree = self.degrees().copy()
+            core = np.zeros(self.n, dtype=np.int32)
+            alive = np.ones(self.n, dtype=bool)
+            k = 0
+            while alive.any():
+                k = max(k, degree[alive].min())
+                peeled = np.flatnonzero(alive & (degree <= k))
+                while len(peeled) > 0:
+                    core[peeled] = k
+                    alive[peeled] = False
+                    # Reducimos el grado de los vecinos de los nodos eliminados
+                    degree -= np.bincount(adjacency[peeled].indices, minlength=self.n)
+                    peeled = np.flatnonzero(alive & (degree <= k))
+            return core
+
+        return self.cached('core_numbers', peel)
+
+    def kcore_mask(self, k):
+        '''
+        Máscara booleana de los nodos del k-núcleo (núcleo mayor o igual que k)
+        '''
+        return self.core_numbers() >= k
+
+    def mask(self, authors):
+        '''
+        Máscara booleana de los nodos a partir de una lista de identificadores
+        '''
+        mask = np.zeros(self.n, dtype=bool)
+        mask[[self.index[author] for author in authors]] = True
+        return mask
+
+    def subgraph(self, mask):
+        '''
+        Devuelve el subgrafo inducido por la máscara como un nuevo grafo compacto (no una vista)
+
+        Las etiquetas de componentes y números de núcleo almacenados se restringen a los nodos del subgrafo cuando
+        siguen siendo válidos (si la máscara es unión de componentes conexas). Los triángulos enumerados se restringen siempre
+
+        Parameters
+        ----------
+            mask : np.ndarray
+                máscara booleana de los nodos del subgrafo
+
+        Returns
+        -------
+            subgraph : CompactGraph
+        '''
+        mask = np.asarray(mask, dtype=bool)
+        degrees = self.degrees()
+
+        # Nuevo índice de cada nodo conservado
+        new_index = np.cumsum(mask) - 1
+
+        # Aristas cuyos dos extremos pertenecen al subgrafo
+        rows = np.repeat(np.arange(self.n), degrees)
+        keep = mask[rows] & mask[self.indices]
+
+        indptr = np.zeros(int(mask.sum()) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(new_index[rows[keep]], minlength=len(indptr) - 1), out=indptr[1:])
+
+        subgraph = CompactGraph(self.ids[mask], indptr, new_index[self.indices[keep]].astype(np.int32), self.weights[keep],
+                                names=self.names[mask], affiliations=self.affiliations[mask])
+
+        # Si ninguna arista sale del subgrafo, las componentes y núcleos siguen siendo los mismos
+        if keep.sum() == degrees[mask].sum():
+            for name in ('component_labels', 'core_numbers'):
+                if name in self.cache:
+                    subgraph.cache[name] = np.asarray(self.cache[name])[mask]
+
+        # Los triángulos del subgrafo inducido son los triángulos cuyos tres vértices pertenecen a él
+        if 'triangles' in self.cache:
+            inner = mask[self.cache['triangles']].all(axis=1)
+            subgraph.cache['triangles'] = new_index[self.cache['triangles'][inner]].astype(np.int32)
+            subgraph.cache['triangle_weights'] = self.cache['triangle_weights'][inner]
+
+        return subgraph
+
+    def to_networkx(self):
+        '''
+        Materializa el grafo como nx.Graph con los atributos de nombre, afiliación y peso
+
+        Returns
+        -------
+            network : nx.Graph
+        '''
+        import networkx as nx
+
+        network = nx.Graph()
+        network.add_nodes_from(
+            (author, {'name': name, 'affiliation': affiliation or None})
+            for author, name, affiliation in zip(self.ids.tolist(), self.names.tolist(), self.affiliations.tolist()))
+
+        rows = np.repeat(np.arange(self.n), self.degrees())
+        upper = rows < self.indices
+        ids = self.ids.tolist()
+        network.add_weighted_edges_from(
+            (ids[i], ids[j], w) for i, j, w in zip(rows[upper].tolist(), self.indices[upper].tolist(), self.weights[upper].tolist()))
+
+        return network
+
+    def to_dict(self):
+        '''
+        Devuelve el grafo en el formato diccionario generado por build_graph
+        '''
+        ids = self.ids.tolist()
+        indices, weights = self.indices.tolist(), self.weights.tolist()
+        return {
+            author: {
+                'name': name,
+                'affiliation': affiliation or None,
+                'pubs': {ids[j]: {'weight': w} for j, w in zip(indices[start:end], weights[start:end])}
+            }
+            for author, name, affiliation, start, end in zip(ids, self.names.tolist(), self.affiliations.tolist(),
+                                                             self.indptr[:-1].tolist(), self.indptr[1:].tolist())
+        }
+
+
+# Datos compartidos con los procesos trabajadores de worker_pool (se inicializan una vez por proceso)
+_shared = None
+
+
+def init_worker(shared):
+    '''
+    Inicializador de los procesos trabajadores: almacena los datos compartidos por todas sus tareas
+    '''
+    global _shared
+    _shared = shared
+
+
+def worker_shared(shared=None):
+    '''
+    Datos compartidos de una tarea: los indicados (ejecución en serie, sin modificar el estado del proceso) o, si no se
+    indican, los recibidos por el proceso trabajador al iniciarse
+    '''
+    return shared if shared is not None else _shared
+
+
+def worker_pool(n_jobs, shared):
+    '''
+    Conjunto de n_jobs procesos trabajadores que reciben una única vez los datos compartidos (grafo, matrices...) en lugar
+    de con cada tarea. Las tareas los obtienen con worker_shared()
+
+    Returns
+    -------
+        executor : ProcessPoolExecutor
+    '''
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(n_jobs, initializer=init_worker, initargs=(shared,))
@@ -1,14 +1,25 @@
 from urllib3 import HTTPSConnectionPool
 from lxml import etree
-import numpy as np
 from time import sleep
 from tqdm import trange, tqdm
 from io import BytesIO
 from argparse import ArgumentParser
 import re
 import os
+import heapq
+from collections import defaultdict
 
-http = HTTPSConnectionPool(host="dblp.org", maxsize=400)
+try:
+    from modules.instrumentation import stage, count
+    from modules.authors import AuthorStore, STORE_NAME
+    from modules.scrapper import MaskRegistry
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from instrumentation import stage, count
+    from authors import AuthorStore, STORE_NAME
+    from scrapper import MaskRegistry
+    from scripts import data_dir
 
 current_path = os.path.dirname(os.path.realpath(__file__))
 
@@ -30,7 +41,7 @@ class Crawler:
     def __init__(self):
         self.http = HTTPSConnectionPool(host="dblp.org", maxsize=400)
 
-    def crawl(self, author):
+    def crawl(self, author, coauthors=False):
         '''
             Método para descargar la página en formato XML del servidor
 
@@ -39,6 +50,9 @@ class Crawler:
                 author : str
                     identificador del autor del que se va a descargar la página
 
+                coauthors : bool
+                    si se incluyen en las propiedades los coautores de la página (ver parse_XML)
+
             Returns
             -------
                 (author, props) : (str, dict)
@@ -46,15 +60,20 @@ class Crawler:
 
         '''
         page = self.http.request('GET', '/pid' + author[9:] + '.xml')
+
+        # Contadores de respuestas y bytes descargados
+        count('http_responses_total', status=page.status)
+        count('bytes_downloaded_total', len(page.data))
         
         # En caso de que el status code de la respuesta sea HTTP200 (Success) procesa la página para obtener las publicaciones
         if page.status == 200:
-            return (author, self.parse_XML(page.data))
+            return (author, self.parse_XML(page.data, coauthors=coauthors))
         # En caso de que sea HTTP429 (Max retries) espera el tiempo establecido por el servidor para volver a enviar peticiones
         elif page.status == 429:
+            count('retry_after_seconds_total', int(page.headers['Retry-After']))
             for _ in trange(int(page.headers['Retry-After']), desc="Máximo de peticiones alcanzado"):
                 sleep(1)
-            return self.crawl(author)
+            return self.crawl(author, coauthors=coauthors)
         # En casos de que sea HTTP404 (Not found) no se ha encontrado la página del autor, por que lo devuelve None publicaciones
         elif page.status == 404:
             return (author, None)
@@ -62,7 +81,7 @@ class Crawler:
         else:
             raise Exception("ERROR (status code: " + str(page.status) + ")")
 
-    def parse_XML(self, page):
+    def parse_XML(self, page, coauthors=False):
         '''
 
         Parameters
@@ -70,67 +89,168 @@ class Crawler:
             page : str
                 página personal del autor en formato XML
 
+            coauthors : bool
+                si se obtienen también los coautores de cada publicación (los autores con 'pid' de cada registro)
+
         Returns
         -------
             props : dict
-                Propiedades del autor (nombre, afiliación y publicaciones) obtenidas de la página
+                Propiedades del autor (nombre, afiliación y publicaciones) obtenidas de la página. Junto a las publicaciones
+                se almacena, en el mismo orden, su año ('years', None si no consta) y su revista o congreso ('venues').
+                Con coauthors=True incluye además 'coauthors': {identificador del coautor: publicaciones compartidas}
 
         '''
 
         pubs = []
+        years = []
+        venues = []
         xml = etree.iterparse(BytesIO(page), events=('start', 'end'))
 
         # Inicalización de los valores
         name = None
+        pid = None
         affiliation = None
+        shared = defaultdict(int)
         for event, publ in xml:
             if event == "start":
                 if publ.tag == 'dblpperson':
                     name = publ.get('name')
+                    pid = publ.get('pid')
                     note = publ.find('person').find('note')
                     if note.get('type') == 'affiliation':
                         affiliation = note.text
-                if publ.tag == 'r':
-                    try:
-                        pubs.append(publ[0].get('key'))
-                    except:
-                        pass
-        return {"name": re.sub(r'\s[0-9]+', '',  name), "affiliation": affiliation, "pubs": pubs}
+            # Al terminar cada registro de publicación su contenido (año y revista o congreso) ya está disponible
+            elif publ.tag == 'r':
+                try:
+                    record = publ[0]
+                except IndexError:
+                    continue
+                pubs.append(record.get('key'))
+                year = record.findtext('year')
+                years.append(int(year) if year is not None and year.isdigit() else None)
+                venues.append(record.findtext('journal') or record.findtext('booktitle'))
+                if coauthors:
+                    for coauthor in {author.get('pid') for author in record.iter('author', 'editor')} - {pid, None}:
+                        shared['homepages/' + coauthor] += 1
+        props = {"name": re.sub(r'\s[0-9]+', '',  name), "affiliation": affiliation, "pubs": pubs, "years": years, "venues": venues}
+        if coauthors:
+            props['coauthors'] = dict(shared)
+        return props
+
+    def snowball(self, seeds, hops=2, budget=None):
+        '''
+        Descarga en bola de nieve: parte de los autores semilla y añade a la frontera los coautores que aparecen en cada página
+        descargada, hasta una distancia máxima (en saltos) de las semillas o un número máximo de páginas. Así se obtiene el
+        subgrafo de un grupo de autores y sus colaboradores sin procesar el volcado completo con el Scrapper.
+
+        La frontera se recorre por niveles de distancia a las semillas (como una búsqueda en anchura, de forma que la
+        distancia de cada autor es la mínima cuando se descarga) y, dentro de cada nivel, primero los autores con más
+        publicaciones compartidas con los autores ya descargados: con un presupuesto limitado se descargan antes los
+        colaboradores más cercanos. Cada autor se descarga una única vez
+
+        Parameters
+        ----------
+            seeds : list
+                identificadores de los autores semilla ('homepages/x/y')
+
+            hops : int
+                distancia máxima a las semillas de los autores descargados (0 sólo las semillas)
+
+            budget : int
+                número máximo de páginas descargadas (None sin límite)
+
+        Returns
+        -------
+            authors : generator
+                (autor, propiedades, distancia a las semillas) de cada autor descargado (sin los HTTP404)
+        '''
+        # Publicaciones compartidas con los autores ya descargados y distancia a las semillas de cada autor descubierto
+        score = defaultdict(int)
+        hop = {seed: 0 for seed in seeds}
+        visited = set()
+
+        # Montículo de (distancia, -prioridad, orden de descubrimiento, autor); las entradas obsoletas (con una prioridad
+        # anterior) se descartan al salir
+        heap = [(0, 0, i, seed) for i, seed in enumerate(seeds)]
+        heapq.heapify(heap)
+        discovered = len(heap)
+        downloaded = 0
+
+        while heap and (budget is None or downloaded < budget):
+            _, priority, _, author = heapq.heappop(heap)
+            if author in visited or -priority != score[author]:
+                continue
+            visited.add(author)
+
+            author, props = self.crawl(author, coauthors=True)
+            downloaded += 1
+            count('snowball_pages_total')
+            if props is None:
+                continue
+
+            coauthors = props.pop('coauthors')
+            if hop[author] < hops:
+                for coauthor, shared in coauthors.items():
+                    if coauthor in visited:
+                        continue
+                    score[coauthor] += shared
+                    hop[coauthor] = min(hop.get(coauthor, hop[author] + 1), hop[author] + 1)
+                    heapq.heappush(heap, (hop[coauthor], -score[coauthor], discovered, coauthor))
+                    discovered += 1
+
+            yield author, props, hop[author]
 
 if __name__ == "__main__":
     arg_parser = ArgumentParser()
 
     # Obtención de los argumentos
-    arg_parser.add_argument("--mask", action="store", help="Máscara que se ha aplicado para obtener los IDs", default=None, choices=["spain", "uclm"])
+    arg_parser.add_argument("--mask", action="store", help="Máscara del registro que se ha aplicado para obtener los IDs", default=None)
+    arg_parser.add_argument("--masks-file", default=None, help="Fichero JSON con máscaras adicionales")
+    arg_parser.add_argument("--seeds", nargs="*", default=None, help="IDs de los autores semilla de la descarga en bola de nieve (x/y)")
+    arg_parser.add_argument("--hops", type=int, default=2, help="Distancia máxima a las semillas en la descarga en bola de nieve")
+    arg_parser.add_argument("--budget", type=int, default=None, help="Número máximo de páginas en la descarga en bola de nieve")
 
     args = arg_parser.parse_args()
 
-    # Directorio actual
-    current_path = os.path.dirname(os.path.realpath(__file__))
+    if args.mask is not None:
+        registry = MaskRegistry.from_file(args.masks_file) if args.masks_file is not None else MaskRegistry()
+        if args.mask not in registry:
+            arg_parser.error("máscara desconocida: {:s} (disponibles: {:s})".format(args.mask, ', '.join(registry.names)))
 
     # Directorio de datos
-    data_path = current_path + '/data'
+    data_path = data_dir()
 
     # Fichero de IDs
-    filename = data_path + "/{:s}-ids.txt".format(args.mask)
+    filename = data_path + ("/{:s}-ids.txt".format(args.mask) if args.mask is not None else "/full-db-ids.txt")
 
     # Inicialización del diccionario donde se almacenarán los datos
     auhtors_data = {}
 
     crawler = Crawler()
 
-    # Lista de identificadores
-    with open(filename) as data_file:
-        data = data_file.read().splitlines()
-    
     # Inicialización del diccionarios de autores
     authors_data = {}
 
-    # Descarga de los datos
-    for id in tqdm(data, desc="Procesando investigadores"):
-        author, props = crawler.crawl(id)
-        # None si HTTP404
-        if props is not None:
-            authors_data[author] = props
+    # Descarga en bola de nieve a partir de las semillas (sin lista de identificadores)
+    if args.seeds:
+        with stage('crawler.snowball') as st:
+            for author, props, hop in tqdm(crawler.snowball(['homepages/' + seed for seed in args.seeds], hops=args.hops, budget=args.budget),
+                                           desc="Procesando investigadores"):
+                authors_data[author] = props
+                st.add()
+    else:
+        # Lista de identificadores
+        with open(filename) as data_file:
+            data = data_file.read().splitlines()
+
+        # Descarga de los datos
+        with stage('crawler.crawl') as st:
+            for id in tqdm(data, desc="Procesando investigadores"):
+                author, props = crawler.crawl(id)
+                # None si HTTP404
+                if props is not None:
+                    authors_data[author] = props
+                st.add()
 
-    np.save(data_path + '/authors_data.npy', authors_data)
\ No newline at end of file
+    # Almacén columnar (claves de publicación internadas y publicaciones de cada autor como CSR)
+    AuthorStore.from_authors(authors_data.items()).save(data_path + '/' + STORE_NAME)
\ No newline at end of file
@@ -3,6 +3,12 @@ from lxml import etree
 from tqdm import tqdm
 import argparse
 
+try:
+    from modules.instrumentation import stage
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from instrumentation import stage
+
 class Decoder:    
     '''
     Decodificador para el archivo XMl que transcribe de ISO-8859-1 a UTF-8 con las transcripciones especificadas en el archivo DTD
@@ -94,14 +100,17 @@ class Decoder:
             dst : str
                 directorio donde esta almacenada la base de datos decodificada
         '''
-        with gzip.open(self.src,mode='rt', encoding='ISO-8859-1', newline='\n') as src_file:
+        with stage('decoder.recode_file') as st, gzip.open(self.src,mode='rt', encoding='ISO-8859-1', newline='\n') as src_file:
             #with gzip.open(self.dst, mode='wt', encoding='UTF-8', newline='\n') as dst_file:
             with open(self.dst, mode='wt', encoding='UTF-8', newline='\n') as dst_file:
                 ''' Reemplaza la codificacion por la correcta (primera linea del xml) '''
                 src_file.readline()
                 dst_file.write('<?xml version="1.0" encoding="UTF-8"?>\n') 
-                for line in tqdm(src_file, desc='Decodificando fichero XML'):
+                pbar = tqdm(src_file, desc='Decodificando fichero XML')
+                for line in pbar:
                     dst_file.write(self.expand_line(line))
+                # Líneas procesadas
+                st.add(pbar.n)
 
         return self.dst
 
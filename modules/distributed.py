@@ -0,0 +1,664 @@
+import os
+import sys
+import hmac
+import time
+import socket
+import ipaddress
+import threading
+import numpy as np
+from collections import deque
+from argparse import ArgumentParser
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+try:
+    from modules.instrumentation import timed, count
+    from modules import paths
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from instrumentation import timed, count
+    import paths
+    from scripts import data_dir
+
+# Variable de entorno con la clave compartida por el coordinador y los trabajadores. Los mensajes se serializan con
+# pickle, por lo que quien conozca la clave puede ejecutar código en ambos extremos: sin ella el coordinador sólo escucha
+# en la interfaz local, con una clave aleatoria que se pasa a los trabajadores locales
+AUTHKEY_ENV = 'GRAPHMINING_AUTHKEY'
+
+# Número de orígenes de cada lote
+BLOCK_SOURCES = 64
+
+# Segundos que un trabajador puede pasar sin devolver un lote ni renovar su cesión antes de que se asigne a otro. Los
+# trabajadores la renuevan cada LEASE / 3 segundos mientras procesan el lote
+LEASE = 300.0
+
+# Segundos máximos de la autenticación de una conexión (un cliente que no responde no bloquea a los demás)
+HANDSHAKE_TIMEOUT = 30.0
+
+# Número máximo de asignaciones de un mismo lote
+MAX_RETRIES = 3
+
+# Segundos que espera un trabajador cuando no quedan lotes pendientes pero otros aún no han terminado
+WAIT = 0.5
+
+
+def parse_address(address):
+    '''
+    Dirección 'host:puerto' como tupla (host, puerto)
+    '''
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def env_authkey():
+    '''
+    Clave compartida de la variable de entorno GRAPHMINING_AUTHKEY (None si no está definida)
+    '''
+    key = os.environ.get(AUTHKEY_ENV)
+    return key.encode() if key else None
+
+
+def is_loopback(host):
+    '''
+    Si la dirección corresponde a la interfaz local
+    '''
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def handshake(conn, authkey, role, timeout=HANDSHAKE_TIMEOUT):
+    '''
+    Autenticación mutua con la clave compartida: cada extremo envía un reto aleatorio y responde al del otro con un HMAC
+    que incluye su papel (de forma que no se puede devolver a un extremo su propio reto). Cada espera está limitada por
+    timeout, a diferencia de la autenticación de multiprocessing.connection
+
+    Parameters
+    ----------
+        conn : multiprocessing.connection.Connection
+            conexión sin autenticar
+
+        authkey : bytes
+            clave compartida
+
+        role : str
+            'coordinator' o 'worker'
+
+        timeout : float
+            segundos máximos de espera de cada mensaje
+
+    Raises
+    ------
+        AuthenticationError
+            si el otro extremo no responde a tiempo o no conoce la clave
+    '''
+    peer_role = 'worker' if role == 'coordinator' else 'coordinator'
+    challenge = os.urandom(32)
+    conn.send_bytes(challenge)
+
+    if not conn.poll(timeout):
+        raise AuthenticationError("El otro extremo no ha enviado su reto")
+    conn.send_bytes(hmac.new(authkey, role.encode() + conn.recv_bytes(64), 'sha256').digest())
+
+    if not conn.poll(timeout):
+        raise AuthenticationError("El otro extremo no ha respondido al reto")
+    expected = hmac.new(authkey, peer_role.encode() + challenge, 'sha256').digest()
+    if not hmac.compare_digest(conn.recv_bytes(64), expected):
+        raise AuthenticationError("Clave incorrecta")
+
+
+# Tareas: cada una define cómo procesa un trabajador un lote de orígenes (run), cómo se acumulan en el coordinador los
+# resultados parciales de los lotes (start, merge) y el resultado final (finish). Los parámetros son los de la tarea
+# (length, radius...) y n el número de autores
+
+def _lengths(compact, params):
+    return compact.cached('lengths_' + params.get('length', 'inverse'), lambda: paths.length_matrix(compact, params.get('length', 'inverse')))
+
+
+def _closeness_run(compact, sources, params):
+    return sources, paths._block_closeness(sources, _lengths(compact, params))
+
+
+def _closeness_merge(total, partial):
+    sources, (reached, totals) = partial
+    total['reached'][sources] = reached
+    total['totals'][sources] = totals
+
+
+def _betweenness_run(compact, sources, params):
+    length = params.get('length', 'inverse')
+    graph = compact.cached('lists_' + length, lambda: (np.asarray(compact.indptr).tolist(), np.asarray(compact.indices).tolist(),
+                                                       paths.edge_lengths(compact, length).tolist()))
+    return paths._block_betweenness(sources, graph)
+
+
+def _betweenness_merge(total, partial):
+    total['values'] += partial
+
+
+def _erdos_run(compact, sources, params):
+    # Distancia de cada autor al más cercano de los orígenes del lote
+    return paths.distances(compact, sources, length=params.get('length', 'hops')).min(axis=0)
+
+
+def _erdos_merge(total, partial):
+    np.minimum(total['values'], partial, out=total['values'])
+
+
+def _ego_run(compact, sources, params):
+    try:
+        from modules.ego import balls, induced
+    except ImportError:
+        from ego import balls, induced
+
+    reached = balls(compact, sources, radius=params.get('radius', 1))
+    egos = {}
+    for i, source in enumerate(sources.tolist()):
+        nodes = reached.indices[reached.indptr[i]:reached.indptr[i + 1]]
+        egos[source] = (nodes, induced(compact, nodes).m)
+    return egos
+
+
+TASKS = {
+    'closeness': {
+        'start': lambda n, sources, params: {'reached': np.ones(n, dtype=np.int64), 'totals': np.zeros(n)},
+        'run': _closeness_run,
+        'merge': _closeness_merge,
+        'finish': lambda total, n, sources, params: paths.closeness_values(n, total['reached'], total['totals']),
+    },
+    'betweenness': {
+        'start': lambda n, sources, params: {'values': np.zeros(n)},
+        'run': _betweenness_run,
+        'merge': _betweenness_merge,
+        'finish': lambda total, n, sources, params: paths.rescale(total['values'], n, len(sources), params.get('normalized', True)),
+    },
+    'erdos': {
+        'start': lambda n, sources, params: {'values': np.full(n, np.inf)},
+        'run': _erdos_run,
+        'merge': _erdos_merge,
+        'finish': lambda total, n, sources, params: total['values'],
+    },
+    'ego': {
+        'start': lambda n, sources, params: {'egos': {}},
+        'run': _ego_run,
+        'merge': lambda total, partial: total['egos'].update(partial),
+        'finish': lambda total, n, sources, params: total['egos'],
+    },
+}
+
+
+class Coordinator:
+    '''
+    Coordinador de una ejecución distribuida: reparte por TCP lotes de orígenes entre los trabajadores conectados, que
+    cargan el mismo grafo compacto proyectado en memoria, y acumula los resultados parciales que devuelven.
+
+    Cada lote se cede a un trabajador durante un tiempo limitado (lease), que el trabajador renueva mientras lo procesa.
+    Si el trabajador se desconecta o deja de renovarla, el lote vuelve a la cola y se asigna a otro; si se recibe más de
+    una vez, sólo cuenta el primer resultado. Un lote que se asigna más de max_retries veces hace fallar la ejecución.
+
+    El coordinador empieza a aceptar trabajadores al crearse (cada conexión se autentica en su propio hilo) y atiende a
+    los que se conectan después de terminar indicándoles que paren, hasta que se llama a close
+
+    Parameters
+    ----------
+        graph_path : str
+            directorio del grafo compacto (la misma ruta debe existir en todas las máquinas de los trabajadores)
+
+        task : str
+            tarea a ejecutar (ver TASKS)
+
+        sources : np.ndarray
+            posiciones de los orígenes
+
+        n : int
+            número de autores del grafo
+
+        params : dict
+            parámetros de la tarea
+
+        address : tuple
+            (host, puerto) donde escucha el coordinador (puerto 0 para uno libre)
+
+        authkey : bytes
+            clave compartida con los trabajadores (por defecto, la de GRAPHMINING_AUTHKEY). Sin clave sólo se admite una
+            dirección local y se genera una aleatoria para los trabajadores locales
+
+        block_size : int
+            número de orígenes de cada lote
+
+        lease : float
+            segundos que un trabajador puede pasar sin devolver un lote ni renovar su cesión
+
+        max_retries : int
+            número máximo de asignaciones de un mismo lote
+    '''
+    def __init__(self, graph_path, task, sources, n, params=None, address=('127.0.0.1', 0), authkey=None,
+                 block_size=BLOCK_SOURCES, lease=LEASE, max_retries=MAX_RETRIES):
+        if task not in TASKS:
+            raise ValueError("Tarea desconocida: {:s} (opciones: {:s})".format(task, ', '.join(TASKS)))
+
+        authkey = authkey or env_authkey()
+        if authkey is None:
+            if not is_loopback(address[0]):
+                raise ValueError("Para escuchar en {:s} se debe indicar una clave con la variable de entorno {:s}".format(address[0], AUTHKEY_ENV))
+            authkey = os.urandom(32)
+
+        self.graph_path = os.path.realpath(graph_path)
+        self.task = task
+        self.sources = np.asarray(sources, dtype=np.int64)
+        self.n = n
+        self.params = params or {}
+        self.authkey = authkey
+        self.lease = lease
+        self.max_retries = max_retries
+
+        self.batches = [self.sources[start:start + block_size] for start in range(0, len(self.sources), block_size)]
+        self.pending = deque(range(len(self.batches)))
+        self.leases = {}
+        self.attempts = [0] * len(self.batches)
+        self.completed = set()
+        self.retried = 0
+        self.workers = 0
+        self.error = None
+        self.closed = False
+
+        self.total = TASKS[task]['start'](n, self.sources, self.params)
+        self.condition = threading.Condition()
+
+        # La autenticación se hace en el hilo de cada conexión (ver handshake), no en accept
+        self.listener = Listener(address)
+        self.address = self.listener.address
+        self.accepting = threading.Thread(target=self._accept, daemon=True)
+        self.accepting.start()
+
+    @property
+    def finished(self):
+        return len(self.completed) == len(self.batches) or self.error is not None
+
+    def _expire(self):
+        '''
+        Devuelve a la cola los lotes cuya cesión ha caducado (se llama con el cerrojo adquirido)
+        '''
+        now = time.monotonic()
+        for batch, (worker, deadline) in list(self.leases.items()):
+            if deadline < now:
+                self._requeue(batch)
+
+    def _requeue(self, batch):
+        '''
+        Vuelve a poner en cola un lote perdido (se llama con el cerrojo adquirido)
+        '''
+        del self.leases[batch]
+        if batch in self.completed:
+            return
+        if self.attempts[batch] >= self.max_retries:
+            self.error = "El lote {:d} se ha perdido {:d} veces".format(batch, self.attempts[batch])
+        else:
+            self.retried += 1
+            count('distributed_batches_total', 1, task=self.task, status='retried')
+            self.pending.append(batch)
+        self.condition.notify_all()
+
+    def _next(self, worker):
+        '''
+        Siguiente mensaje para un trabajador que pide trabajo
+        '''
+        with self.condition:
+            self._expire()
+            if self.finished:
+                return ('stop',)
+            if not self.pending:
+                return ('wait', WAIT)
+
+            # Un lote reintentado puede haberse completado después de volver a la cola
+            while self.pending and self.pending[0] in self.completed:
+                self.pending.popleft()
+            if not self.pending:
+                return ('wait', WAIT)
+
+            batch = self.pending.popleft()
+            self.attempts[batch] += 1
+            self.leases[batch] = (worker, time.monotonic() + self.lease)
+            return ('batch', batch, self.batches[batch])
+
+    def _renew(self, worker, batch):
+        '''
+        Prolonga la cesión de un lote mientras el trabajador lo procesa
+        '''
+        with self.condition:
+            if self.leases.get(batch, (None,))[0] == worker:
+                self.leases[batch] = (worker, time.monotonic() + self.lease)
+
+    def _result(self, worker, batch, partial):
+        '''
+        Acumula el resultado parcial de un lote (sólo la primera vez que se recibe)
+        '''
+        with self.condition:
+            if self.leases.get(batch, (None,))[0] == worker:
+                del self.leases[batch]
+            if batch in self.completed:
+                return
+            TASKS[self.task]['merge'](self.total, partial)
+            self.completed.add(batch)
+            count('distributed_batches_total', 1, task=self.task, status='done')
+            self.condition.notify_all()
+
+    def _serve(self, conn, worker):
+        '''
+        Atiende a un trabajador hasta que termina o se desconecta
+        '''
+        try:
+            handshake(conn, self.authkey, 'coordinator')
+            conn.recv()
+            conn.send(('setup', self.graph_path, self.task, self.params, self.lease))
+            while True:
+                message = conn.recv()
+                if message[0] == 'result':
+                    self._result(worker, message[1], message[2])
+                    continue
+                if message[0] == 'renew':
+                    self._renew(worker, message[1])
+                    continue
+
+                reply = self._next(worker)
+                conn.send(reply)
+                if reply[0] == 'stop':
+                    break
+        except (EOFError, OSError, AuthenticationError):
+            pass
+        finally:
+            conn.close()
+            # Los lotes que tenía cedidos el trabajador se pierden: vuelven a la cola
+            with self.condition:
+                for batch in [batch for batch, (owner, _) in self.leases.items() if owner == worker]:
+                    self._requeue(batch)
+
+    def _accept(self):
+        '''
+        Acepta conexiones de trabajadores hasta que se cierra el coordinador (los que llegan tras terminar reciben 'stop')
+        '''
+        while not self.closed:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                # Cierre del coordinador
+                continue
+            if self.closed:
+                conn.close()
+                break
+            with self.condition:
+                self.workers += 1
+                worker = self.workers
+            threading.Thread(target=self._serve, args=(conn, worker), daemon=True).start()
+
+    @timed('distributed.run', items=lambda result: len(result))
+    def run(self, timeout=None):
+        '''
+        Reparte los lotes y espera a que todos se hayan completado
+
+        Parameters
+        ----------
+            timeout : float
+                segundos máximos de espera (None para esperar indefinidamente)
+
+        Returns
+        -------
+            result
+                resultado de la tarea (ver TASKS)
+        '''
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.condition:
+            while not self.finished:
+                if deadline is not None and time.monotonic() > deadline:
+                    self.error = "Se ha superado el tiempo máximo de espera ({:d} de {:d} lotes)".format(len(self.completed), len(self.batches))
+                    break
+                # Las cesiones caducadas también se revisan aunque ningún trabajador pida trabajo
+                self.condition.wait(min(self.lease, 1.0))
+                self._expire()
+
+        self.close()
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        return TASKS[self.task]['finish'](self.total, self.n, self.sources, self.params)
+
+    def close(self):
+        '''
+        Deja de aceptar trabajadores (una conexión propia desbloquea la espera de accept)
+        '''
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            Client(self.address).close()
+        except (OSError, EOFError):
+            pass
+        self.accepting.join(timeout=HANDSHAKE_TIMEOUT)
+        self.listener.close()
+
+
+def _heartbeat(conn, lock, current, interval, stop):
+    '''
+    Renueva la cesión del lote en curso cada interval segundos hasta que se activa stop
+    '''
+    while not stop.wait(interval):
+        batch = current[0]
+        if batch is None:
+            continue
+        try:
+            with lock:
+                conn.send(('renew', batch))
+        except (OSError, EOFError):
+            break
+
+
+def work(address, authkey=None, crash_after=None, timeout=HANDSHAKE_TIMEOUT):
+    '''
+    Trabajador: se conecta al coordinador, carga el grafo proyectado en memoria y procesa lotes de orígenes hasta que el
+    coordinador indica que ha terminado
+
+    Parameters
+    ----------
+        address : tuple
+            (host, puerto) del coordinador
+
+        authkey : bytes
+            clave compartida con el coordinador (por defecto, la de GRAPHMINING_AUTHKEY)
+
+        crash_after : int
+            termina el proceso bruscamente tras este número de lotes, sin devolver el siguiente (para probar los
+            reintentos)
+
+        timeout : float
+            segundos máximos de la autenticación (si el coordinador está terminando no llega a responder)
+
+    Returns
+    -------
+        done : int
+            número de lotes procesados
+    '''
+    try:
+        from modules.compact import CompactGraph
+    except ImportError:
+        from compact import CompactGraph
+
+    authkey = authkey or env_authkey()
+    if authkey is None:
+        raise ValueError("Se debe indicar la clave del coordinador con la variable de entorno {:s}".format(AUTHKEY_ENV))
+
+    done = 0
+    try:
+        conn = Client(tuple(address))
+    except OSError:
+        # El coordinador ya ha terminado
+        return done
+
+    # El lote en curso se renueva desde otro hilo; los envíos de ambos hilos se serializan con un cerrojo
+    lock, current, stop = threading.Lock(), [None], threading.Event()
+    try:
+        handshake(conn, authkey, 'worker', timeout=timeout)
+        conn.send(('hello', socket.gethostname(), os.getpid()))
+        _, graph_path, task, params, lease = conn.recv()
+        compact = CompactGraph.load(graph_path)
+        run = TASKS[task]['run']
+        threading.Thread(target=_heartbeat, args=(conn, lock, current, lease / 3, stop), daemon=True).start()
+
+        while True:
+            with lock:
+                conn.send(('next',))
+            message = conn.recv()
+            if message[0] == 'stop':
+                break
+            if message[0] == 'wait':
+                time.sleep(message[1])
+                continue
+
+            _, batch, sources = message
+            if crash_after is not None and done >= crash_after:
+                os._exit(1)
+            current[0] = batch
+            partial = run(compact, sources, params)
+            current[0] = None
+            with lock:
+                conn.send(('result', batch, partial))
+            done += 1
+    except (EOFError, OSError, AuthenticationError):
+        # El coordinador ha terminado, se ha caído o no acepta la clave
+        pass
+    finally:
+        stop.set()
+        conn.close()
+
+    return done
+
+
+def start_workers(coordinator, n_workers, crash_after=None):
+    '''
+    Lanza n_workers trabajadores locales (procesos independientes que se conectan por TCP al coordinador con su clave)
+    '''
+    import multiprocessing
+
+    crash_after = crash_after or {}
+    workers = [multiprocessing.Process(target=work, args=(coordinator.address, coordinator.authkey, crash_after.get(i)))
+               for i in range(n_workers)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def stop_workers(workers, timeout=HANDSHAKE_TIMEOUT):
+    '''
+    Espera a que terminen los trabajadores locales y termina los que sigan vivos tras timeout segundos
+    '''
+    deadline = time.monotonic() + timeout
+    for worker in workers:
+        worker.join(timeout=max(deadline - time.monotonic(), 0))
+        if worker.is_alive():
+            worker.terminate()
+            worker.join()
+
+
+def run_local(graph_path, task, sources, params=None, n_workers=2, crash_after=None, timeout=None, **kwargs):
+    '''
+    Ejecución con el coordinador en este proceso y n_workers trabajadores locales (procesos independientes que se
+    conectan por TCP como lo harían desde otras máquinas)
+
+    Parameters
+    ----------
+        graph_path, task, sources, params
+            ver Coordinator
+
+        n_workers : int
+            número de trabajadores
+
+        crash_after : dict
+            {trabajador: lotes tras los que termina bruscamente} (ver work)
+
+        timeout : float
+            segundos máximos de espera (el coordinador espera a que se conecten nuevos trabajadores si todos terminan)
+
+        kwargs
+            resto de parámetros de Coordinator
+
+    Returns
+    -------
+        (result, coordinator) : resultado de la tarea y coordinador (con los lotes reintentados)
+    '''
+    try:
+        from modules.compact import CompactGraph
+    except ImportError:
+        from compact import CompactGraph
+
+    n = CompactGraph.load(graph_path).n
+    coordinator = Coordinator(graph_path, task, sources, n, params=params, **kwargs)
+    workers = start_workers(coordinator, n_workers, crash_after=crash_after)
+
+    try:
+        result = coordinator.run(timeout=timeout)
+    finally:
+        coordinator.close()
+        stop_workers(workers)
+
+    return result, coordinator
+
+
+def select_sources(n, samples=None, seed=0):
+    '''
+    Orígenes de la ejecución: todos los autores o una muestra aleatoria (ordenada) de ellos
+    '''
+    if samples is None or samples >= n:
+        return np.arange(n)
+    return np.sort(np.random.RandomState(seed).choice(n, size=samples, replace=False))
+
+
+if __name__ == "__main__":
+    data_path = data_dir()
+
+    arg_parser = ArgumentParser()
+    subparsers = arg_parser.add_subparsers(dest="role")
+    subparsers.required = True
+
+    # Obtención de los argumentos
+    parser = subparsers.add_parser("coordinator", help="Reparte los lotes de orígenes y acumula los resultados")
+    parser.add_argument("task", choices=list(TASKS), help="Tarea")
+    parser.add_argument("--graph", default=data_path + '/colab_graph', help="Directorio del grafo compacto")
+    parser.add_argument("--address", default="127.0.0.1:5100", help="Dirección donde escucha el coordinador (host:puerto)")
+    parser.add_argument("--local", type=int, default=0, help="Número de trabajadores locales a lanzar")
+    parser.add_argument("--samples", type=int, default=None, help="Número de orígenes (por defecto, todos los autores)")
+    parser.add_argument("--length", default=None, choices=paths.LENGTHS, help="Longitud de las aristas")
+    parser.add_argument("--top", type=int, default=10, help="Número de autores a mostrar")
+
+    parser = subparsers.add_parser("worker", help="Procesa lotes de orígenes del coordinador")
+    parser.add_argument("address", help="Dirección del coordinador (host:puerto)")
+
+    args = arg_parser.parse_args()
+
+    if args.role == 'worker':
+        print("Lotes procesados: {:d}".format(work(parse_address(args.address))))
+        sys.exit(0)
+
+    try:
+        from modules.compact import CompactGraph
+    except ImportError:
+        from compact import CompactGraph
+
+    compact = CompactGraph.load(args.graph)
+    params = {'length': args.length} if args.length is not None else {}
+    coordinator = Coordinator(args.graph, args.task, select_sources(compact.n, args.samples), compact.n, params=params,
+                              address=parse_address(args.address))
+
+    workers = start_workers(coordinator, args.local)
+    print("Coordinador escuchando en {:s}:{:d}".format(*coordinator.address))
+    try:
+        result = coordinator.run()
+    finally:
+        coordinator.close()
+        stop_workers(workers)
+
+    if args.task == 'ego':
+        for source, (nodes, m) in list(result.items())[:args.top]:
+            print("    {:<30s} {:>8d} autores {:>10d} aristas".format(compact.ids[source][10:], len(nodes), m))
+    else:
+        for i in np.argsort(-result if args.task != 'erdos' else result, kind='stable')[:args.top].tolist():
+            print("    {:<30s} {:.6f}".format(compact.ids[i][10:], result[i]))
@@ -0,0 +1,187 @@
+import os
+import numpy as np
+from argparse import ArgumentParser
+
+try:
+    from modules.compact import CompactGraph, worker_pool, worker_shared
+    from modules.instrumentation import timed
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from compact import CompactGraph, worker_pool, worker_shared
+    from instrumentation import timed
+    from scripts import data_dir
+
+# Número de autores cuyas redes ego se expanden a la vez en cada bloque
+BLOCK_SOURCES = 256
+
+
+def balls(compact, sources, radius=1):
+    '''
+    Nodos a distancia menor o igual que radius de cada origen, mediante una búsqueda en anchura acotada y simultánea para
+    todos los orígenes: las fronteras de todos ellos forman las filas de una matriz dispersa que se multiplica en cada nivel
+    por la matriz de adyacencia. Los nodos compartidos por varias redes ego se expanden en un único producto, y sólo se
+    expanden los nodos de la frontera de cada nivel
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        sources : np.ndarray
+            posición de cada origen
+
+        radius : int
+            distancia máxima
+
+    Returns
+    -------
+        reached : scipy.sparse.csr_matrix
+            (orígenes, n): en cada fila, los nodos alcanzados (ordenados) con su distancia al origen + 1
+    '''
+    from scipy import sparse
+
+    n = compact.n
+    pattern = sparse.csr_matrix((np.ones(len(compact.indices), dtype=np.int32), compact.indices, compact.indptr), shape=(n, n))
+
+    # Se almacena radius + 2 - distancia, de forma que la menor distancia a cada nodo es el mayor valor
+    k = len(sources)
+    reached = sparse.csr_matrix((np.full(k, radius + 2, dtype=np.int32), (np.arange(k), sources)), shape=(k, n))
+    frontier = reached
+
+    for level in range(1, radius + 1):
+        expanded = (frontier @ pattern).tocsr()
+        expanded.data = np.full(len(expanded.data), radius + 2 - level, dtype=np.int32)
+        merged = reached.maximum(expanded).tocsr()
+
+        # Frontera del siguiente nivel: los nodos alcanzados por primera vez en este
+        frontier = merged.copy()
+        frontier.data = (frontier.data == radius + 2 - level).astype(np.int32)
+        frontier.eliminate_zeros()
+        reached = merged
+
+        if frontier.nnz == 0:
+            break
+
+    reached.data = radius + 3 - reached.data
+    reached.sort_indices()
+    return reached
+
+
+def induced(compact, nodes):
+    '''
+    Subgrafo inducido por una lista ordenada de nodos, recorriendo sólo sus listas de coautores (subgraph recorre todas las
+    aristas del grafo, lo que para miles de redes ego pequeñas es mucho más costoso)
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        nodes : np.ndarray
+            posiciones ordenadas de los nodos del subgrafo
+
+    Returns
+    -------
+        subgraph : CompactGraph
+    '''
+    nodes = np.asarray(nodes, dtype=np.int64)
+    starts = np.asarray(compact.indptr[nodes], dtype=np.int64)
+    counts = np.asarray(compact.indptr[nodes + 1], dtype=np.int64) - starts
+    positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+    # Coautores que pertenecen al subgrafo y su nueva posición (las listas siguen ordenadas)
+    neighbours = np.asarray(compact.indices[positions])
+    location = np.minimum(np.searchsorted(nodes, neighbours), max(len(nodes) - 1, 0))
+    keep = nodes[location] == neighbours if len(nodes) else np.zeros(0, dtype=bool)
+
+    rows = np.repeat(np.arange(len(nodes)), counts)[keep]
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(nodes)), out=indptr[1:])
+
+    return CompactGraph(np.asarray(compact.ids[nodes]), indptr, location[keep].astype(np.int32), np.asarray(compact.weights[positions[keep]]),
+                        names=np.asarray(compact.names[nodes]), affiliations=np.asarray(compact.affiliations[nodes]))
+
+
+def _block_egos(sources, radius, compact=None):
+    '''
+    Redes ego de un bloque de orígenes
+    '''
+    compact = worker_shared(compact)
+    reached = balls(compact, sources, radius=radius)
+
+    egos = []
+    for i, source in enumerate(sources.tolist()):
+        start, end = reached.indptr[i], reached.indptr[i + 1]
+        nodes = reached.indices[start:end]
+
+        ego = induced(compact, nodes)
+        ego.cache['distance'] = reached.data[start:end] - 1
+        ego.cache['center'] = np.array(int(np.searchsorted(nodes, source)))
+        egos.append(ego)
+
+    return egos
+
+
+@timed('ego.ego_networks', items=len)
+def ego_networks(compact, authors, radius=1, n_jobs=1, block_size=BLOCK_SOURCES):
+    '''
+    Redes ego (subgrafos inducidos por los autores a distancia menor o igual que radius) de muchos autores a la vez, como
+    nx.ego_graph pero sin materializar el grafo en NetworkX. Los autores se procesan por bloques (ver balls) y los bloques se
+    reparten entre procesos
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        authors : list
+            identificadores ('homepages/x/y') o posiciones de los autores
+
+        radius : int
+            distancia máxima al autor
+
+        n_jobs : int
+            número de procesos entre los que se reparten los bloques
+
+        block_size : int
+            número de autores de cada bloque
+
+    Returns
+    -------
+        egos : list
+            red ego de cada autor (en el mismo orden) como CompactGraph con los pesos, nombres y afiliaciones. Su caché
+            incluye 'distance' (distancia de cada nodo al autor) y 'center' (posición del autor en la red ego)
+    '''
+    sources = np.array([compact.index[author] if isinstance(author, str) else int(author) for author in authors], dtype=np.int64)
+    blocks = [sources[start:start + block_size] for start in range(0, len(sources), block_size)]
+
+    if n_jobs > 1 and len(blocks) > 1:
+        with worker_pool(n_jobs, compact) as executor:
+            results = list(executor.map(_block_egos, blocks, [radius] * len(blocks)))
+    else:
+        results = [_block_egos(block, radius, compact) for block in blocks]
+
+    return [ego for result in results for ego in result]
+
+
+if __name__ == "__main__":
+    data_path = data_dir()
+
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("authors", nargs="+", help="IDs de los autores (x/y)")
+    arg_parser.add_argument("--radius", type=int, default=1, help="Distancia máxima al autor")
+    arg_parser.add_argument("--jobs", type=int, default=1, help="Número de procesos")
+    arg_parser.add_argument("--output", default=None, help="Directorio donde almacenar cada red ego (grafo compacto)")
+
+    args = arg_parser.parse_args()
+
+    compact = CompactGraph.load(data_path + '/colab_graph')
+    egos = ego_networks(compact, ['homepages/' + author for author in args.authors], radius=args.radius, n_jobs=args.jobs)
+
+    for author, ego in zip(args.authors, egos):
+        print("{:<20s} {:>8d} autores {:>10d} aristas".format(author, ego.n, ego.m))
+        if args.output is not None:
+            ego.save(os.path.join(args.output, author.replace('/', '-')))
@@ -0,0 +1,361 @@
+import os
+import gzip
+import numpy as np
+from argparse import ArgumentParser
+from xml.sax.saxutils import escape, quoteattr
+
+try:
+    from modules import communities, pagerank
+    from modules.compact import CompactGraph
+    from modules.instrumentation import timed
+    from modules.scripts import data_dir, results_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    import communities
+    import pagerank
+    from compact import CompactGraph
+    from instrumentation import timed
+    from scripts import data_dir, results_dir
+
+# Número de nodos o aristas que se escriben en cada bloque
+CHUNK_SIZE = 100000
+
+# Formatos de exportación disponibles
+FORMATS = ('parquet', 'csv', 'gexf', 'graphml')
+
+# Resultados por nodo de la caché del grafo compacto que se exportan como atributos (el resto de la caché son estructuras
+# auxiliares de los algoritmos: tablas de alias, fuerzas, triángulos...)
+CACHE_ATTRIBUTES = ('component_labels', 'core_numbers', 'distance')
+
+
+def _pids(ids):
+    '''
+    Identificadores de dblp (sin el prefijo 'homepages/') de los autores
+    '''
+    return np.array([author[10:] for author in np.asarray(ids).tolist()], dtype=str)
+
+
+def node_attributes(compact, attributes=None):
+    '''
+    Atributos por nodo que se exportan: los resultados de la caché del grafo compacto incluidos en CACHE_ATTRIBUTES
+    (componentes, números de núcleo, distancia al centro de una red ego) junto con los indicados (comunidades, PageRank...)
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        attributes : dict
+            {nombre: vector con un valor por nodo}
+
+    Returns
+    -------
+        attributes : dict
+            {nombre: np.ndarray}
+    '''
+    columns = {name: np.asarray(compact.cache[name]) for name in CACHE_ATTRIBUTES if name in compact.cache}
+    columns.update({name: np.asarray(value) for name, value in (attributes or {}).items()})
+    return columns
+
+
+def _align(ids, values, compact, fill):
+    '''
+    Reasigna un vector almacenado con sus identificadores a los autores del grafo compacto (fill para los que no aparecen)
+    '''
+    values = np.asarray(values)
+    aligned = np.full(compact.n, fill, dtype=np.result_type(values.dtype, np.asarray(fill).dtype))
+    stored = dict(zip(np.asarray(ids).tolist(), values.tolist()))
+    for i, author in enumerate(np.asarray(compact.ids).tolist()):
+        if author in stored:
+            aligned[i] = stored[author]
+    return aligned
+
+
+def stored_attributes(compact, path):
+    '''
+    Atributos almacenados junto al grafo compacto: el último vector de PageRank (pagerank.STATE_FILE) y la última partición
+    en comunidades (communities.STATE_FILE). Los autores que no estaban en la versión del grafo con la que se calcularon
+    quedan con PageRank NaN y comunidad -1
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        path : str
+            directorio del grafo compacto
+
+    Returns
+    -------
+        attributes : dict
+            {nombre: vector con un valor por nodo} con los atributos disponibles
+    '''
+    attributes = {}
+
+    state = pagerank.load_state(path)
+    if state is not None:
+        attributes['pagerank'] = _align(state[0], state[1], compact, np.nan)
+
+    labels = communities.load_labels(path)
+    if labels is not None:
+        attributes['community'] = _align(labels[0], labels[1], compact, -1)
+
+    return attributes
+
+
+def node_chunks(compact, attributes=None, chunk_size=CHUNK_SIZE):
+    '''
+    Genera los nodos por bloques como diccionarios de columnas (id, name, affiliation, degree y los atributos)
+    '''
+    columns = node_attributes(compact, attributes)
+    degrees = compact.degrees()
+
+    for start in range(0, compact.n, chunk_size):
+        end = min(start + chunk_size, compact.n)
+        chunk = {
+            'id': _pids(compact.ids[start:end]),
+            'name': np.asarray(compact.names[start:end]),
+            'affiliation': np.asarray(compact.affiliations[start:end]),
+            'degree': degrees[start:end],
+        }
+        chunk.update({name: value[start:end] for name, value in columns.items()})
+        yield chunk
+
+
+def edge_chunks(compact, chunk_size=CHUNK_SIZE):
+    '''
+    Genera las aristas (una vez por par de autores) por bloques de posiciones del CSR como diccionarios de columnas
+    (source, target, weight), sin materializar la lista completa de aristas
+    '''
+    ids = compact.ids
+    for start in range(0, len(compact.indices), chunk_size):
+        positions = np.arange(start, min(start + chunk_size, len(compact.indices)))
+        rows = np.searchsorted(compact.indptr, positions, side='right') - 1
+        cols = np.asarray(compact.indices[positions])
+        upper = rows < cols
+        yield {
+            'source': _pids(ids[rows[upper]]),
+            'target': _pids(ids[cols[upper]]),
+            'weight': np.asarray(compact.weights[positions])[upper],
+        }
+
+
+def write_parquet(chunks, path):
+    '''
+    Escribe los bloques en un fichero Parquet, un grupo de filas por bloque (requiere pyarrow)
+    '''
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("La exportación a Parquet requiere pyarrow (pip install pyarrow). Use el formato 'csv'")
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.table({name: pa.array(value.tolist(), type=pa.string()) if value.dtype.kind == 'U' else pa.array(value) for name, value in chunk.items()})
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_csv(chunks, path):
+    '''
+    Escribe los bloques en un fichero CSV separado por ';' (comprimido con gzip si la ruta termina en .gz)
+    '''
+    import pandas as pd
+
+    with (gzip.open(path, 'wt', encoding='utf-8') if path.endswith('.gz') else open(path, 'wt', encoding='utf-8')) as fcsv:
+        for i, chunk in enumerate(chunks):
+            pd.DataFrame(chunk).to_csv(fcsv, sep=';', index=False, header=i == 0)
+
+
+def _attribute_type(value):
+    return {'i': 'integer', 'u': 'integer', 'f': 'double', 'b': 'boolean'}.get(value.dtype.kind, 'string')
+
+
+def _attribute_value(value):
+    '''
+    Valor de un atributo como texto de XML (los booleanos de GEXF y GraphML se escriben en minúsculas)
+    '''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def write_gexf(compact, path, attributes=None, chunk_size=CHUNK_SIZE):
+    '''
+    Escribe el grafo en formato GEXF (Gephi) nodo a nodo y arista a arista, sin construir el documento XML en memoria
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        path : str
+            fichero de destino
+
+        attributes : dict
+            {nombre: vector con un valor por nodo} atributos adicionales de los nodos
+    '''
+    columns = ['affiliation', 'degree'] + list(node_attributes(compact, attributes).keys())
+
+    with open(path, 'wt', encoding='utf-8') as fgexf:
+        fgexf.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        fgexf.write('<gexf xmlns="http://www.gexf.net/1.2draft" version="1.2">\n')
+        fgexf.write('  <graph defaultedgetype="undirected" mode="static">\n')
+        fgexf.write('    <attributes class="node" mode="static">\n')
+
+        types = None
+        for chunk in node_chunks(compact, attributes, chunk_size):
+            if types is None:
+                types = {name: _attribute_type(chunk[name]) for name in columns}
+                for i, name in enumerate(columns):
+                    fgexf.write('      <attribute id="{:d}" title={:s} type="{:s}" />\n'.format(i, quoteattr(name), types[name]))
+                fgexf.write('    </attributes>\n    <nodes>\n')
+
+            for row in zip(chunk['id'].tolist(), chunk['name'].tolist(), *(chunk[name].tolist() for name in columns)):
+                fgexf.write('      <node id={:s} label={:s}><attvalues>{:s}</attvalues></node>\n'.format(
+                    quoteattr(row[0]), quoteattr(row[1]),
+                    ''.join('<attvalue for="{:d}" value={:s} />'.format(i, quoteattr(_attribute_value(value)))
+                            for i, value in enumerate(row[2:]))))
+
+        if types is None:
+            fgexf.write('    </attributes>\n    <nodes>\n')
+        fgexf.write('    </nodes>\n    <edges>\n')
+
+        edge_id = 0
+        for chunk in edge_chunks(compact, chunk_size):
+            for source, target, weight in zip(chunk['source'].tolist(), chunk['target'].tolist(), chunk['weight'].tolist()):
+                fgexf.write('      <edge id="{:d}" source={:s} target={:s} weight="{:d}" />\n'.format(
+                    edge_id, quoteattr(source), quoteattr(target), weight))
+                edge_id += 1
+
+        fgexf.write('    </edges>\n  </graph>\n</gexf>\n')
+
+
+def write_graphml(compact, path, attributes=None, chunk_size=CHUNK_SIZE):
+    '''
+    Escribe el grafo en formato GraphML nodo a nodo y arista a arista, sin construir el documento XML en memoria
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        path : str
+            fichero de destino
+
+        attributes : dict
+            {nombre: vector con un valor por nodo} atributos adicionales de los nodos
+    '''
+    columns = ['name', 'affiliation', 'degree'] + list(node_attributes(compact, attributes).keys())
+    graphml_types = {'integer': 'long', 'double': 'double', 'boolean': 'boolean', 'string': 'string'}
+
+    with open(path, 'wt', encoding='utf-8') as fgraphml:
+        fgraphml.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        fgraphml.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+
+        header = False
+        for chunk in node_chunks(compact, attributes, chunk_size):
+            if not header:
+                for i, name in enumerate(columns):
+                    fgraphml.write('  <key id="d{:d}" for="node" attr.name={:s} attr.type="{:s}" />\n'.format(
+                        i, quoteattr(name), graphml_types[_attribute_type(chunk[name])]))
+                fgraphml.write('  <key id="weight" for="edge" attr.name="weight" attr.type="long" />\n')
+                fgraphml.write('  <graph edgedefault="undirected">\n')
+                header = True
+
+            for row in zip(chunk['id'].tolist(), *(chunk[name].tolist() for name in columns)):
+                fgraphml.write('    <node id={:s}>{:s}</node>\n'.format(
+                    quoteattr(row[0]),
+                    ''.join('<data key="d{:d}">{:s}</data>'.format(i, escape(_attribute_value(value))) for i, value in enumerate(row[1:]))))
+
+        if not header:
+            fgraphml.write('  <key id="weight" for="edge" attr.name="weight" attr.type="long" />\n')
+            fgraphml.write('  <graph edgedefault="undirected">\n')
+
+        for chunk in edge_chunks(compact, chunk_size):
+            for source, target, weight in zip(chunk['source'].tolist(), chunk['target'].tolist(), chunk['weight'].tolist()):
+                fgraphml.write('    <edge source={:s} target={:s}><data key="weight">{:d}</data></edge>\n'.format(
+                    quoteattr(source), quoteattr(target), weight))
+
+        fgraphml.write('  </graph>\n</graphml>\n')
+
+
+@timed('export.export_graph', items=lambda paths: len(paths))
+def export_graph(compact, path, format='csv', attributes=None, chunk_size=CHUNK_SIZE):
+    '''
+    Exporta el grafo por bloques, con memoria acotada por el tamaño del bloque
+
+    Con los formatos columnares (parquet, csv) se generan dos tablas en el directorio path: nodes (id, name, affiliation,
+    degree y atributos) y edges (source, target, weight). Con gexf y graphml se genera un único fichero
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        path : str
+            directorio (parquet, csv) o fichero (gexf, graphml) de destino
+
+        format : str
+            formato de exportación (ver FORMATS)
+
+        attributes : dict
+            {nombre: vector con un valor por nodo} atributos adicionales de los nodos (comunidad, PageRank...)
+
+        chunk_size : int
+            número de nodos o aristas por bloque
+
+    Returns
+    -------
+        paths : list
+            ficheros generados
+    '''
+    if format not in FORMATS:
+        raise ValueError("Formato desconocido: {:s} (disponibles: {:s})".format(format, ', '.join(FORMATS)))
+
+    if format == 'gexf':
+        write_gexf(compact, path, attributes, chunk_size)
+        return [path]
+    if format == 'graphml':
+        write_graphml(compact, path, attributes, chunk_size)
+        return [path]
+
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    writer, extension = (write_parquet, '.parquet') if format == 'parquet' else (write_csv, '.csv.gz')
+    paths = [os.path.join(path, 'nodes' + extension), os.path.join(path, 'edges' + extension)]
+    writer(node_chunks(compact, attributes, chunk_size), paths[0])
+    writer(edge_chunks(compact, chunk_size), paths[1])
+
+    return paths
+
+
+if __name__ == "__main__":
+    data_path = data_dir()
+    results_path = results_dir()
+
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--format", default="csv", choices=FORMATS, help="Formato de exportación")
+    arg_parser.add_argument("--output", default=None, help="Directorio o fichero de destino")
+    arg_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Número de nodos o aristas por bloque")
+
+    args = arg_parser.parse_args()
+
+    output = args.output or results_path + ('/colab_graph.' + args.format if args.format in ('gexf', 'graphml') else '/colab_graph')
+
+    if args.format in ('gexf', 'graphml'):
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    compact = CompactGraph.load(data_path + '/colab_graph')
+    attributes = stored_attributes(compact, data_path + '/colab_graph')
+    for path in export_graph(compact, output, format=args.format, attributes=attributes, chunk_size=args.chunk_size):
+        print("Se ha exportado el grafo en: {:s}".format(path))
@@ -0,0 +1,391 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+from argparse import ArgumentParser
+
+try:
+    from modules.compact import CompactGraph
+    from modules.authors import AuthorStore
+    from modules.instrumentation import stage
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from compact import CompactGraph
+    from authors import AuthorStore
+    from instrumentation import stage
+    from scripts import data_dir
+
+# Registro (publicación, autor) de los ficheros de particiones: hash de 64 bits de la clave de la publicación
+RECORD = np.dtype([('pub', '<u8'), ('author', '<i4')])
+
+# Registro (par de autores, peso) de los ficheros ordenados: clave a * n + b (con a < b) y publicaciones compartidas
+PAIR = np.dtype([('key', '<u8'), ('weight', '<u4')])
+
+# Número máximo de ficheros ordenados que se mezclan a la vez
+FAN_IN = 64
+
+
+def pub_hash(key):
+    '''
+    Hash estable de 64 bits de la clave de una publicación (el hash de Python cambia entre procesos)
+    '''
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def iter_authors(path):
+    '''
+    Recorre los datos de los autores sin cargarlos completos en memoria
+
+    Parameters
+    ----------
+        path : str
+            fichero JSON lines con un autor por línea ({"id", "name", "affiliation", "pubs"}), directorio del almacén
+            columnar de los autores (ver authors.AuthorStore) o, si termina en .npy, el diccionario de autores almacenado
+            por versiones anteriores del Crawler (éste sí se carga completo)
+
+    Returns
+    -------
+        authors : generator
+            (identificador, propiedades) de cada autor
+    '''
+    if os.path.isdir(path):
+        yield from AuthorStore.load(path, interned=False).items()
+        return
+
+    if path.endswith('.npy'):
+        yield from np.load(path, allow_pickle=True).item().items()
+        return
+
+    with open(path, encoding='utf-8') as fauthors:
+        for line in fauthors:
+            if line.strip():
+                props = json.loads(line)
+                yield props.pop('id'), props
+
+
+class _Spill:
+    '''
+    Acumula registros en memoria y los añade al fichero cuando se alcanza el tamaño del bloque
+    '''
+    def __init__(self, path, dtype, size):
+        self.path = path
+        self.buffer = np.empty(size, dtype=dtype)
+        self.length = 0
+        self.total = 0
+
+    def add(self, records):
+        start = 0
+        while start < len(records):
+            taken = min(len(records) - start, len(self.buffer) - self.length)
+            self.buffer[self.length:self.length + taken] = records[start:start + taken]
+            self.length += taken
+            start += taken
+            if self.length == len(self.buffer):
+                self.flush()
+
+    def flush(self):
+        if self.length > 0:
+            with open(self.path, 'ab') as fspill:
+                self.buffer[:self.length].tofile(fspill)
+            self.total += self.length
+            self.length = 0
+
+
+def _read(path, dtype, start, count):
+    '''
+    Lee 'count' registros del fichero a partir del registro 'start'
+    '''
+    with open(path, 'rb') as fread:
+        fread.seek(start * dtype.itemsize)
+        return np.fromfile(fread, dtype=dtype, count=count)
+
+
+def _reduce(pairs):
+    '''
+    Ordena los pares y suma los pesos de las claves repetidas
+    '''
+    pairs = pairs[np.argsort(pairs['key'], kind='stable')]
+    starts = np.r_[0, np.flatnonzero(np.diff(pairs['key'])) + 1] if len(pairs) else np.zeros(0, dtype=np.int64)
+    reduced = np.empty(len(starts), dtype=PAIR)
+    reduced['key'] = pairs['key'][starts]
+    reduced['weight'] = np.add.reduceat(pairs['weight'], starts) if len(starts) else []
+    return reduced
+
+
+def _emit_pairs(records, n, path, limit):
+    '''
+    Agrupa los registros de una partición por publicación y genera un fichero ordenado de pares de coautores por cada
+    lote de publicaciones cuyos pares caben en el límite de memoria
+
+    Returns
+    -------
+        runs : list
+            ficheros ordenados generados
+    '''
+    records = records[np.lexsort((records['author'], records['pub']))]
+
+    # Se descartan los autores repetidos en una misma publicación
+    if len(records) > 1:
+        duplicated = (records['pub'][1:] == records['pub'][:-1]) & (records['author'][1:] == records['author'][:-1])
+        records = records[np.r_[True, ~duplicated]]
+
+    starts = np.r_[0, np.flatnonzero(np.diff(records['pub'])) + 1] if len(records) else np.zeros(0, dtype=np.int64)
+    sizes = np.diff(np.r_[starts, len(records)])
+    pair_counts = sizes * (sizes - 1) // 2
+
+    # Lotes de publicaciones completas con un número de pares acotado
+    cumulative = np.cumsum(pair_counts)
+    cuts = np.searchsorted(cumulative, np.arange(limit, cumulative[-1] if len(cumulative) else 0, limit), side='right')
+    batches = [(a, b) for a, b in zip(np.r_[0, cuts], np.r_[cuts, len(starts)]) if b > a]
+
+    runs = []
+    for batch_start, batch_end in batches:
+        first, last = starts[batch_start], starts[batch_end] if batch_end < len(starts) else len(records)
+        authors = records['author'][first:last].astype(np.int64)
+
+        # Posición dentro de su publicación y número de coautores posteriores de cada registro
+        group = np.repeat(np.arange(batch_end - batch_start), sizes[batch_start:batch_end])
+        offset = np.arange(last - first) - (starts[batch_start:batch_end] - first)[group]
+        following = sizes[batch_start:batch_end][group] - offset - 1
+
+        # Pares (i, j) con i < j dentro de cada publicación (los autores están ordenados)
+        i = np.repeat(np.arange(last - first), following)
+        j = i + 1 + (np.arange(following.sum()) - np.repeat(np.cumsum(following) - following, following))
+
+        pairs = np.empty(len(i), dtype=PAIR)
+        pairs['key'] = (authors[i] * n + authors[j]).astype(np.uint64)
+        pairs['weight'] = 1
+
+        run = '{:s}.{:d}'.format(path, len(runs))
+        _reduce(pairs).tofile(run)
+        runs.append(run)
+
+    return runs
+
+
+class _RunReader:
+    '''
+    Lector por bloques de un fichero ordenado de pares
+    '''
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.position = 0
+        self.total = os.path.getsize(path) // PAIR.itemsize
+        self.buffer = np.zeros(0, dtype=PAIR)
+        self.refill()
+
+    def refill(self):
+        if len(self.buffer) == 0 and self.position < self.total:
+            self.buffer = _read(self.path, PAIR, self.position, self.size)
+            self.position += len(self.buffer)
+
+    @property
+    def active(self):
+        return len(self.buffer) > 0
+
+    def take(self, bound):
+        end = np.searchsorted(self.buffer['key'], bound, side='right')
+        taken, self.buffer = self.buffer[:end], self.buffer[end:]
+        self.refill()
+        return taken
+
+
+def _merge(runs, path, limit):
+    '''
+    Mezcla los ficheros ordenados en uno solo sumando los pesos de los pares repetidos. En cada paso se mezclan los
+    registros de todos los ficheros hasta la menor de las últimas claves leídas, que ya no pueden aparecer más adelante
+    '''
+    readers = [_RunReader(run, max(1, limit // len(runs))) for run in runs]
+
+    with open(path, 'wb') as fmerged:
+        while any(reader.active for reader in readers):
+            active = [reader for reader in readers if reader.active]
+            bound = min(reader.buffer['key'][-1] for reader in active)
+            _reduce(np.concatenate([reader.take(bound) for reader in active])).tofile(fmerged)
+
+    return path
+
+
+def build_graph_external(authors, path, memory_budget=1 << 30, workdir=None, n_shards=64):
+    '''
+    Construye el grafo de colaboración en memoria externa, con un consumo de memoria acotado independientemente del número
+    de autores y publicaciones:
+
+        1. Los pares (publicación, autor) se reparten por el hash de la publicación en ficheros de particiones
+        2. Cada partición se ordena y agrupa por publicación (las que superan el límite se vuelven a particionar) y se
+           generan los pares de coautores (a, b) por lotes, cada uno reducido a un fichero ordenado con su peso
+        3. Los ficheros ordenados se mezclan (en varias pasadas si son muchos) sumando los pesos de los pares repetidos
+        4. El resultado se escribe directamente en disco en el formato compacto (CSR), sin materializar el grafo
+
+    El desglose por año de las aristas no se conserva en este modo (sólo los pesos)
+
+    Parameters
+    ----------
+        authors : iterable
+            (identificador, propiedades) de cada autor, con las mismas propiedades que recibe build_graph (ver iter_authors)
+
+        path : str
+            directorio donde se almacena el grafo compacto resultante
+
+        memory_budget : int
+            memoria máxima aproximada (bytes) de los bloques de registros
+
+        workdir : str
+            directorio de los ficheros temporales (por defecto, un directorio temporal del sistema)
+
+        n_shards : int
+            número inicial de particiones
+
+    Returns
+    -------
+        compact : CompactGraph
+            grafo compacto almacenado en path (proyectado en memoria), con las componentes conexas y números de núcleo
+    '''
+    workdir = tempfile.mkdtemp(dir=workdir)
+    record_limit = max(1, memory_budget // (4 * RECORD.itemsize))
+    pair_limit = max(1, memory_budget // (4 * PAIR.itemsize))
+
+    try:
+        # 1. Reparto de los pares (publicación, autor) en particiones
+        ids, names, affiliations = [], [], []
+        shards = [_Spill(os.path.join(workdir, 'shard.{:d}'.format(i)), RECORD, max(1, record_limit // n_shards))
+                  for i in range(n_shards)]
+
+        with stage('external.partition') as st:
+            for author, props in authors:
+                index = len(ids)
+                ids.append(author)
+                names.append(props.get('name') or '')
+                affiliations.append(props.get('affiliation') or '')
+
+                hashes = np.array([pub_hash(pub) for pub in props.get('pubs', [])], dtype=np.uint64)
+                for shard in np.unique(hashes % n_shards):
+                    selected = hashes[hashes % n_shards == shard]
+                    records = np.empty(len(selected), dtype=RECORD)
+                    records['pub'] = selected
+                    records['author'] = index
+                    shards[shard].add(records)
+                st.add()
+
+            for shard in shards:
+                shard.flush()
+
+        n = len(ids)
+
+        # 2. Agrupación por publicación y generación de los pares de coautores
+        runs = []
+        pending = [(shard.path, shard.total, 0) for shard in shards if shard.total > 0]
+        with stage('external.pairs') as st:
+            while pending:
+                shard_path, total, level = pending.pop()
+                if total > record_limit and level < 4:
+                    # Partición demasiado grande: se vuelve a repartir con otros bits del hash
+                    subshards = [_Spill('{:s}.{:d}'.format(shard_path, i), RECORD, max(1, record_limit // 16)) for i in range(16)]
+                    for start in range(0, total, record_limit):
+                        records = _read(shard_path, RECORD, start, record_limit)
+                        bucket = (records['pub'] >> np.uint64(8 + 4 * level)) % np.uint64(16)
+                        for i, subshard in enumerate(subshards):
+                            subshard.add(records[bucket == i])
+                    for subshard in subshards:
+                        subshard.flush()
+                        if subshard.total > 0:
+                            pending.append((subshard.path, subshard.total, level + 1))
+                else:
+                    runs.extend(_emit_pairs(_read(shard_path, RECORD, 0, total), n, shard_path + '.run', pair_limit))
+                    st.add(total)
+                os.remove(shard_path)
+
+        # 3. Mezcla de los ficheros ordenados por pasadas de FAN_IN ficheros
+        with stage('external.merge') as st:
+            merged = 0
+            while len(runs) > 1:
+                next_runs = []
+                for start in range(0, len(runs), FAN_IN):
+                    group = runs[start:start + FAN_IN]
+                    next_runs.append(_merge(group, os.path.join(workdir, 'merged.{:d}'.format(merged)), pair_limit))
+                    merged += 1
+                    for run in group:
+                        os.remove(run)
+                runs = next_runs
+            st.add(merged)
+
+        # 4. Escritura del grafo compacto (cada arista en las dos direcciones, coautores ordenados)
+        with stage('external.csr') as st:
+            edges_path = runs[0] if runs else None
+            total = os.path.getsize(edges_path) // PAIR.itemsize if edges_path else 0
+
+            lower = np.zeros(n, dtype=np.int64)
+            upper = np.zeros(n, dtype=np.int64)
+            for start in range(0, total, pair_limit):
+                keys = _read(edges_path, PAIR, start, pair_limit)['key'].astype(np.int64)
+                upper += np.bincount(keys // n, minlength=n)
+                lower += np.bincount(keys % n, minlength=n)
+
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(lower + upper, out=indptr[1:])
+
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+            open_memmap = np.lib.format.open_memmap
+            indices = open_memmap(os.path.join(path, 'indices.npy'), mode='w+', dtype=np.int32, shape=(int(indptr[-1]),))
+            weights = open_memmap(os.path.join(path, 'weights.npy'), mode='w+', dtype=np.int32, shape=(int(indptr[-1]),))
+
+            # Los coautores menores que u se colocan al principio de su lista y los mayores a continuación. Las claves
+            # llegan ordenadas por (a, b), por lo que ambas partes quedan ordenadas
+            low_cursor = indptr[:-1].copy()
+            high_cursor = indptr[:-1] + lower
+            for start in range(0, total, pair_limit):
+                pairs = _read(edges_path, PAIR, start, pair_limit)
+                a = (pairs['key'] // np.uint64(n)).astype(np.int64)
+                b = (pairs['key'] % np.uint64(n)).astype(np.int64)
+
+                for rows, cols, cursor in ((a, b, high_cursor), (b, a, low_cursor)):
+                    order = np.argsort(rows, kind='stable')
+                    rows, cols, block_weights = rows[order], cols[order], pairs['weight'][order]
+                    group_starts = np.r_[0, np.flatnonzero(np.diff(rows)) + 1] if len(rows) else np.zeros(0, dtype=np.int64)
+                    counts = np.diff(np.r_[group_starts, len(rows)])
+                    positions = np.repeat(cursor[rows[group_starts]], counts) + np.arange(len(rows)) - np.repeat(group_starts, counts)
+                    indices[positions] = cols
+                    weights[positions] = block_weights
+                    cursor[rows[group_starts]] += counts
+
+                st.add(len(pairs))
+
+            indices.flush()
+            weights.flush()
+            del indices, weights
+
+            np.save(os.path.join(path, 'ids.npy'), np.array(ids))
+            np.save(os.path.join(path, 'indptr.npy'), indptr)
+            np.save(os.path.join(path, 'names.npy'), np.array(names))
+            np.save(os.path.join(path, 'affiliations.npy'), np.array(affiliations))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Componentes conexas y números de núcleo calculados sobre el grafo proyectado en memoria
+    compact = CompactGraph.load(path)
+    for name, function in (('component_labels', compact.component_labels), ('core_numbers', compact.core_numbers)):
+        np.save(os.path.join(path, 'cache.' + name + '.npy'), function())
+
+    return compact
+
+
+if __name__ == "__main__":
+    data_path = data_dir()
+
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--authors", default=data_path + '/authors_data.jsonl', help="Datos de los autores (JSON lines, almacén columnar o .npy)")
+    arg_parser.add_argument("--output", default=data_path + '/colab_graph', help="Directorio del grafo compacto")
+    arg_parser.add_argument("--memory", type=int, default=1024, help="Memoria máxima de los bloques (MB)")
+    arg_parser.add_argument("--workdir", default=None, help="Directorio de los ficheros temporales")
+
+    args = arg_parser.parse_args()
+
+    build_graph_external(iter_authors(args.authors), args.output, memory_budget=args.memory << 20, workdir=args.workdir)
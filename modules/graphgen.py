@@ -3,6 +3,40 @@ import numpy as np
 from collections import deque, defaultdict
 from tqdm import tqdm
 
+try:
+    from modules.instrumentation import timed
+    from modules.compact import CompactGraph
+    from modules.temporal import TemporalGraph
+    from modules.authors import load_authors
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from instrumentation import timed
+    from compact import CompactGraph
+    from temporal import TemporalGraph
+    from authors import load_authors
+    from scripts import data_dir
+
+def year_runs(years):
+    '''
+    Agrupa los años de las publicaciones compartidas en tramos (año, peso) ordenados por año
+
+    Parameters
+    ----------
+        years : iterable
+            año de cada publicación compartida (None si no consta, se agrupa como año 0)
+
+    Returns
+    -------
+        runs : list
+            lista de tuplas (año, número de publicaciones compartidas ese año) ordenada por año
+    '''
+    runs = defaultdict(int)
+    for year in years:
+        runs[year or 0] += 1
+    return sorted(runs.items())
+
+@timed('graphgen.build_graph', items=len)
 def build_graph(data):
     '''
 
@@ -60,6 +94,11 @@ def build_graph(data):
                     }
                 }
             }    
+
+            Si los datos de los autores incluyen el año de cada publicación ('years', como los descarga el Crawler), cada arista
+            incluye además el desglose de su peso por año como tramos (año, peso) ordenados:
+
+                'autor3': { 'weight': 2, 'years': [(2010, 1), (2015, 1)] }
     '''
 
     # Copiamos el diccionario para eliminar elemento al iterar sin afectar al original
@@ -99,30 +138,61 @@ def build_graph(data):
         # Eliminamos el autor del diccionario copia para que no se vuelva a comprobar -> todas las demás claves que estén relacionadas con ésta estarán actualizadas al finalizar la iteración
         del data_copy[key]
 
+        # Año de cada publicación del autor (si el Crawler lo ha almacenado) para desglosar el peso de las aristas por año
+        pub_years = dict(zip(value['pubs'], value['years'])) if value.get('years') else None
+
         # Iteramos sobre el resto de valores
         for _key, _value in data_copy.items():
-            # Obtenemos el tamaño de la intersección de las listas de valores
-            intersection = len(set(value['pubs'])&set(_value['pubs']))
+            # Obtenemos la intersección de las listas de valores
+            shared = set(value['pubs'])&set(_value['pubs'])
+            intersection = len(shared)
 
             # Actualizamos los valores de las dos claves
             if intersection > 0:
-                res[key]['pubs'][_key] = { 'weight': intersection }
-                res[_key]['pubs'][key] = { 'weight': intersection }
+                edge = { 'weight': intersection }
+                if pub_years is not None:
+                    edge['years'] = year_runs(pub_years[pub] for pub in shared)
+                res[key]['pubs'][_key] = edge
+                res[_key]['pubs'][key] = dict(edge)
 
         pbar.update()
 
     return {key: dict(value) for key, value in res.items()}
 
-if __name__ == "__main__":
-    data_path = os.path.dirname(os.path.realpath(__file__)) + '/data'
-
-    authors_data = np.load(data_path + '/authors_data.npy', allow_pickle=True).item()
+def save_graph(graph, data_path):
+    '''
+    Almacena el grafo en formato diccionario (colab_graph.npy) y su versión compacta con las componentes conexas y números
+    de núcleo ya calculados (directorio colab_graph), junto con el desglose por año si los datos lo incluyen
 
-    graph = dict(build_graph(authors_data))
+    Parameters
+    ----------
+        graph : dict
+            grafo de colaboración generado por build_graph
 
+        data_path : str
+            directorio de datos
+    '''
     # En caso de que un autor no tenga publicaciones en común con nadie (no tiene clave 'pubs'). Iteramos y establecemos a {}
     for author, props in graph.items():
         if 'pubs' not in props.keys():
             props['pubs'] = {}
 
-    np.save(data_path + '/colab_graph.npy', graph)
\ No newline at end of file
+    np.save(data_path + '/colab_graph.npy', graph)
+
+    # Versión compacta del grafo con las componentes conexas y números de núcleo ya calculados
+    compact = CompactGraph.from_graph(graph)
+    compact.component_labels()
+    compact.core_numbers()
+    compact.save(data_path + '/colab_graph')
+
+    # Desglose por año del peso de las aristas (si los datos incluyen el año de las publicaciones)
+    if any('years' in edge for props in graph.values() for edge in props['pubs'].values()):
+        TemporalGraph.from_graph(graph, compact=compact).save(data_path + '/colab_graph')
+
+
+if __name__ == "__main__":
+    data_path = data_dir()
+
+    authors_data = load_authors(data_path)
+
+    save_graph(dict(build_graph(authors_data)), data_path)
@@ -0,0 +1,288 @@
+import os
+import numpy as np
+from argparse import ArgumentParser
+
+try:
+    from modules.instrumentation import timed, count
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from instrumentation import timed, count
+    from scripts import data_dir
+
+# Número de registros por defecto de cada contador (error relativo típico 1.04 / sqrt(64) ~ 13% por nodo; el de la
+# función de vecindario, que suma los contadores de todos los nodos, es mucho menor)
+REGISTERS = 64
+
+# Máximo aproximado de bytes de registros que se reúnen a la vez (aristas del bloque x registros)
+BLOCK_BYTES = 1 << 26
+
+
+def registers_for(error):
+    '''
+    Menor número de registros (potencia de 2, mínimo 16) cuyo error relativo típico por nodo, 1.04 / sqrt(registros), no
+    supera el indicado
+    '''
+    registers = 16
+    while 1.04 / np.sqrt(registers) > error:
+        registers *= 2
+    return registers
+
+
+def _hash(values, seed):
+    '''
+    Hash de 64 bits (splitmix64) vectorizado de cada valor
+    '''
+    with np.errstate(over='ignore'):
+        z = values.astype(np.uint64) + np.uint64((0x9E3779B97F4A7C15 * (seed + 1)) & 0xFFFFFFFFFFFFFFFF)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def _init_registers(n, registers, seed):
+    '''
+    Contadores HyperLogLog (n, registros) de cada nodo con sólo el propio nodo: los bits bajos del hash eligen el registro y
+    la posición del primer bit a 1 del resto (1 + número de ceros finales) es el valor del registro
+    '''
+    bits = int(np.log2(registers))
+    hashes = _hash(np.arange(n), seed)
+    rest = hashes >> np.uint64(bits)
+
+    # Bit menos significativo a 1 (potencia de 2, exacta en coma flotante) y su posición
+    with np.errstate(over='ignore'):
+        lowest = rest & (~rest + np.uint64(1))
+    rank = np.where(rest == 0, 64 - bits + 1, np.log2(np.maximum(lowest, 1).astype(np.float64)).astype(np.int64) + 1)
+
+    counters = np.zeros((n, registers), dtype=np.uint8)
+    counters[np.arange(n), (hashes & np.uint64(registers - 1)).astype(np.int64)] = rank
+    return counters
+
+
+def estimate(counters):
+    '''
+    Estimación de HyperLogLog del número de elementos de cada contador, con la corrección para cardinalidades pequeñas
+
+    Parameters
+    ----------
+        counters : np.ndarray
+            registros (k, registros) de k contadores
+
+    Returns
+    -------
+        sizes : np.ndarray
+            número estimado de elementos de cada contador
+    '''
+    registers = counters.shape[1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(registers, 0.7213 / (1 + 1.079 / registers))
+
+    raw = alpha * registers ** 2 / np.exp2(-counters.astype(np.float64)).sum(axis=1)
+    zeros = (counters == 0).sum(axis=1)
+    small = (raw <= 2.5 * registers) & (zeros > 0)
+    raw[small] = registers * np.log(registers / zeros[small])
+    return raw
+
+
+def _union(counters, indptr, indices, rows, block_edges):
+    '''
+    Unión (máximo registro a registro) de los contadores de los vecinos de cada nodo de rows, por bloques de nodos con a lo
+    sumo block_edges aristas
+
+    Returns
+    -------
+        unions : np.ndarray
+            registros (len(rows), registros) de la unión de los contadores de los vecinos de cada nodo
+    '''
+    unions = np.zeros((len(rows), counters.shape[1]), dtype=np.uint8)
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    ends = np.cumsum(counts)
+
+    block_start = 0
+    while block_start < len(rows):
+        # Nodos del bloque: tantos como quepan en block_edges aristas (al menos uno)
+        limit = (ends[block_start - 1] if block_start > 0 else 0) + block_edges
+        block_end = max(block_start + 1, int(np.searchsorted(ends, limit, side='right')))
+
+        block_counts = counts[block_start:block_end]
+        block_offsets = np.cumsum(block_counts) - block_counts
+        positions = np.repeat(starts[block_start:block_end] - block_offsets, block_counts) + np.arange(block_counts.sum())
+
+        nonempty = block_counts > 0
+        if nonempty.any():
+            gathered = counters[indices[positions]]
+            unions[block_start:block_end][nonempty] = np.maximum.reduceat(gathered, block_offsets[nonempty], axis=0)
+
+        block_start = block_end
+
+    return unions
+
+
+@timed('hyperanf', items=lambda result: len(result['sum_distances']))
+def hyperanf(compact, registers=REGISTERS, seed=0, max_iter=None):
+    '''
+    Función de vecindario aproximada del grafo (HyperANF): cada nodo mantiene un contador HyperLogLog de los nodos a
+    distancia menor o igual que t, que en cada iteración se une (máximo registro a registro, vectorizado sobre el CSR) con
+    los contadores de sus vecinos. Sólo se recalculan los nodos con algún vecino cuyo contador cambió en la iteración
+    anterior, y se termina cuando ningún contador cambia (tras diámetro + 1 iteraciones)
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        registers : int
+            registros por contador (potencia de 2). El error relativo típico por nodo es 1.04 / sqrt(registers)
+            (ver registers_for); la memoria, n x registers bytes
+
+        seed : int
+            semilla de la función hash (ejecuciones con distinta semilla son independientes)
+
+        max_iter : int
+            número máximo de iteraciones (None hasta que converja)
+
+    Returns
+    -------
+        result : dict
+            {
+                'neighbourhood': función de vecindario, N(t) = pares (u, v) con d(u, v) <= t (incluidos u = v),
+                'reachable': nodos alcanzables desde cada nodo (incluido él mismo),
+                'sum_distances': suma de las distancias de cada nodo a los nodos alcanzables
+            }
+    '''
+    if registers < 16 or registers & (registers - 1):
+        raise ValueError("El número de registros debe ser una potencia de 2 mayor o igual que 16")
+
+    indptr = np.asarray(compact.indptr, dtype=np.int64)
+    indices = np.asarray(compact.indices, dtype=np.int64)
+    block_edges = max(1, BLOCK_BYTES // registers)
+
+    counters = _init_registers(compact.n, registers, seed)
+    sizes = estimate(counters)
+
+    # Suma de |B(v, s)| para s < t: al terminar, la suma de distancias es t * |B(v, t)| - esa suma
+    partial = np.zeros(compact.n)
+    neighbourhood = [sizes.sum()]
+    changed = np.ones(compact.n, dtype=bool)
+    rows_of_edges = np.repeat(np.arange(compact.n), np.diff(indptr))
+    t = 0
+
+    while changed.any() and (max_iter is None or t < max_iter):
+        partial += sizes
+        t += 1
+
+        # Nodos con algún vecino que cambió: el resto no puede cambiar
+        active = np.unique(rows_of_edges[changed[indices]])
+        unions = np.maximum(_union(counters, indptr, indices, active, block_edges), counters[active])
+
+        updated = (unions != counters[active]).any(axis=1)
+        changed = np.zeros(compact.n, dtype=bool)
+        changed[active[updated]] = True
+
+        # Actualización síncrona: todas las uniones se calculan con los contadores de la iteración anterior
+        counters[active[updated]] = unions[updated]
+        sizes[active[updated]] = estimate(unions[updated])
+        neighbourhood.append(sizes.sum())
+
+    # La última iteración no ha cambiado ningún contador (salvo que se haya alcanzado max_iter)
+    if t > 0 and not changed.any():
+        neighbourhood.pop()
+        partial -= sizes
+        t -= 1
+
+    count('hyperanf_iterations_total', t + 1)
+
+    # Los nodos que alcanzan a algún otro suman al menos una distancia de 1: lo que quede por debajo de 0.5 es residuo de
+    # coma flotante de t * |B(v, t)| - suma (nodos aislados)
+    sum_distances = t * sizes - partial
+    sum_distances[sum_distances < 0.5] = 0
+
+    return {
+        'neighbourhood': np.array(neighbourhood),
+        'reachable': sizes,
+        'sum_distances': sum_distances,
+    }
+
+
+def average_distance(neighbourhood):
+    '''
+    Distancia media entre los pares de nodos (distintos) conectados a partir de la función de vecindario
+    '''
+    pairs = np.diff(neighbourhood)
+    return float((np.arange(1, len(neighbourhood)) * pairs).sum() / pairs.sum()) if pairs.sum() > 0 else 0.0
+
+
+def effective_diameter(neighbourhood, alpha=0.9):
+    '''
+    Diámetro efectivo: menor distancia (interpolada linealmente) a la que están una proporción alpha de los pares de nodos
+    distintos conectados
+    '''
+    pairs = neighbourhood - neighbourhood[0]
+    if len(pairs) < 2 or pairs[-1] <= 0:
+        return 0.0
+
+    target = alpha * pairs[-1]
+    t = int(np.argmax(pairs >= target))
+    return float(t - 1 + (target - pairs[t - 1]) / (pairs[t] - pairs[t - 1])) if t > 0 else 0.0
+
+
+def closeness(result, n=None):
+    '''
+    Centralidad de cercanía aproximada de cada nodo (normalizada como en networkx para grafos no conexos: (r - 1) / suma de
+    distancias, por la fracción (r - 1) / (n - 1) de nodos alcanzables)
+    '''
+    reachable = np.maximum(result['reachable'] - 1, 0)
+    n = len(reachable) if n is None else n
+    # Un estimador de |B(v, t)| por debajo de 1.5 corresponde a un nodo que sólo se alcanza a sí mismo
+    valid = (result['sum_distances'] > 0) & (result['reachable'] >= 1.5)
+    return np.divide(reachable, result['sum_distances'], out=np.zeros(len(reachable)), where=valid) * reachable / max(n - 1, 1)
+
+
+def separation(compact, registers=REGISTERS, runs=1, seed=0):
+    '''
+    Grados de separación de la red: distancia media y diámetro efectivo promediados sobre varias ejecuciones independientes
+    de HyperANF (con distinta semilla), junto a la desviación típica entre ellas como estimación del error
+
+    Returns
+    -------
+        separation : dict
+            {'average_distance', 'average_distance_std', 'effective_diameter', 'effective_diameter_std', 'registers', 'runs'}
+    '''
+    distances, diameters = [], []
+    for run in range(runs):
+        neighbourhood = hyperanf(compact, registers=registers, seed=seed + run)['neighbourhood']
+        distances.append(average_distance(neighbourhood))
+        diameters.append(effective_diameter(neighbourhood))
+
+    return {
+        'average_distance': float(np.mean(distances)),
+        'average_distance_std': float(np.std(distances)),
+        'effective_diameter': float(np.mean(diameters)),
+        'effective_diameter_std': float(np.std(diameters)),
+        'registers': registers,
+        'runs': runs,
+    }
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+
+    # Directorio de datos
+    data_path = data_dir()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--graph", default=data_path + '/colab_graph', help="Directorio del grafo compacto")
+    arg_parser.add_argument("--registers", type=int, default=REGISTERS, help="Registros de cada contador (potencia de 2)")
+    arg_parser.add_argument("--error", type=float, default=None, help="Error relativo por nodo deseado (determina los registros)")
+    arg_parser.add_argument("--runs", type=int, default=1, help="Número de ejecuciones independientes")
+
+    args = arg_parser.parse_args()
+
+    try:
+        from modules.compact import CompactGraph
+    except ImportError:
+        from compact import CompactGraph
+
+    registers = registers_for(args.error) if args.error is not None else args.registers
+    for metric, value in separation(CompactGraph.load(args.graph), registers=registers, runs=args.runs).items():
+        print("{:<25s} {}".format(metric, value))
@@ -0,0 +1,290 @@
+import os
+import json
+import atexit
+import functools
+import threading
+import tracemalloc
+from time import perf_counter, process_time, time
+
+try:
+    import resource
+except ImportError:
+    # Windows no dispone del módulo resource: no se registra el pico de RSS
+    resource = None
+
+# Intervalo mínimo (segundos) entre dos reescrituras del fichero de Prometheus
+PROMETHEUS_INTERVAL = 5.0
+
+
+def peak_rss():
+    '''
+    Devuelve el pico de memoria residente (RSS) del proceso en bytes, o None si no está disponible en la plataforma. Es el
+    máximo desde el inicio del proceso, no el de una etapa concreta
+    '''
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # En Linux ru_maxrss se expresa en kB, en macOS en bytes
+    return rss if os.uname().sysname == 'Darwin' else rss * 1024
+
+
+class Stage:
+    '''
+    Etapa instrumentada. Se usa como gestor de contexto y, al salir, registra su duración, uso de CPU, memoria y elementos procesados
+
+    Parameters
+    ----------
+        instrumentation : Instrumentation
+            registro al que se envían las medidas
+
+        name : str
+            nombre de la etapa
+
+        labels : dict
+            etiquetas adicionales de la etapa
+
+    Attributes
+    ----------
+        items : int
+            número de elementos procesados (se actualiza con add)
+    '''
+    def __init__(self, instrumentation, name, labels):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.labels = labels
+        self.items = 0
+
+    def add(self, n=1):
+        '''
+        Suma n elementos procesados a la etapa
+        '''
+        self.items += n
+
+    def __enter__(self):
+        if self.instrumentation.trace_memory and tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        self.start_wall = perf_counter()
+        self.start_cpu = process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = perf_counter() - self.start_wall
+        record = {
+            "type": "stage",
+            "stage": self.name,
+            "labels": self.labels,
+            "ts": time(),
+            "pid": os.getpid(),
+            "ok": exc_type is None,
+            "wall_s": wall,
+            "cpu_s": process_time() - self.start_cpu,
+            "items": self.items,
+            "items_per_s": self.items / wall if wall > 0 else None,
+            "process_peak_rss_bytes": peak_rss(),
+            "tracemalloc_peak_bytes": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+        }
+        self.instrumentation.record(record)
+        return False
+
+
+class Instrumentation:
+    '''
+    Registro de medidas de rendimiento por etapa (tiempo real y de CPU, picos de memoria y elementos por segundo) y de contadores
+    (por ejemplo, respuestas HTTP del Crawler o bytes descargados).
+
+    Las medidas de cada etapa se escriben como una línea JSON al terminar la etapa, seguidas del valor acumulado de los contadores
+    modificados desde la anterior escritura. Si el fichero de destino tiene extensión '.prom', en su lugar se reescribe el fichero
+    completo en formato de texto de Prometheus para que pueda ser recogido por un node exporter, como mucho una vez cada
+    PROMETHEUS_INTERVAL segundos (y siempre al terminar el proceso). Sin fichero de destino las medidas sólo se mantienen en memoria.
+
+    El pico de RSS es el del proceso completo (ru_maxrss): se registra con cada etapa como process_peak_rss_bytes, pero no
+    mide la memoria de la etapa. Para eso se usa el pico de tracemalloc.
+
+    El coste es de unas pocas llamadas al sistema por etapa y una suma protegida por un cerrojo por contador, por lo que puede
+    mantenerse activo en producción. La medida de memoria con tracemalloc sí es costosa y sólo se activa bajo demanda.
+
+    Parameters
+    ----------
+        path : str
+            fichero donde se exportan las medidas (JSON lines, o formato Prometheus si termina en '.prom')
+
+        trace_memory : bool
+            si se debe activar tracemalloc para medir el pico de memoria de Python de cada etapa
+
+    Attributes
+    ----------
+        stages : dict
+            última medida de cada etapa {(nombre, etiquetas): registro}
+
+        counters : dict
+            valor de cada contador {(nombre, etiquetas): valor}
+    '''
+    def __init__(self, path=None, trace_memory=False):
+        self.path = path
+        self.prometheus = path is not None and path.endswith('.prom')
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.counters = {}
+        self.dirty = set()
+        self.written = None
+        self.lock = threading.Lock()
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        if self.path is not None:
+            atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls):
+        '''
+        Crea el registro a partir de las variables de entorno GRAPHMINING_METRICS (fichero de destino) y
+        GRAPHMINING_TRACEMALLOC (activa tracemalloc si vale 1)
+        '''
+        return cls(path=os.environ.get('GRAPHMINING_METRICS') or None,
+                   trace_memory=os.environ.get('GRAPHMINING_TRACEMALLOC') == '1')
+
+    def stage(self, name, **labels):
+        '''
+        Devuelve un gestor de contexto que mide la etapa 'name'
+
+        Parameters
+        ----------
+            name : str
+                nombre de la etapa (por ejemplo 'decoder.recode_file')
+
+            labels : dict
+                etiquetas adicionales (por ejemplo mask='spain')
+
+        Returns
+        -------
+            stage : Stage
+        '''
+        return Stage(self, name, labels)
+
+    def timed(self, name, items=None, **labels):
+        '''
+        Decorador que mide cada llamada a la función decorada como la etapa 'name'
+
+        Parameters
+        ----------
+            name : str
+                nombre de la etapa
+
+            items : callable
+                función que, aplicada al resultado, devuelve el número de elementos procesados (por ejemplo len)
+
+            labels : dict
+                etiquetas adicionales
+
+        Returns
+        -------
+            decorator : callable
+        '''
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name, **labels) as st:
+                    result = function(*args, **kwargs)
+                    if items is not None:
+                        st.add(items(result))
+                return result
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1, **labels):
+        '''
+        Incrementa el contador 'name' (con las etiquetas indicadas) en value
+        '''
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.dirty.add(key)
+
+    def record(self, record):
+        '''
+        Almacena la medida de una etapa y la exporta, junto con los contadores modificados, si hay fichero de destino
+        '''
+        with self.lock:
+            self.stages[(record['stage'], tuple(sorted(record['labels'].items())))] = record
+            if self.path is None:
+                return
+            if self.prometheus:
+                if self.written is None or perf_counter() - self.written >= PROMETHEUS_INTERVAL:
+                    self.write_prometheus()
+            else:
+                with open(self.path, 'at') as fmetrics:
+                    fmetrics.write(json.dumps(record) + '\n')
+                    self.write_counters(fmetrics)
+
+    def flush(self):
+        '''
+        Exporta el valor final de los contadores (se ejecuta automáticamente al terminar el proceso)
+        '''
+        with self.lock:
+            if self.path is None:
+                return
+            if self.prometheus:
+                self.write_prometheus()
+            elif self.dirty:
+                with open(self.path, 'at') as fmetrics:
+                    self.write_counters(fmetrics)
+
+    def write_counters(self, fmetrics):
+        '''
+        Escribe como líneas JSON el valor acumulado de los contadores modificados desde la anterior escritura
+        '''
+        for name, labels in sorted(self.dirty):
+            fmetrics.write(json.dumps({"type": "counter", "name": name, "labels": dict(labels),
+                                       "value": self.counters[(name, labels)], "ts": time(), "pid": os.getpid()}) + '\n')
+        self.dirty.clear()
+
+    def write_prometheus(self):
+        '''
+        Reescribe de forma atómica el fichero de destino en formato de texto de Prometheus
+        '''
+        lines = []
+        fields = [('wall_s', 'stage_wall_seconds'), ('cpu_s', 'stage_cpu_seconds'), ('items', 'stage_items'),
+                  ('items_per_s', 'stage_items_per_second'), ('tracemalloc_peak_bytes', 'stage_tracemalloc_peak_bytes')]
+        format_labels = lambda labels: ','.join('{:s}="{:s}"'.format(key, escape_label(value)) for key, value in labels)
+
+        for field, metric in fields:
+            lines.append('# TYPE graphmining_{:s} gauge'.format(metric))
+            for (name, labels), record in sorted(self.stages.items()):
+                if record[field] is not None:
+                    lines.append('graphmining_{:s}{{{:s}}} {}'.format(metric, format_labels((('stage', name),) + labels), record[field]))
+
+        # Pico de RSS del proceso completo (no por etapa)
+        rss = peak_rss()
+        if rss is not None:
+            lines.append('# TYPE graphmining_process_peak_rss_bytes gauge')
+            lines.append('graphmining_process_peak_rss_bytes {}'.format(rss))
+
+        names = sorted(set(name for name, _ in self.counters))
+        for name in names:
+            lines.append('# TYPE graphmining_{:s} counter'.format(name))
+            for (counter, labels), value in sorted(self.counters.items()):
+                if counter == name:
+                    lines.append('graphmining_{:s}{} {}'.format(name, '{' + format_labels(labels) + '}' if labels else '', value))
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wt') as fmetrics:
+            fmetrics.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.path)
+        self.written = perf_counter()
+        self.dirty.clear()
+
+
+def escape_label(value):
+    '''
+    Valor de una etiqueta con el escape del formato de texto de Prometheus (barra invertida, comillas y saltos de línea)
+    '''
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Registro por defecto del proceso, configurado mediante variables de entorno
+instrumentation = Instrumentation.from_env()
+stage = instrumentation.stage
+timed = instrumentation.timed
+count = instrumentation.count
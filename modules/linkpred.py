@@ -0,0 +1,233 @@
+import os
+import heapq
+import numpy as np
+from scipy import sparse
+from argparse import ArgumentParser
+
+try:
+    from modules.compact import CompactGraph, worker_pool, worker_shared
+    from modules.instrumentation import timed
+    from modules.scripts import data_dir, results_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from compact import CompactGraph, worker_pool, worker_shared
+    from instrumentation import timed
+    from scripts import data_dir, results_dir
+
+# Índices de similitud disponibles
+METHODS = ('common_neighbours', 'jaccard', 'adamic_adar', 'resource_allocation')
+
+# Número máximo aproximado de caminos de longitud 2 que se expanden a la vez en cada bloque de filas
+BLOCK_WEDGES = 4000000
+
+
+def prepare(compact, method='adamic_adar', weighted=False):
+    '''
+    Prepara las matrices de las que se obtienen las puntuaciones de un bloque de filas mediante productos dispersos:
+    S[u, v] = sum_w A[u, w] * f(w) * A[w, v], donde f(w) pondera a cada vecino común w según el índice
+
+        common_neighbours    f(w) = 1
+        jaccard              f(w) = 1 (se divide después por |N(u) ∪ N(v)|)
+        adamic_adar          f(w) = 1 / log(grado(w))
+        resource_allocation  f(w) = 1 / grado(w)
+
+    En la versión ponderada A contiene el número de publicaciones compartidas y el grado se sustituye por la fuerza del nodo
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        method : str
+            índice de similitud (ver METHODS)
+
+        weighted : bool
+            si se usan los pesos de las aristas generados por build_graph
+
+    Returns
+    -------
+        shared : tuple
+            (matriz izquierda A·diag(f), matriz A, grado de cada nodo, claves ordenadas u*n+v de las aristas existentes, método)
+    '''
+    if method not in METHODS:
+        raise ValueError("Índice desconocido: {:s} (disponibles: {:s})".format(method, ', '.join(METHODS)))
+
+    values = compact.weights.astype(np.float64) if weighted else np.ones(len(compact.indices))
+    adjacency = sparse.csr_matrix((values, compact.indices, compact.indptr), shape=(compact.n, compact.n))
+    degree = np.asarray(adjacency.sum(axis=1)).ravel()
+
+    # Los vecinos con grado 1 no pueden ser vecinos comunes de dos autores distintos
+    factor = np.ones(compact.n)
+    if method == 'adamic_adar':
+        factor = np.divide(1.0, np.log(np.maximum(degree, 1)), out=np.zeros(compact.n), where=degree > 1)
+    elif method == 'resource_allocation':
+        factor = np.divide(1.0, degree, out=np.zeros(compact.n), where=degree > 0)
+
+    left = adjacency.copy()
+    left.data = left.data * factor[left.indices]
+
+    rows = np.repeat(np.arange(compact.n, dtype=np.int64), compact.degrees())
+    keys = rows * compact.n + compact.indices
+
+    return left, adjacency, degree, keys, method
+
+
+def _block_top_k(bounds, k, shared=None):
+    '''
+    Puntuaciones de todos los pares (u, v) con u en el bloque de filas [start, end) que no son coautores y tienen algún
+    vecino común, conservando para cada u sólo los k candidatos con mayor puntuación mediante un montículo
+
+    Returns
+    -------
+        (sources, candidates, scores, common) : tuple
+            autor, candidato, puntuación y número de vecinos comunes de cada recomendación (ordenadas por autor y puntuación)
+    '''
+    left, adjacency, degree, keys, method = worker_shared(shared)
+    start, end = bounds
+    n = adjacency.shape[0]
+
+    block = left[start:end] @ adjacency
+    block.sort_indices()
+    common = block if method in ('common_neighbours', 'jaccard') else (adjacency[start:end] @ adjacency)
+    common.sort_indices()
+
+    rows = np.repeat(np.arange(start, end, dtype=np.int64), np.diff(block.indptr))
+    cols = block.indices.astype(np.int64)
+    scores = block.data
+
+    if method == 'jaccard':
+        scores = scores / (degree[rows] + degree[cols] - scores)
+
+    # Se descartan el propio autor y los coautores actuales
+    query = rows * n + cols
+    position = np.minimum(np.searchsorted(keys, query), max(len(keys) - 1, 0))
+    candidate = (rows != cols) & ~((keys[position] == query) if len(keys) else np.zeros(len(query), dtype=bool))
+
+    indptr = np.r_[0, np.cumsum(np.bincount(rows[candidate] - start, minlength=end - start))]
+    rows, cols, scores = rows[candidate], cols[candidate], scores[candidate]
+
+    selected = []
+    for i in range(end - start):
+        row_start, row_end = indptr[i], indptr[i + 1]
+        selected.extend(heapq.nlargest(k, range(row_start, row_end), key=scores.__getitem__))
+    selected = np.array(selected, dtype=np.int64)
+
+    if len(selected) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+    return rows[selected], cols[selected], scores[selected], np.asarray(common[rows[selected] - start, cols[selected]]).ravel()
+
+
+@timed('linkpred.recommend', items=lambda result: len(result[0]))
+def recommend(compact, method='adamic_adar', k=10, weighted=False, n_jobs=1):
+    '''
+    Recomienda a cada autor los k autores con los que aún no ha publicado y que obtienen una mayor puntuación según el
+    índice de similitud indicado.
+
+    Las puntuaciones se calculan por bloques de filas con productos de matrices dispersas, acotando el número de caminos de
+    longitud 2 de cada bloque (y por tanto la memoria), y de cada bloque sólo se conservan los k mejores candidatos por autor
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        method : str
+            índice de similitud (ver METHODS)
+
+        k : int
+            número de candidatos por autor
+
+        weighted : bool
+            si se usan los pesos de las aristas generados por build_graph
+
+        n_jobs : int
+            número de procesos entre los que se reparten los bloques de filas
+
+    Returns
+    -------
+        (sources, candidates, scores, common) : tuple
+            vectores con el autor, el candidato, la puntuación y el número de vecinos comunes (o publicaciones, si es
+            ponderado) de cada recomendación, ordenados por autor y de mayor a menor puntuación
+    '''
+    shared = prepare(compact, method=method, weighted=weighted)
+
+    # División en bloques de filas con un número de caminos de longitud 2 acotado
+    degrees = compact.degrees()
+    wedges = np.cumsum(np.bincount(np.repeat(np.arange(compact.n), degrees), weights=degrees[compact.indices],
+                                   minlength=compact.n))
+    cuts = np.searchsorted(wedges, np.arange(BLOCK_WEDGES, wedges[-1] if len(wedges) else 0, BLOCK_WEDGES))
+    bounds = [(start, end) for start, end in zip(np.r_[0, cuts], np.r_[cuts, compact.n]) if end > start]
+
+    if n_jobs > 1 and len(bounds) > 1:
+        with worker_pool(n_jobs, shared) as executor:
+            results = list(executor.map(_block_top_k, bounds, [k] * len(bounds)))
+    else:
+        results = [_block_top_k(block, k, shared) for block in bounds]
+
+    if not results:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+    return tuple(np.concatenate([result[column] for result in results]) for column in range(4))
+
+
+def to_dataframe(compact, recommendations):
+    '''
+    Tabla ordenada de recomendaciones con el identificador, nombre y afiliación del autor y del candidato
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        recommendations : tuple
+            resultado de recommend
+
+    Returns
+    -------
+        df : pd.DataFrame
+            columnas id, name, affiliation, rank, candidate_id, candidate_name, candidate_affiliation, score, common
+    '''
+    import pandas as pd
+
+    sources, candidates, scores, common = recommendations
+
+    # Posición de cada recomendación dentro de las de su autor
+    starts = np.r_[0, np.flatnonzero(np.diff(sources)) + 1]
+    rank = np.arange(len(sources)) - np.repeat(starts, np.diff(np.r_[starts, len(sources)])) + 1
+
+    return pd.DataFrame({
+        'id': np.char.replace(compact.ids[sources].astype(str), 'homepages/', ''),
+        'name': compact.names[sources],
+        'affiliation': compact.affiliations[sources],
+        'rank': rank,
+        'candidate_id': np.char.replace(compact.ids[candidates].astype(str), 'homepages/', ''),
+        'candidate_name': compact.names[candidates],
+        'candidate_affiliation': compact.affiliations[candidates],
+        'score': scores,
+        'common': common,
+    })
+
+
+if __name__ == "__main__":
+    data_path = data_dir()
+    results_path = results_dir()
+
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--method", default="adamic_adar", choices=METHODS, help="Índice de similitud")
+    arg_parser.add_argument("-k", type=int, default=10, help="Número de candidatos por autor")
+    arg_parser.add_argument("--weighted", action="store_true", help="Usar el número de publicaciones compartidas")
+    arg_parser.add_argument("--jobs", type=int, default=1, help="Número de procesos")
+    arg_parser.add_argument("--output", default=results_path + '/recommendations.csv', help="Fichero CSV de salida")
+
+    args = arg_parser.parse_args()
+
+    compact = CompactGraph.load(data_path + '/colab_graph')
+    recommendations = recommend(compact, method=args.method, k=args.k, weighted=args.weighted, n_jobs=args.jobs)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'wt') as frecommendations:
+        print("Se han exportado las recomendaciones en: {:s}".format(args.output))
+        to_dataframe(compact, recommendations).to_csv(frecommendations, sep=';', index=False)
@@ -0,0 +1,464 @@
+import os
+import numpy as np
+from argparse import ArgumentParser
+
+try:
+    from modules.authors import AuthorStore, STORE_NAME, load_authors
+    from modules.external import pub_hash
+    from modules.graphgen import year_runs
+    from modules.instrumentation import timed
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from authors import AuthorStore, STORE_NAME, load_authors
+    from external import pub_hash
+    from graphgen import year_runs
+    from instrumentation import timed
+    from scripts import data_dir
+
+# Primo de Mersenne 2^31 - 1: las funciones hash son (a * x + b) mod PRIME, con x, a, b < PRIME (sin desbordar 64 bits)
+PRIME = (1 << 31) - 1
+
+# Valor de la firma de un autor sin publicaciones
+EMPTY = np.uint32(PRIME)
+
+# Número de funciones hash (permutaciones) y de bandas del índice LSH por defecto: con 32 bandas de 4 filas, dos autores
+# con similitud de Jaccard J comparten alguna banda con probabilidad 1 - (1 - J^4)^32 (~50% para J = 0.42, >99% para J >= 0.7)
+NUM_PERM = 128
+BANDS = 32
+
+# Máximo aproximado de valores hash (publicaciones x permutaciones) que se calculan a la vez
+BLOCK_VALUES = 1 << 22
+
+# Los cubos de más autores no generan pares candidatos (suelen ser autores con muy pocas publicaciones)
+MAX_BUCKET = 1000
+
+
+def _permutations(num_perm, seed):
+    '''
+    Coeficientes (a, b) de las funciones hash y multiplicadores para combinar las filas de cada banda
+    '''
+    random = np.random.RandomState(seed)
+    a = random.randint(1, PRIME, size=num_perm).astype(np.uint64)
+    b = random.randint(0, PRIME, size=num_perm).astype(np.uint64)
+    multipliers = random.randint(1, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+    return a, b, multipliers
+
+
+@timed('minhash.signatures', items=len)
+def signatures(store, num_perm=NUM_PERM, seed=0):
+    '''
+    Firma MinHash de las publicaciones de cada autor: para cada función hash, el mínimo sobre sus publicaciones. Los valores
+    se calculan por bloques de autores como una matriz (publicaciones, permutaciones) y el mínimo de cada autor se obtiene
+    con np.minimum.reduceat sobre el CSR de publicaciones del almacén. Las funciones se aplican al hash de la clave de cada
+    publicación, por lo que las firmas no dependen de la numeración interna del almacén
+
+    Parameters
+    ----------
+        store : AuthorStore
+            datos de los autores
+
+        num_perm : int
+            número de funciones hash
+
+        seed : int
+            semilla de las funciones hash
+
+    Returns
+    -------
+        signatures : np.ndarray
+            firmas (autores, num_perm) en uint32 (EMPTY para los autores sin publicaciones)
+    '''
+    a, b, _ = _permutations(num_perm, seed)
+    keys = np.array([pub_hash(key) % PRIME for key in store.tables['pub_keys'].tolist()], dtype=np.uint64)
+
+    pub_ptr = np.asarray(store.pub_ptr)
+    counts = np.diff(pub_ptr)
+    result = np.full((len(store), num_perm), EMPTY, dtype=np.uint32)
+
+    # Bloques de autores con a lo sumo BLOCK_VALUES valores hash
+    cuts = np.searchsorted(pub_ptr, np.arange(BLOCK_VALUES // num_perm, pub_ptr[-1], max(1, BLOCK_VALUES // num_perm)))
+    bounds = [(start, end) for start, end in zip(np.r_[0, cuts], np.r_[cuts, len(store)]) if end > start]
+
+    for start, end in bounds:
+        pubs = np.asarray(store.pubs[pub_ptr[start]:pub_ptr[end]])
+        if len(pubs) == 0:
+            continue
+        values = (keys[pubs][:, None] * a[None, :] + b[None, :]) % np.uint64(PRIME)
+
+        block_counts = counts[start:end]
+        nonempty = block_counts > 0
+        offsets = (np.cumsum(block_counts) - block_counts)[nonempty]
+        result[start:end][nonempty] = np.minimum.reduceat(values, offsets, axis=0).astype(np.uint32)
+
+    return result
+
+
+def _band_hashes(signatures, bands, multipliers):
+    '''
+    Hash de 64 bits de cada banda de cada firma (combinación lineal de sus filas), (bandas, autores)
+    '''
+    rows = signatures.shape[1] // bands
+    with np.errstate(over='ignore'):
+        weighted = signatures[:, :bands * rows].astype(np.uint64) * multipliers[:bands * rows]
+        return weighted.reshape(len(signatures), bands, rows).sum(axis=2, dtype=np.uint64).T
+
+
+class MinHashIndex:
+    '''
+    Índice LSH por bandas sobre las firmas MinHash de las publicaciones de los autores: cada firma se divide en bandas y
+    dos autores son candidatos si coinciden en todas las filas de alguna banda. Para cada banda se almacenan los hashes de
+    las bandas ordenados junto a la posición del autor, de forma que los autores de un cubo se obtienen con una búsqueda
+    binaria, sin comparar la consulta con todos los autores. La similitud de Jaccard de cada candidato se estima como la
+    fracción de filas de la firma que coinciden
+
+    Parameters
+    ----------
+        ids : np.ndarray
+            identificador de cada autor
+
+        signatures : np.ndarray
+            firmas (autores, permutaciones)
+
+        band_hashes, band_positions : np.ndarray
+            (bandas, autores con publicaciones) hashes ordenados de cada banda y posición del autor correspondiente
+
+        seed : int
+            semilla con la que se generaron las funciones hash
+    '''
+    def __init__(self, ids, signatures, band_hashes, band_positions, seed=0):
+        self.ids = ids
+        self.signatures = signatures
+        self.band_hashes = band_hashes
+        self.band_positions = band_positions
+        self.seed = seed
+        self._positions = None
+
+    @classmethod
+    @timed('minhash.build', items=lambda index: len(index.ids))
+    def build(cls, store, num_perm=NUM_PERM, bands=BANDS, seed=0):
+        '''
+        Construye el índice a partir de los datos de los autores
+
+        Parameters
+        ----------
+            store : AuthorStore or dict
+                datos de los autores (almacén columnar o diccionario con el formato del Crawler)
+
+            num_perm : int
+                número de funciones hash (múltiplo de bands)
+
+            bands : int
+                número de bandas. Con más bandas (de menos filas) se encuentran pares de menor similitud a costa de más
+                candidatos
+
+            seed : int
+                semilla de las funciones hash
+
+        Returns
+        -------
+            index : MinHashIndex
+        '''
+        if num_perm % bands:
+            raise ValueError("El número de permutaciones debe ser múltiplo del número de bandas")
+        if not isinstance(store, AuthorStore):
+            store = AuthorStore.from_authors(store.items())
+
+        sigs = signatures(store, num_perm=num_perm, seed=seed)
+        nonempty = np.flatnonzero((sigs != EMPTY).any(axis=1))
+
+        hashes = _band_hashes(sigs[nonempty], bands, _permutations(num_perm, seed)[2])
+        order = np.argsort(hashes, axis=1, kind='stable')
+
+        return cls(np.array(store.tables['ids'].tolist()), sigs, np.take_along_axis(hashes, order, axis=1), nonempty[order], seed=seed)
+
+    def save(self, path):
+        '''
+        Almacena el índice como ficheros .npy en el directorio indicado
+        '''
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        for name in ('ids', 'signatures', 'band_hashes', 'band_positions'):
+            np.save(os.path.join(path, name + '.npy'), getattr(self, name))
+        np.save(os.path.join(path, 'seed.npy'), np.array(self.seed))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        '''
+        Carga un índice almacenado con save (por defecto proyectado en memoria)
+        '''
+        load = lambda name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+        return cls(load('ids'), load('signatures'), load('band_hashes'), load('band_positions'), seed=int(np.load(os.path.join(path, 'seed.npy'))))
+
+    @property
+    def bands(self):
+        return self.band_hashes.shape[0]
+
+    def positions(self):
+        '''
+        Posición de cada autor en el índice, {identificador: posición}
+        '''
+        if self._positions is None:
+            self._positions = {author: i for i, author in enumerate(np.asarray(self.ids).tolist())}
+        return self._positions
+
+    def signature(self, pubs):
+        '''
+        Firma de una lista arbitraria de claves de publicaciones (por ejemplo, de un autor que no está en el índice)
+        '''
+        store = AuthorStore.from_authors([('query', {'name': '', 'affiliation': None, 'pubs': list(pubs)})])
+        return signatures(store, num_perm=self.signatures.shape[1], seed=self.seed)[0]
+
+    def candidates(self, signature):
+        '''
+        Posiciones de los autores que comparten alguna banda con la firma
+        '''
+        query = _band_hashes(np.asarray(signature)[None, :], self.bands, _permutations(self.signatures.shape[1], self.seed)[2])[:, 0]
+        found = []
+        for band in range(self.bands):
+            hashes = self.band_hashes[band]
+            lo, hi = np.searchsorted(hashes, query[band], side='left'), np.searchsorted(hashes, query[band], side='right')
+            found.append(np.asarray(self.band_positions[band, lo:hi]))
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+    def similarity(self, signature, positions):
+        '''
+        Similitud de Jaccard estimada entre la firma y las de los autores indicados
+        '''
+        return (np.asarray(self.signatures[positions]) == np.asarray(signature)).mean(axis=1)
+
+    def query(self, signature, k=10, exclude=None):
+        '''
+        Los k autores con mayor similitud de Jaccard estimada entre los candidatos del índice
+
+        Parameters
+        ----------
+            signature : np.ndarray
+                firma de la consulta (ver signature, o la de un autor del índice)
+
+            k : int
+                número de autores
+
+            exclude : int
+                posición de un autor a excluir (el de la consulta)
+
+        Returns
+        -------
+            (positions, similarities) : (np.ndarray, np.ndarray)
+                posición de los autores y similitud estimada, de mayor a menor
+        '''
+        positions = self.candidates(signature)
+        if exclude is not None:
+            positions = positions[positions != exclude]
+        similarities = self.similarity(signature, positions)
+        order = np.argsort(-similarities, kind='stable')[:k]
+        return positions[order], similarities[order]
+
+    def similar(self, author, k=10):
+        '''
+        Los k autores cuya producción más se solapa con la del autor indicado
+
+        Returns
+        -------
+            similar : list
+                [(identificador, similitud estimada), ...] de mayor a menor similitud
+        '''
+        position = self.positions()[author]
+        positions, similarities = self.query(self.signatures[position], k=k, exclude=position)
+        return list(zip(np.asarray(self.ids)[positions].tolist(), similarities.tolist()))
+
+    @timed('minhash.candidate_pairs', items=lambda pairs: len(pairs[0]))
+    def candidate_pairs(self, min_similarity=0.0, max_bucket=MAX_BUCKET):
+        '''
+        Todos los pares de autores que comparten algún cubo, sin comparaciones por pares: en cada banda ordenada los autores
+        de un mismo cubo son consecutivos y se generan sus pares de forma vectorizada
+
+        Parameters
+        ----------
+            min_similarity : float
+                similitud estimada mínima de los pares devueltos
+
+            max_bucket : int
+                los cubos con más autores no generan pares
+
+        Returns
+        -------
+            (first, second, similarities) : (np.ndarray, np.ndarray, np.ndarray)
+                posiciones de cada par (first < second) y su similitud estimada
+        '''
+        n = len(self.ids)
+        keys = []
+
+        for band in range(self.bands):
+            hashes = np.asarray(self.band_hashes[band])
+            positions = np.asarray(self.band_positions[band], dtype=np.int64)
+            if len(hashes) < 2:
+                continue
+
+            # Final del cubo de cada elemento
+            starts = np.flatnonzero(np.r_[True, hashes[1:] != hashes[:-1]])
+            sizes = np.diff(np.r_[starts, len(hashes)])
+            ends = np.repeat(starts + sizes, sizes)
+            ends[np.repeat(sizes > max_bucket, sizes)] = 0
+
+            # Cada elemento se empareja con los siguientes de su cubo
+            counts = np.maximum(ends - np.arange(len(hashes)) - 1, 0)
+            left = np.repeat(np.arange(len(hashes)), counts)
+            right = left + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+            first, second = positions[left], positions[right]
+            keys.append(np.minimum(first, second) * n + np.maximum(first, second))
+
+        keys = np.unique(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.int64)
+        first, second = keys // max(n, 1), keys % max(n, 1)
+        similarities = (np.asarray(self.signatures[first]) == np.asarray(self.signatures[second])).mean(axis=1) if len(keys) else np.zeros(0)
+
+        keep = similarities >= min_similarity
+        return first[keep], second[keep], similarities[keep]
+
+
+def duplicates(index, store, threshold=0.9):
+    '''
+    Posibles perfiles duplicados: pares de autores cuya similitud de Jaccard exacta (comprobada sobre los candidatos del
+    índice) es al menos threshold
+
+    Returns
+    -------
+        duplicates : list
+            [(autor, autor, similitud de Jaccard), ...] de mayor a menor similitud
+    '''
+    # Margen sobre la estimación para no descartar pares por su error
+    first, second, _ = index.candidate_pairs(min_similarity=max(0.0, threshold - 0.1))
+
+    result = []
+    ids = np.asarray(index.ids).tolist()
+    for u, v in zip(first.tolist(), second.tolist()):
+        pubs_u, pubs_v = np.asarray(store.pub_indices(u)), np.asarray(store.pub_indices(v))
+        shared = len(np.intersect1d(pubs_u, pubs_v))
+        jaccard = shared / (len(pubs_u) + len(pubs_v) - shared)
+        if jaccard >= threshold:
+            result.append((ids[u], ids[v], jaccard))
+
+    return sorted(result, key=lambda pair: pair[2], reverse=True)
+
+
+def source_mtime(data_path):
+    '''
+    Fecha de modificación de los datos de los autores del directorio de datos (la del fichero más reciente del almacén
+    columnar o, si no existe, la de 'authors_data.npy')
+    '''
+    store_path = os.path.join(data_path, STORE_NAME)
+    if os.path.isdir(store_path):
+        return max([os.path.getmtime(os.path.join(store_path, name)) for name in os.listdir(store_path)] or [0.0])
+    return os.path.getmtime(os.path.join(data_path, 'authors_data.npy'))
+
+
+def load_index(data_path, path=None, store=None):
+    '''
+    Carga el índice LSH de los autores o, si no existe o se construyó con otra versión de sus datos (por ejemplo, tras una
+    nueva descarga), lo construye y almacena junto con la fecha de modificación de los datos
+
+    Parameters
+    ----------
+        data_path : str
+            directorio de datos
+
+        path : str
+            directorio del índice (por defecto, 'minhash' en el directorio de datos)
+
+        store : AuthorStore
+            datos de los autores ya cargados (si no se indica, se cargan del directorio de datos al construir el índice)
+
+    Returns
+    -------
+        index : MinHashIndex
+    '''
+    path = os.path.join(data_path, 'minhash') if path is None else path
+    mtime_path = os.path.join(path, 'source_mtime.npy')
+    mtime = source_mtime(data_path)
+
+    if os.path.exists(mtime_path) and float(np.load(mtime_path)) == mtime:
+        return MinHashIndex.load(path)
+
+    index = MinHashIndex.build(load_authors(data_path) if store is None else store)
+    index.save(path)
+    np.save(mtime_path, np.array(mtime))
+    return index
+
+
+@timed('minhash.candidate_graph', items=len)
+def candidate_graph(store, index=None, min_similarity=0.0):
+    '''
+    Grafo de colaboración con el formato de build_graph generado sólo a partir de los pares candidatos del índice LSH (con
+    el número exacto de publicaciones compartidas), en lugar de intersectar las publicaciones de todos los pares de autores.
+
+    Es aproximado: sólo se encuentran las colaboraciones entre autores con publicaciones suficientemente solapadas, por lo
+    que los coautores ocasionales de autores muy productivos pueden no aparecer. Con bandas de una única fila (bands =
+    num_perm, el índice que se construye si no se indica) dos autores son candidatos si el mínimo de alguna función hash es
+    la misma publicación: en el grafo sintético de 3000 autores se recupera el 56% de las aristas con 128 permutaciones y
+    el 69% con 256. Es útil como primera aproximación sobre volúmenes en los que build_graph no es viable
+
+    Parameters
+    ----------
+        store : AuthorStore
+            datos de los autores
+
+        index : MinHashIndex
+            índice LSH de los autores (si no se indica, se construye con una fila por banda)
+
+        min_similarity : float
+            similitud estimada mínima de los pares candidatos
+
+    Returns
+    -------
+        graph : dict
+            grafo con el formato de build_graph
+    '''
+    index = MinHashIndex.build(store, bands=NUM_PERM) if index is None else index
+    ids = np.asarray(index.ids).tolist()
+
+    graph = {author: {'name': store.tables['names'][i], 'affiliation': store.tables['affiliations'][i] or None, 'pubs': {}}
+             for i, author in enumerate(ids)}
+
+    first, second, _ = index.candidate_pairs(min_similarity=min_similarity)
+    for u, v in zip(first.tolist(), second.tolist()):
+        shared = np.intersect1d(np.asarray(store.pub_indices(u)), np.asarray(store.pub_indices(v)))
+        if len(shared) == 0:
+            continue
+        edge = {'weight': len(shared)}
+        if store.pub_years is not None:
+            edge['years'] = year_runs(np.asarray(store.pub_years)[shared].tolist())
+        graph[ids[u]]['pubs'][ids[v]] = edge
+        graph[ids[v]]['pubs'][ids[u]] = dict(edge)
+
+    return graph
+
+
+if __name__ == "__main__":
+    data_path = data_dir()
+
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--index", default=data_path + '/minhash', help="Directorio del índice LSH")
+    arg_parser.add_argument("--author", nargs="*", default=[], help="Autores ('homepages/x/y') de los que buscar los más similares")
+    arg_parser.add_argument("-k", type=int, default=10, help="Número de autores similares")
+    arg_parser.add_argument("--duplicates", type=float, default=None, help="Mostrar los pares con similitud de Jaccard mayor o igual")
+
+    args = arg_parser.parse_args()
+
+    store = load_authors(data_path)
+    if not isinstance(store, AuthorStore):
+        store = AuthorStore.from_authors(store.items())
+
+    index = load_index(data_path, args.index, store=store)
+
+    for author in args.author:
+        print(author)
+        for similar, similarity in index.similar(author, k=args.k):
+            print("    {:<30s} {:.3f}".format(similar, similarity))
+
+    if args.duplicates is not None:
+        for u, v, jaccard in duplicates(index, store, threshold=args.duplicates):
+            print("{:<30s} {:<30s} {:.3f}".format(u, v, jaccard))
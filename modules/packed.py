@@ -0,0 +1,390 @@
+import os
+import numpy as np
+from argparse import ArgumentParser
+
+try:
+    from modules.compact import CompactGraph
+    from modules.authors import StringTable
+    from modules.instrumentation import timed
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from compact import CompactGraph
+    from authors import StringTable
+    from instrumentation import timed
+    from scripts import data_dir
+
+# Número de autores de cada bloque: para acceder a una lista de coautores se descomprime sólo su bloque
+BLOCK_NODES = 256
+
+# Tablas de cadenas del grafo comprimido
+STRING_TABLES = ('ids', 'names', 'affiliations')
+
+# Flujos de bytes del grafo comprimido (en este orden en la tabla de bloques)
+STREAMS = ('degrees', 'gaps', 'weights')
+
+
+def _varint_sizes(values):
+    '''
+    Número de bytes de la codificación varint de cada valor (7 bits por byte)
+    '''
+    sizes = np.ones(len(values), dtype=np.int64)
+    k = 1
+    while k < 10:
+        larger = values >= np.uint64(1 << (7 * k))
+        if not larger.any():
+            break
+        sizes += larger
+        k += 1
+    return sizes
+
+
+def encode_varints(values):
+    '''
+    Codificación varint (LEB128) vectorizada: cada valor se divide en grupos de 7 bits, del menos al más significativo,
+    y el bit alto de cada byte indica si el valor continúa en el siguiente
+
+    Parameters
+    ----------
+        values : np.ndarray
+            valores enteros no negativos
+
+    Returns
+    -------
+        data : np.ndarray
+            bytes de la codificación (uint8)
+    '''
+    values = np.asarray(values).astype(np.uint64)
+    sizes = _varint_sizes(values)
+    starts = np.cumsum(sizes) - sizes
+    data = np.empty(int(sizes.sum()), dtype=np.uint8)
+
+    for k in range(int(sizes.max()) if len(sizes) else 0):
+        selected = np.flatnonzero(sizes > k)
+        group = (values[selected] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (sizes[selected] > k + 1).astype(np.uint64) << np.uint64(7)
+        data[starts[selected] + k] = (group | more).astype(np.uint8)
+
+    return data
+
+
+def decode_varints(data):
+    '''
+    Decodificación vectorizada de una secuencia de valores codificados con encode_varints
+
+    Returns
+    -------
+        values : np.ndarray
+            valores decodificados (int64)
+    '''
+    data = np.asarray(data)
+    ends = np.flatnonzero(data < 0x80)
+    if len(ends) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    sizes = ends - starts + 1
+
+    # Caso habitual: todos los valores ocupan un byte
+    if len(ends) == ends[-1] + 1:
+        return data[:len(ends)].astype(np.int64)
+
+    shifts = (7 * (np.arange(ends[-1] + 1) - np.repeat(starts, sizes))).astype(np.uint64)
+    groups = (data[:ends[-1] + 1] & 0x7F).astype(np.uint64) << shifts
+    return np.add.reduceat(groups, starts).astype(np.int64)
+
+
+def _zigzag(values):
+    '''
+    Codificación zigzag de enteros con signo (0, -1, 1, -2... -> 0, 1, 2, 3...)
+    '''
+    values = np.asarray(values, dtype=np.int64)
+    return (values << 1) ^ (values >> 63)
+
+
+def _unzigzag(values):
+    return (values >> 1) ^ -(values & 1)
+
+
+def _decode_adjacency(rows, degrees, gaps):
+    '''
+    Reconstruye las listas de coautores de varios autores consecutivos a partir de sus diferencias: el primer coautor de
+    cada lista se codifica respecto a la posición del autor (zigzag) y el resto respecto al anterior
+
+    Parameters
+    ----------
+        rows : np.ndarray
+            posición de cada autor
+
+        degrees : np.ndarray
+            número de coautores de cada autor
+
+        gaps : np.ndarray
+            diferencias decodificadas de todas las listas, concatenadas
+
+    Returns
+    -------
+        indices : np.ndarray
+            coautores de cada autor, concatenados (int32)
+    '''
+    starts = np.cumsum(degrees) - degrees
+    firsts = starts[degrees > 0]
+    gaps = gaps.copy()
+    gaps[firsts] = rows[degrees > 0] + _unzigzag(gaps[firsts])
+
+    # Suma acumulada por segmentos: se resta a cada lista la suma acumulada anterior a su inicio
+    total = np.cumsum(gaps)
+    before = total[firsts] - gaps[firsts]
+    return (total - np.repeat(before, degrees[degrees > 0])).astype(np.int32)
+
+
+class PackedGraph:
+    '''
+    Grafo compacto comprimido para archivarlo y transferirlo entre máquinas. Las listas de coautores (ordenadas) se
+    almacenan como diferencias entre coautores consecutivos, y los grados, las diferencias y los pesos como enteros de
+    longitud variable (varint) en tres flujos de bytes. Los autores se agrupan en bloques de block_nodes y la tabla de
+    bloques guarda la posición de inicio de cada bloque en cada flujo, de forma que una lista de coautores se obtiene
+    descomprimiendo sólo su bloque. Los identificadores, nombres y afiliaciones se almacenan como tablas de cadenas
+    (ver authors.StringTable)
+
+    Parameters
+    ----------
+        tables : dict
+            {nombre: StringTable} para cada una de STRING_TABLES
+
+        degrees, gaps, weights : np.ndarray
+            flujos de bytes (uint8) con los grados, las diferencias entre coautores y los pesos
+
+        blocks : np.ndarray
+            (bloques + 1, 3) posición de inicio de cada bloque en cada flujo (ver STREAMS)
+
+        block_nodes : int
+            número de autores de cada bloque
+
+    Attributes
+    ----------
+        cache : dict
+            resultados calculados sobre el grafo compacto de origen (etiquetas de componentes, números de núcleo...)
+    '''
+    def __init__(self, tables, degrees, gaps, weights, blocks, block_nodes=BLOCK_NODES):
+        self.tables = tables
+        self.degrees = degrees
+        self.gaps = gaps
+        self.weights = weights
+        self.blocks = blocks
+        self.block_nodes = block_nodes
+        self.cache = {}
+
+    @classmethod
+    @timed('packed.from_compact', items=lambda packed: packed.n)
+    def from_compact(cls, compact, block_nodes=BLOCK_NODES):
+        '''
+        Comprime un grafo compacto (con las listas de coautores ordenadas, como las genera CompactGraph.from_graph)
+
+        Parameters
+        ----------
+            compact : CompactGraph
+                grafo compacto
+
+            block_nodes : int
+                número de autores de cada bloque
+
+        Returns
+        -------
+            packed : PackedGraph
+        '''
+        indptr = np.asarray(compact.indptr, dtype=np.int64)
+        indices = np.asarray(compact.indices, dtype=np.int64)
+        degrees = np.diff(indptr)
+
+        gaps = np.empty(len(indices), dtype=np.int64)
+        gaps[1:] = indices[1:] - indices[:-1]
+        firsts = indptr[:-1][degrees > 0]
+        gaps[firsts] = _zigzag(indices[firsts] - np.flatnonzero(degrees > 0))
+        if (gaps < 0).any():
+            raise ValueError("Las listas de coautores del grafo deben estar ordenadas")
+
+        weights = np.asarray(compact.weights, dtype=np.int64)
+
+        # Posición de inicio de cada bloque en cada flujo
+        rows = np.arange(0, compact.n + block_nodes, block_nodes).clip(max=compact.n)
+        blocks = np.zeros((len(rows), len(STREAMS)), dtype=np.int64)
+        for column, (values, boundaries) in enumerate(((degrees, rows), (gaps, indptr[rows]), (weights, indptr[rows]))):
+            ends = np.zeros(len(values) + 1, dtype=np.int64)
+            np.cumsum(_varint_sizes(values.astype(np.uint64)), out=ends[1:])
+            blocks[:, column] = ends[boundaries]
+
+        packed = cls({name: StringTable.from_strings(np.asarray(getattr(compact, name)).tolist()) for name in STRING_TABLES},
+                     encode_varints(degrees), encode_varints(gaps), encode_varints(weights), blocks, block_nodes=block_nodes)
+
+        for name, value in compact.cache.items():
+            if isinstance(value, np.ndarray):
+                packed.cache[name] = value
+
+        return packed
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        '''
+        Carga un grafo almacenado con save. Por defecto los vectores se proyectan en memoria
+
+        Parameters
+        ----------
+            path : str
+                directorio donde se almacenó el grafo
+
+            mmap_mode : str
+                modo de proyección en memoria de np.load (None para cargarlo completamente)
+
+        Returns
+        -------
+            packed : PackedGraph
+        '''
+        load = lambda name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+
+        blocks = load('blocks')
+        packed = cls({name: StringTable.load(path, name, mmap_mode=mmap_mode) for name in STRING_TABLES},
+                     load('degrees'), load('gaps'), load('weights'), np.asarray(blocks[1:]), block_nodes=int(blocks[0, 0]))
+
+        for name in os.listdir(path):
+            if name.startswith('cache.'):
+                packed.cache[name[6:-4]] = np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        return packed
+
+    def save(self, path):
+        '''
+        Almacena el grafo como ficheros .npy en el directorio indicado (la primera fila de blocks.npy guarda el número de
+        autores de cada bloque)
+
+        Parameters
+        ----------
+            path : str
+                directorio de destino
+        '''
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        for name, table in self.tables.items():
+            table.save(path, name)
+
+        for name in STREAMS:
+            np.save(os.path.join(path, name + '.npy'), getattr(self, name))
+        np.save(os.path.join(path, 'blocks.npy'), np.vstack([np.full((1, len(STREAMS)), self.block_nodes, dtype=np.int64), self.blocks]))
+
+        for name, value in self.cache.items():
+            np.save(os.path.join(path, 'cache.' + name + '.npy'), value)
+
+    @property
+    def n(self):
+        '''
+        Número de nodos
+        '''
+        return len(self.tables['ids'])
+
+    @property
+    def m(self):
+        '''
+        Número de aristas (no dirigidas)
+        '''
+        return int(decode_varints(self.degrees).sum()) // 2
+
+    def nbytes(self):
+        '''
+        Bytes que ocupan las listas de coautores comprimidas (flujos y tabla de bloques)
+        '''
+        return sum(getattr(self, name).nbytes for name in STREAMS) + self.blocks.nbytes
+
+    def decode_block(self, block):
+        '''
+        Descomprime las listas de coautores de un bloque
+
+        Returns
+        -------
+            (indptr, indices, weights) : (np.ndarray, np.ndarray, np.ndarray)
+                listas de coautores de los autores del bloque en formato CSR (indptr relativo al bloque)
+        '''
+        start, end = self.blocks[block], self.blocks[block + 1]
+        degrees = decode_varints(self.degrees[start[0]:end[0]])
+        rows = np.arange(block * self.block_nodes, block * self.block_nodes + len(degrees))
+
+        indptr = np.zeros(len(degrees) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=indptr[1:])
+        indices = _decode_adjacency(rows, degrees, decode_varints(self.gaps[start[1]:end[1]]))
+        return indptr, indices, decode_varints(self.weights[start[2]:end[2]]).astype(np.int32)
+
+    def neighbours(self, i):
+        '''
+        Coautores del autor en la posición i y publicaciones compartidas con cada uno, descomprimiendo sólo su bloque
+
+        Returns
+        -------
+            (indices, weights) : (np.ndarray, np.ndarray)
+        '''
+        indptr, indices, weights = self.decode_block(i // self.block_nodes)
+        row = i % self.block_nodes
+        return indices[indptr[row]:indptr[row + 1]], weights[indptr[row]:indptr[row + 1]]
+
+    def iter_neighbours(self):
+        '''
+        Recorre las listas de coautores de todos los autores descomprimiendo un bloque cada vez, sin reconstruir el CSR
+
+        Returns
+        -------
+            neighbours : generator
+                (posición, coautores, pesos) de cada autor
+        '''
+        for block in range(len(self.blocks) - 1):
+            indptr, indices, weights = self.decode_block(block)
+            first = block * self.block_nodes
+            for row in range(len(indptr) - 1):
+                yield first + row, indices[indptr[row]:indptr[row + 1]], weights[indptr[row]:indptr[row + 1]]
+
+    @timed('packed.to_compact', items=lambda compact: compact.n)
+    def to_compact(self):
+        '''
+        Descomprime el grafo completo (los tres flujos a la vez, sin recorrer los bloques)
+
+        Returns
+        -------
+            compact : CompactGraph
+        '''
+        degrees = decode_varints(self.degrees)
+        indptr = np.zeros(len(degrees) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=indptr[1:])
+
+        indices = _decode_adjacency(np.arange(len(degrees)), degrees, decode_varints(self.gaps))
+        weights = decode_varints(self.weights).astype(np.int32)
+
+        compact = CompactGraph(np.array(self.tables['ids'].tolist()), indptr, indices, weights,
+                               names=np.array(self.tables['names'].tolist()),
+                               affiliations=np.array(self.tables['affiliations'].tolist()))
+        compact.cache.update(self.cache)
+        return compact
+
+
+if __name__ == "__main__":
+    data_path = data_dir()
+
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--graph", default=data_path + '/colab_graph', help="Directorio del grafo compacto")
+    arg_parser.add_argument("--output", default=data_path + '/colab_graph.packed', help="Directorio del grafo comprimido")
+    arg_parser.add_argument("--unpack", action="store_true", help="Descomprimir el grafo de --output en --graph")
+    arg_parser.add_argument("--block-nodes", type=int, default=BLOCK_NODES, help="Número de autores de cada bloque")
+
+    args = arg_parser.parse_args()
+
+    if args.unpack:
+        PackedGraph.load(args.output).to_compact().save(args.graph)
+        print("Se ha descomprimido el grafo en {:s}".format(args.graph))
+    else:
+        compact = CompactGraph.load(args.graph)
+        packed = PackedGraph.from_compact(compact, block_nodes=args.block_nodes)
+        packed.save(args.output)
+        print("{:d} aristas en {:d} bytes ({:.2f} bytes/arista, {:.2f} en CSR)".format(
+            compact.m, packed.nbytes(), packed.nbytes() / max(len(compact.indices), 1),
+            (compact.indptr.nbytes + compact.indices.nbytes + compact.weights.nbytes) / max(len(compact.indices), 1)))
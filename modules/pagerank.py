@@ -0,0 +1,245 @@
+import os
+import numpy as np
+from collections import deque
+
+try:
+    from modules.instrumentation import timed, count
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from instrumentation import timed, count
+
+# Fichero, dentro del directorio del grafo compacto, donde se almacena el último vector de PageRank
+STATE_FILE = 'pagerank.npz'
+
+
+def _teleport(compact):
+    '''
+    Probabilidad de salto de cada autor, proporcional a la suma de pesos de sus aristas (como en el script 6)
+    '''
+    strength = np.bincount(np.repeat(np.arange(compact.n), compact.degrees()),
+                           weights=np.asarray(compact.weights, dtype=np.float64), minlength=compact.n)
+    total = strength.sum()
+    return strength / total if total > 0 else np.full(compact.n, 1.0 / max(compact.n, 1))
+
+
+def _pattern(compact):
+    '''
+    Matriz de adyacencia binaria (sin pesos) del grafo, almacenada en la caché del grafo compacto
+    '''
+    from scipy import sparse
+
+    return compact.cached('pattern', lambda: sparse.csr_matrix(
+        (np.ones(len(compact.indices)), compact.indices, compact.indptr), shape=(compact.n, compact.n)))
+
+
+def _propagate(pattern, values, degrees):
+    '''
+    (P x)[u] = suma de x[v] / grado(v) para los coautores v de u
+    '''
+    return pattern @ np.divide(values, degrees, out=np.zeros(len(values)), where=degrees > 0)
+
+
+@timed('pagerank.power', items=lambda result: len(result[0]))
+def power_iteration(compact, d=0.85, tol=1e-6, start=None, max_iter=1000):
+    '''
+    PageRank con la misma formulación que el script 6 (salto proporcional a la suma de pesos de cada autor y reparto
+    uniforme entre coautores) mediante iteraciones vectorizadas sobre el grafo compacto
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        d : float
+            factor de amortiguamiento
+
+        tol : float
+            cambio total (norma L1) máximo entre dos iteraciones para considerar que ha convergido
+
+        start : np.ndarray
+            vector inicial (por defecto 1/n para todos los autores)
+
+        max_iter : int
+            número máximo de iteraciones
+
+    Returns
+    -------
+        (values, iterations) : (np.ndarray, int)
+            valor de PageRank de cada autor e iteraciones realizadas
+    '''
+    degrees = compact.degrees()
+    pattern = _pattern(compact)
+    base = (1 - d) * _teleport(compact)
+    values = np.full(compact.n, 1.0 / max(compact.n, 1)) if start is None else np.asarray(start, dtype=np.float64).copy()
+
+    iterations = 0
+    while iterations < max_iter:
+        iterations += 1
+        new_values = base + d * _propagate(pattern, values, degrees)
+        change = np.abs(new_values - values).sum()
+        values = new_values
+        if change < tol:
+            break
+
+    count('pagerank_iterations_total', iterations, method='power')
+    return values, iterations
+
+
+@timed('pagerank.push', items=lambda result: len(result[0]))
+def push_update(compact, start, d=0.85, tol=1e-6):
+    '''
+    Actualiza un vector de PageRank aproximado (por ejemplo, el de la versión anterior del grafo) con empujes locales:
+    se calcula una vez el residuo r = (1-d)·salto + d·P·x - x y, mientras algún autor tenga un residuo mayor que tol / n,
+    se traslada a su valor y se reparte d·r / grado entre sus coautores. Si sólo han cambiado unas pocas aristas el residuo
+    se concentra a su alrededor y sólo se visitan esos autores
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto (versión nueva)
+
+        start : np.ndarray
+            vector de partida, ya reasignado a los autores del grafo (ver remap)
+
+        d : float
+            factor de amortiguamiento
+
+        tol : float
+            residuo total (norma L1) máximo aproximado
+
+    Returns
+    -------
+        (values, pushes) : (np.ndarray, int)
+            valor de PageRank de cada autor y número de empujes realizados
+    '''
+    degrees = compact.degrees()
+    values = np.asarray(start, dtype=np.float64).copy()
+    residual = (1 - d) * _teleport(compact) + d * _propagate(_pattern(compact), values, degrees) - values
+
+    threshold = tol / max(compact.n, 1)
+    indptr, indices = compact.indptr, compact.indices
+    values, residual, degree_list = values.tolist(), residual.tolist(), degrees.tolist()
+
+    queue = deque(np.flatnonzero(np.abs(np.asarray(residual)) > threshold).tolist())
+    queued = set(queue)
+    pushes = 0
+
+    while queue:
+        v = queue.popleft()
+        queued.discard(v)
+        rv = residual[v]
+        values[v] += rv
+        residual[v] = 0.0
+        pushes += 1
+
+        if degree_list[v] == 0:
+            continue
+
+        share = d * rv / degree_list[v]
+        for u in indices[indptr[v]:indptr[v + 1]].tolist():
+            residual[u] += share
+            if u not in queued and abs(residual[u]) > threshold:
+                queue.append(u)
+                queued.add(u)
+
+    count('pagerank_pushes_total', pushes)
+    return np.array(values), pushes
+
+
+def remap(previous_ids, previous_values, compact, d=0.85):
+    '''
+    Reasigna un vector de PageRank a los autores de una nueva versión del grafo. Los autores nuevos parten de su
+    probabilidad de salto.
+
+    El vector se normaliza para que sume 1, como la solución exacta: al cambiar la suma total de pesos cambia el salto de
+    todos los autores, y el error en la masa total es la componente que más lentamente se corrige al iterar
+
+    Parameters
+    ----------
+        previous_ids : np.ndarray
+            identificadores de los autores de la versión anterior
+
+        previous_values : np.ndarray
+            PageRank de cada autor de la versión anterior
+
+        compact : CompactGraph
+            nueva versión del grafo
+
+        d : float
+            factor de amortiguamiento
+
+    Returns
+    -------
+        start : np.ndarray
+            vector de partida para la nueva versión
+    '''
+    start = (1 - d) * _teleport(compact)
+    previous = dict(zip(np.asarray(previous_ids).tolist(), np.asarray(previous_values).tolist()))
+    for i, author in enumerate(np.asarray(compact.ids).tolist()):
+        if author in previous:
+            start[i] = previous[author]
+
+    total = start.sum()
+    return start / total if total > 0 else start
+
+
+def save_state(path, ids, values):
+    '''
+    Almacena el vector de PageRank junto al grafo compacto (con los identificadores de los autores, para poder reasignarlo)
+    '''
+    np.savez(os.path.join(path, STATE_FILE), ids=np.asarray(ids), values=np.asarray(values, dtype=np.float64))
+
+
+def load_state(path):
+    '''
+    Último vector de PageRank almacenado junto al grafo, (ids, values), o None si no existe
+    '''
+    state_path = os.path.join(path, STATE_FILE)
+    if not os.path.exists(state_path):
+        return None
+    with np.load(state_path) as state:
+        return state['ids'], state['values']
+
+
+def pagerank(compact, path=None, d=0.85, tol=1e-6, local=False, warm=True):
+    '''
+    PageRank de los autores partiendo, si existe, del vector calculado sobre la versión anterior del grafo, y almacenando
+    el resultado para la siguiente actualización
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        path : str
+            directorio del grafo compacto donde se almacena el vector (None para no almacenarlo)
+
+        d : float
+            factor de amortiguamiento
+
+        tol : float
+            tolerancia (norma L1)
+
+        local : bool
+            si se actualiza el vector anterior con empujes locales en lugar de con iteraciones sobre todo el grafo
+
+        warm : bool
+            si se parte del vector anterior (False para partir del vector uniforme)
+
+    Returns
+    -------
+        values : np.ndarray
+            valor de PageRank de cada autor
+    '''
+    state = load_state(path) if path is not None and warm else None
+
+    if state is None:
+        values, _ = power_iteration(compact, d=d, tol=tol)
+    else:
+        start = remap(state[0], state[1], compact, d=d)
+        values, _ = push_update(compact, start, d=d, tol=tol) if local else power_iteration(compact, d=d, tol=tol, start=start)
+
+    if path is not None:
+        save_state(path, compact.ids, values)
+
+    return values
@@ -0,0 +1,346 @@
+import os
+import heapq
+import numpy as np
+from argparse import ArgumentParser
+
+try:
+    from modules.compact import init_worker, worker_pool, worker_shared
+    from modules.instrumentation import timed
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from compact import init_worker, worker_pool, worker_shared
+    from instrumentation import timed
+    from scripts import data_dir
+
+# Longitud de cada arista a partir del número de publicaciones compartidas: 'inverse' (1 / peso) o 'log'
+# (-log(peso / (peso máximo + 1)), que suma la "improbabilidad" de cada colaboración a lo largo del camino). Con 'hops'
+# todas las aristas miden 1 (caminos sin ponderar)
+LENGTHS = ('inverse', 'log', 'hops')
+
+# Número de orígenes de cada bloque de búsquedas
+BLOCK_SOURCES = 64
+
+
+def edge_lengths(compact, length='inverse'):
+    '''
+    Longitud de cada arista del grafo compacto: cuantas más publicaciones compartidas, más cerca están los coautores
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        length : str
+            'inverse' (1 / peso), 'log' (-log(peso / (peso máximo + 1)), siempre positiva) o 'hops' (1)
+
+    Returns
+    -------
+        lengths : np.ndarray
+            longitud de cada arista (float64), en el orden de compact.indices
+    '''
+    weights = np.asarray(compact.weights, dtype=np.float64)
+    if length == 'inverse':
+        return 1.0 / weights
+    if length == 'log':
+        return -np.log(weights / (weights.max() + 1)) if len(weights) else weights
+    if length == 'hops':
+        return np.ones(len(weights))
+    raise ValueError("Longitud desconocida: {:s} (opciones: {:s})".format(length, ', '.join(LENGTHS)))
+
+
+def length_matrix(compact, length='inverse'):
+    '''
+    Matriz dispersa de longitudes de las aristas (scipy.sparse.csr_matrix)
+    '''
+    from scipy import sparse
+
+    return sparse.csr_matrix((edge_lengths(compact, length), compact.indices, compact.indptr), shape=(compact.n, compact.n))
+
+
+def distances(compact, sources, length='inverse'):
+    '''
+    Distancias ponderadas desde cada origen a todos los autores (algoritmo de Dijkstra de scipy.sparse.csgraph)
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        sources : list
+            posiciones de los orígenes
+
+        length : str
+            ver edge_lengths
+
+    Returns
+    -------
+        distances : np.ndarray
+            (orígenes, n) distancia de cada origen a cada autor (inf si no es alcanzable)
+    '''
+    from scipy.sparse import csgraph
+
+    return csgraph.dijkstra(length_matrix(compact, length), directed=False, indices=np.asarray(sources, dtype=np.int64))
+
+
+def erdos(compact, source, length='inverse'):
+    '''
+    Número de Erdös ponderado: distancia de cada autor al autor de origen por los caminos de menor longitud
+
+    Returns
+    -------
+        distances : np.ndarray
+            distancia de cada autor al origen (inf si no es alcanzable)
+    '''
+    return distances(compact, [source], length=length)[0]
+
+
+def _block_closeness(sources, shared=None):
+    '''
+    Autores alcanzables y suma de distancias desde cada origen de un bloque
+    '''
+    from scipy.sparse import csgraph
+
+    matrix = worker_shared(shared)
+    block = csgraph.dijkstra(matrix, directed=False, indices=sources)
+    reached = np.isfinite(block)
+    return reached.sum(axis=1), np.where(reached, block, 0).sum(axis=1)
+
+
+@timed('paths.closeness', items=len)
+def closeness(compact, length='inverse', n_jobs=1, block_size=BLOCK_SOURCES):
+    '''
+    Centralidad de cercanía con distancias ponderadas, normalizada como networkx para grafos no conexos: (r - 1) / suma
+    de distancias, por la fracción (r - 1) / (n - 1) de autores alcanzables. Las búsquedas se agrupan en bloques de
+    orígenes que se reparten entre procesos
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        length : str
+            ver edge_lengths
+
+        n_jobs : int
+            número de procesos
+
+        block_size : int
+            número de orígenes de cada bloque
+
+    Returns
+    -------
+        closeness : np.ndarray
+            cercanía de cada autor
+    '''
+    matrix = length_matrix(compact, length)
+    blocks = [np.arange(start, min(start + block_size, compact.n)) for start in range(0, compact.n, block_size)]
+
+    if n_jobs > 1 and len(blocks) > 1:
+        with worker_pool(n_jobs, matrix) as executor:
+            results = list(executor.map(_block_closeness, blocks))
+    else:
+        results = [_block_closeness(block, matrix) for block in blocks]
+
+    reached = np.concatenate([result[0] for result in results]) if results else np.zeros(0)
+    totals = np.concatenate([result[1] for result in results]) if results else np.zeros(0)
+    return closeness_values(compact.n, reached, totals)
+
+
+def closeness_values(n, reached, totals):
+    '''
+    Cercanía a partir de los autores alcanzados (incluido el propio autor) y la suma de sus distancias
+    '''
+    reached = np.asarray(reached, dtype=np.float64) - 1
+    totals = np.asarray(totals, dtype=np.float64)
+    values = np.divide(reached, totals, out=np.zeros(len(totals)), where=totals > 0)
+    return values * reached / max(n - 1, 1)
+
+
+def brandes(source, indptr, indices, lengths, betweenness):
+    '''
+    Búsqueda de Dijkstra con montículo binario (heapq) desde un origen y acumulación de dependencias de Brandes sobre
+    los caminos mínimos ponderados encontrados. Trabaja sobre listas de Python (más rápidas de indexar que los vectores
+    de numpy elemento a elemento)
+
+    Parameters
+    ----------
+        source : int
+            posición del origen
+
+        indptr, indices, lengths : list
+            grafo en formato CSR con la longitud de cada arista
+
+        betweenness : list
+            intermediación acumulada de cada autor (se actualiza)
+
+    Returns
+    -------
+        (reached, total) : (int, float)
+            autores alcanzados (incluido el origen) y suma de sus distancias al origen
+    '''
+    order = []
+    predecessors = {source: []}
+    sigma = {source: 1.0}
+    settled = {}
+    seen = {source: 0.0}
+    heap = [(0.0, source, source)]
+    total = 0.0
+    push, pop = heapq.heappush, heapq.heappop
+
+    while heap:
+        distance, previous, v = pop(heap)
+        if v in settled:
+            continue
+
+        if v != source:
+            sigma[v] += sigma[previous]
+        order.append(v)
+        settled[v] = distance
+        total += distance
+
+        start, end = indptr[v], indptr[v + 1]
+        for w, edge in zip(indices[start:end], lengths[start:end]):
+            candidate = distance + edge
+            if w in settled:
+                continue
+            known = seen.get(w)
+            if known is None or candidate < known:
+                seen[w] = candidate
+                push(heap, (candidate, v, w))
+                sigma[w] = 0.0
+                predecessors[w] = [v]
+            elif candidate == known:
+                # Camino de la misma longitud: se suman sus caminos mínimos
+                sigma[w] += sigma[v]
+                predecessors[w].append(v)
+
+    # Dependencias en orden inverso de distancia
+    delta = dict.fromkeys(order, 0.0)
+    while order:
+        w = order.pop()
+        coefficient = (1.0 + delta[w]) / sigma[w]
+        for v in predecessors[w]:
+            delta[v] += sigma[v] * coefficient
+        if w != source:
+            betweenness[w] += delta[w]
+
+    return len(settled), total
+
+
+def _block_betweenness(sources, shared=None):
+    '''
+    Intermediación parcial acumulada desde los orígenes de un bloque
+    '''
+    graph = worker_shared(shared)
+    # Los vectores se convierten a listas una vez por proceso
+    if isinstance(graph[0], np.ndarray):
+        graph = tuple(np.asarray(array).tolist() for array in graph)
+        if shared is None:
+            init_worker(graph)
+
+    indptr, indices, lengths = graph
+    betweenness = [0.0] * (len(indptr) - 1)
+    for source in sources.tolist():
+        brandes(source, indptr, indices, lengths, betweenness)
+    return np.array(betweenness)
+
+
+@timed('paths.betweenness', items=len)
+def betweenness(compact, length='inverse', k=None, seed=0, normalized=True, n_jobs=1, block_size=BLOCK_SOURCES):
+    '''
+    Centralidad de intermediación con caminos mínimos ponderados (algoritmo de Brandes sobre Dijkstra). Las búsquedas
+    desde cada origen son independientes: se agrupan en bloques que se reparten entre procesos y cada bloque devuelve la
+    intermediación parcial de sus orígenes, que se suma. Con k se estima a partir de k orígenes elegidos al azar (como
+    networkx)
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        length : str
+            ver edge_lengths
+
+        k : int
+            número de orígenes de la estimación (None para todos los autores)
+
+        seed : int
+            semilla de la elección de orígenes
+
+        normalized : bool
+            si se divide por el número de pares de autores, (n - 1)(n - 2)
+
+        n_jobs : int
+            número de procesos
+
+        block_size : int
+            número de orígenes de cada bloque
+
+    Returns
+    -------
+        betweenness : np.ndarray
+            intermediación de cada autor
+    '''
+    n = compact.n
+    sources = np.arange(n) if k is None or k >= n else np.sort(np.random.RandomState(seed).choice(n, size=k, replace=False))
+    blocks = [sources[start:start + block_size] for start in range(0, len(sources), block_size)]
+    graph = (np.asarray(compact.indptr), np.asarray(compact.indices), edge_lengths(compact, length))
+
+    values = np.zeros(n)
+    if n_jobs > 1 and len(blocks) > 1:
+        with worker_pool(n_jobs, graph) as executor:
+            for partial in executor.map(_block_betweenness, blocks):
+                values += partial
+    else:
+        converted = tuple(array.tolist() for array in graph)
+        for block in blocks:
+            values += _block_betweenness(block, converted)
+
+    return rescale(values, n, len(sources), normalized=normalized)
+
+
+def rescale(values, n, n_sources, normalized=True):
+    '''
+    Mismo reescalado de la intermediación acumulada que networkx: por pares de autores o, sin normalizar, cada camino se
+    cuenta en los dos sentidos. Si se ha estimado con n_sources < n orígenes, se extrapola a todos los autores
+    '''
+    if normalized:
+        scale = 1.0 / ((n - 1) * (n - 2)) if n > 2 else None
+    else:
+        scale = 0.5
+    if scale is not None:
+        if 0 < n_sources < n:
+            scale *= n / n_sources
+        values = values * scale
+    return values
+
+
+if __name__ == "__main__":
+    data_path = data_dir()
+
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--graph", default=data_path + '/colab_graph', help="Directorio del grafo compacto")
+    arg_parser.add_argument("--length", default='inverse', choices=LENGTHS, help="Longitud de las aristas a partir del peso")
+    arg_parser.add_argument("--samples", type=int, default=None, help="Orígenes de la estimación de la intermediación")
+    arg_parser.add_argument("--jobs", type=int, default=1, help="Número de procesos")
+    arg_parser.add_argument("--top", type=int, default=10, help="Número de autores a mostrar por medida")
+
+    args = arg_parser.parse_args()
+
+    try:
+        from modules.compact import CompactGraph
+    except ImportError:
+        from compact import CompactGraph
+
+    compact = CompactGraph.load(args.graph)
+    results = {
+        'closeness': closeness(compact, length=args.length, n_jobs=args.jobs),
+        'betweenness': betweenness(compact, length=args.length, k=args.samples, n_jobs=args.jobs),
+    }
+    for measure, values in results.items():
+        print(measure)
+        for i in np.argsort(-values, kind='stable')[:args.top].tolist():
+            print("    {:<30s} {:.6f}".format(compact.ids[i][10:], values[i]))
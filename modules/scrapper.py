@@ -2,11 +2,186 @@
 # -*- coding: utf-8 -*-
 
 import re
+import json
 from lxml import etree
 from tqdm import tqdm
 import argparse
 import os
 
+try:
+    from modules.instrumentation import timed
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from instrumentation import timed
+    from scripts import data_dir
+
+# Máscaras predefinidas (se pueden ampliar o sustituir con un fichero de configuración, ver MaskRegistry.from_file)
+DEFAULT_MASKS = {
+    "uclm": r'((C|c)astilla( |-)(L|l)a (M|m)ancha)|((U|u)(C|c)(L|l)(M|m))',
+    "spain": r'.*, (Spain|España|Espana)',
+}
+
+# Referencias numéricas a grupos (\1, (?(1)...)) y modificadores globales ((?i)) de una expresión regular, que dejan de
+# funcionar al integrar la máscara en la expresión combinada (ver MaskRegistry.add)
+NUMBERED_REFERENCE_RE = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]|\(\?\(\d+\)')
+GLOBAL_FLAGS_RE = re.compile(r'(?<!\\)(?:\\\\)*\(\?[aiLmsux]+\)')
+
+# Identificadores de las páginas de autor
+HOMEPAGE_RE = re.compile(r'homepages\/[a-zA-Z0-9_\/]+')
+
+
+class MaskRegistry:
+    '''
+    Registro de máscaras de afiliación (expresiones regulares con nombre) compiladas en una única expresión combinada:
+    cada máscara es una búsqueda anticipada opcional con un grupo con nombre, de forma que una sola evaluación sobre una
+    afiliación indica todas las máscaras que la reconocen.
+
+    Por ello las máscaras no pueden usar referencias numéricas a sus grupos (\\1, (?(1)...)), que en la expresión
+    combinada apuntarían a los grupos de otra máscara (se pueden usar grupos con nombre y (?P=nombre)), ni modificadores
+    globales en mitad de la expresión. Un modificador global al principio ((?i)...) se aplica sólo a la máscara
+
+    Parameters
+    ----------
+        masks : dict
+            {nombre: expresión regular} (por defecto, DEFAULT_MASKS)
+    '''
+    def __init__(self, masks=None):
+        self.patterns = {}
+        self._matcher = None
+        for name, pattern in (DEFAULT_MASKS if masks is None else masks).items():
+            self.add(name, pattern)
+
+    @classmethod
+    def from_file(cls, path, defaults=True):
+        '''
+        Carga las máscaras de un fichero JSON con el formato:
+
+            {
+                "uclm": "expresión regular",
+                "upm": {"pattern": "expresión regular", "ignore_case": true},
+                ...
+            }
+
+        Parameters
+        ----------
+            path : str
+                fichero de configuración
+
+            defaults : bool
+                si se conservan las máscaras predefinidas (las del fichero las sustituyen si tienen el mismo nombre)
+
+        Returns
+        -------
+            registry : MaskRegistry
+        '''
+        with open(path, encoding='utf-8') as fconfig:
+            config = json.load(fconfig)
+
+        registry = cls(None if defaults else {})
+        for name, mask in config.items():
+            if isinstance(mask, dict):
+                registry.add(name, mask['pattern'], ignore_case=mask.get('ignore_case', False))
+            else:
+                registry.add(name, mask)
+        return registry
+
+    def add(self, name, pattern, ignore_case=False):
+        '''
+        Añade (o sustituye) una máscara, comprobando que la expresión regular es válida y que se puede combinar con el
+        resto de máscaras del registro (ValueError en otro caso)
+        '''
+        # Los modificadores globales iniciales se convierten en modificadores locales de la máscara: (?i)x -> (?i:x)
+        flags = re.match(r'\(\?([aiLmsux]+)\)', pattern)
+        if flags is not None:
+            pattern = '(?{:s}:{:s})'.format(flags.group(1), pattern[flags.end():])
+        if ignore_case:
+            pattern = '(?i:' + pattern + ')'
+
+        if NUMBERED_REFERENCE_RE.search(pattern):
+            raise ValueError("La máscara {:s} usa referencias numéricas a grupos; use grupos con nombre".format(name))
+        if GLOBAL_FLAGS_RE.search(pattern):
+            raise ValueError("La máscara {:s} usa modificadores globales fuera del principio de la expresión".format(name))
+        try:
+            re.compile(pattern)
+        except re.error as error:
+            raise ValueError("La máscara {:s} no es una expresión regular válida: {}".format(name, error))
+
+        patterns = dict(self.patterns, **{name: pattern})
+        try:
+            self._combine(patterns.values())
+        except re.error as error:
+            raise ValueError("La máscara {:s} no se puede combinar con el resto del registro: {}".format(name, error))
+
+        self.patterns = patterns
+        self._matcher = None
+
+    def __contains__(self, name):
+        return name in self.patterns
+
+    def __len__(self):
+        return len(self.patterns)
+
+    @property
+    def names(self):
+        return list(self.patterns)
+
+    @property
+    def matcher(self):
+        '''
+        Expresión combinada: (?:(?=.*?(?P<_0>máscara 0))|)(?:(?=.*?(?P<_1>máscara 1))|)...
+        '''
+        if self._matcher is None:
+            self._matcher = self._combine(self.patterns.values())
+        return self._matcher
+
+    @staticmethod
+    def _combine(patterns):
+        return re.compile(''.join('(?:(?=.*?(?P<_{:d}>{:s}))|)'.format(i, pattern) for i, pattern in enumerate(patterns)),
+                          re.DOTALL)
+
+    def match(self, text):
+        '''
+        Nombres de las máscaras que reconocen el texto
+        '''
+        groups = self.matcher.match(text).groupdict()
+        return [name for i, name in enumerate(self.patterns) if groups['_{:d}'.format(i)] is not None]
+
+
+def contained(matched, affiliations):
+    '''
+    Afiliaciones contenidas (como subcadena) en cada una de las afiliaciones reconocidas, para propagar una máscara a los
+    autores cuya afiliación no incluye el país: "University of Málaga" está contenida en "University of Málaga, Spain".
+    En lugar de comparar cada afiliación con todas las reconocidas, se buscan en el conjunto de afiliaciones las
+    subcadenas de cada afiliación reconocida con las longitudes de las afiliaciones existentes
+
+    Parameters
+    ----------
+        matched : iterable
+            afiliaciones reconocidas por alguna máscara
+
+        affiliations : set
+            afiliaciones distintas del volcado
+
+    Returns
+    -------
+        contained : dict
+            {afiliación reconocida: afiliaciones contenidas en ella (incluida ella misma)}
+    '''
+    lengths = sorted({len(affiliation) for affiliation in affiliations})
+    result = {}
+    for text in matched:
+        found = set()
+        for length in lengths:
+            if length > len(text):
+                break
+            for start in range(len(text) - length + 1):
+                if text[start:start + length] in affiliations:
+                    found.add(text[start:start + length])
+        result[text] = found
+    return result
+
+
 class Scrapper:
     '''
     MÃ³dulo encargado de la extracción de los datos de la base de datos completa de dblp. Hace usos de la estructura del archivo xml para obtener los autores
@@ -27,88 +202,108 @@ class Scrapper:
 
     Una vez ha recorrido todo el documento, escribe en el archivo especificado por parámetro todas las cuales cumplían con la condición
 
-    Para poder identificar los autores que pertenezcan a universidades españolas pero que en su afiliación no contengan la palabra "España" o "Spain", en primer lugar
-    se recorrerá el documento para obtener todas las afiliaciones que sí la contienen y, una vez hecho esto, volver a recorrer el documento comprobando si la afiliación de cada autor a pesar
-    de no tener la palabra España sÃ­ se trata de una universidad española. De esta forma, si la afiliación de un autor es "University of Málaga" y la primera vez que se ha recorrido el archivo
-    se ha recuperado la afiliación "University of Málaga, Spain" para cualquier otro autor, el primero también quedará almacenado en la lista.
+    Para poder identificar los autores que pertenezcan a universidades españolas pero que en su afiliación no contengan la palabra "España" o "Spain", se recorre
+    el documento una vez guardando la afiliación de cada autor y, una vez hecho esto, se obtienen todas las afiliaciones que sí la contienen y se comprueba si la afiliación de cada autor a pesar
+    de no tener la palabra España sÃ­ se trata de una universidad española. De esta forma, si la afiliación de un autor es "University of Málaga" y en el archivo
+    aparece la afiliación "University of Málaga, Spain" para cualquier otro autor, el primero también quedará almacenado en la lista.
+
+    Las máscaras se obtienen de un registro (ver MaskRegistry) que se puede ampliar con un fichero de configuración, y todas se evalúan en el mismo
+    recorrido del documento (ver scrape_masks).
 
     '''
-    def __init__(self):
-        self.masks = {
-            "uclm" : re.compile(r'((C|c)astilla( |-)(L|l)a (M|m)ancha)|((U|u)(C|c)(L|l)(M|m))'),
-            "spain" : re.compile(r'.*, (Spain|España|Espana)'),
-        }
+    def __init__(self, masks=None):
+        self.registry = masks if isinstance(masks, MaskRegistry) else MaskRegistry(masks)
+        self.masks = self.registry.patterns
 
+    @timed('scrapper.scrape', items=len)
     def scrape(self, xml_path, mask=None):
         '''
-        MÃ©todo encargado de recorrer el documento
+        Identificadores de los autores reconocidos por una máscara (o de todos los autores si no se indica), con un único
+        recorrido del documento (ver scrape_masks)
 
         Parameters
         ----------
             xml_path : str
                 directorio del archivo fuente XML (descomprimido)
 
-            mask: re.compile()
-                patron de búsqueda empleado para la aficiliación
+            mask : str
+                nombre de la máscara del registro empleada para la afiliación (None para todos los autores)
+
+        Returns
+        -------
+            ids : list
+                identificadores ('homepages/x/y') en el orden del documento
+        '''
+        return self.scrape_masks(xml_path, masks=[mask] if mask is not None else [], full=mask is None)[mask]
 
-        Attributes
+    @timed('scrapper.scrape_masks', items=len)
+    def scrape_masks(self, xml_path, masks=None, full=False):
+        '''
+        Recorre el documento una única vez y obtiene los identificadores de los autores reconocidos por cada máscara.
+
+        Durante el recorrido se guardan la clave y la afiliación de cada autor. Después se evalúa la expresión combinada
+        del registro sobre cada afiliación distinta (una vez por afiliación, no por autor) y cada máscara se propaga a las
+        afiliaciones contenidas en las que reconoce (ver contained), calculadas una sola vez para todas las máscaras
+
+        Parameters
         ----------
-            context : str
-                atributo donde se almacena el directorio fuente
+            xml_path : str
+                directorio del archivo fuente XML (descomprimido)
+
+            masks : list
+                nombres de las máscaras (por defecto, todas las del registro)
 
-            dst : str
-                atributo donde se almacena el directorio de destino
+            full : bool
+                si se incluyen también todos los autores (con la clave None)
 
-            dtd : str
-                atributo donde se almacena el directorio del archivo de especificacion de tipos
+        Returns
+        -------
+            ids : dict
+                {máscara: identificadores en el orden del documento}
+        '''
+        masks = self.registry.names if masks is None else list(masks)
+        unknown = [mask for mask in masks if mask not in self.registry]
+        if unknown:
+            raise ValueError("Máscaras desconocidas: {:s}".format(', '.join(unknown)))
 
-            entity_re : re.compile()
-                expresion regular que nos permite dividir una cadena en palabras
+        # Recorrido único: claves de las páginas de autor y afiliación de cada una
+        context = etree.iterparse(xml_path, events=("end",))
+        keys, records = [], []
 
-            replacements : dict
-                diccionario con las entidades especificadas en el DTD para hacer la transcripcion de ISO a UTF-8
-        '''   
-        
-        # En caso de que se aplique una máscara (comprueba si la palarba "España/Spain" o "Universidad de Castilla-La Mancha" se encuentra en el grafo)
-        if mask is not None:
-            # Primer recorrido -> obtener afiliaciones
-            context = etree.iterparse(xml_path, events=("start", "end"))
-
-            affiliations = set()
-
-            for event, url in tqdm(context, desc="Obteniendo afiliaciones"):
-                if event == 'start':
-                    if url.tag == 'www':
-                        if url.find('note') != None:
-                            note = url.find('note')
-                            if note.get('type') == "affiliation" and note.text is not None:
-                                if re.search(self.masks[mask], note.text):
-                                    if note.text not in affiliations:
-                                        affiliations.add(note.text)
-                url.clear()
-                while url.getprevious() is not None:
-                    del url.getparent()[0]
-
-        # Segunda iteración en caso de máscara aplicada, obtener IDs de autores
-        context = etree.iterparse(xml_path, events=("start", "end"))
-        ids = []
-
-        for event, url in tqdm(context, desc="Obteniendo identificadores"):
-            if event == 'start':
-                if url.tag == 'www':
-                    if mask is not None:
-                        if url.find('note') != None:
-                            note = url.find('note')
-                            if note.get('type') == "affiliation" and note.text is not None:
-                                if any([note.text in affiliation for affiliation in list(affiliations)]):
-                                    ids.append(url.get('key'))
-                    else:
-                        if re.search(r'homepages\/[a-zA-Z0-9_\/]+', url.get('key')):
-                            ids.append(url.get('key'))                      
+        for event, url in tqdm(context, desc="Obteniendo identificadores y afiliaciones"):
+            # Sólo se procesan (y liberan) los registros de primer nivel, ya completos con todos sus hijos
+            parent = url.getparent()
+            if parent is None or parent.getparent() is not None:
+                continue
+
+            if url.tag == 'www':
+                key = url.get('key')
+                if full and re.search(HOMEPAGE_RE, key):
+                    keys.append(key)
+
+                note = url.find('note')
+                if note is not None and note.get('type') == "affiliation" and note.text is not None:
+                    records.append((key, note.text))
             url.clear()
             while url.getprevious() is not None:
                 del url.getparent()[0]
 
+        # Afiliaciones reconocidas por cada máscara (una evaluación de la expresión combinada por afiliación distinta)
+        affiliations = {text for _, text in records}
+        matched = {mask: set() for mask in masks}
+        if masks:
+            for text in affiliations:
+                for mask in self.registry.match(text):
+                    if mask in matched:
+                        matched[mask].add(text)
+
+        # Propagación: afiliaciones contenidas en alguna de las reconocidas
+        inner = contained(set().union(*matched.values()), affiliations)
+        accepted = {mask: set().union(*(inner[text] for text in texts)) for mask, texts in matched.items()}
+
+        ids = {mask: [key for key, text in records if text in accepted[mask]] for mask in masks}
+        if full:
+            ids[None] = keys
         return ids
 
 if __name__ == "__main__":
@@ -116,25 +311,30 @@ if __name__ == "__main__":
 
     # ObtenciÃ³n de los argumentos
     arg_parser.add_argument("xml_path", help="Ubicación del fichero XML decodificado (descomprimido)", type=str)
-    arg_parser.add_argument("--mask", action="store", help="Máscara a aplicar para obtener (opcional)", default=None, choices=["spain", "uclm"])
+    arg_parser.add_argument("--mask", nargs="*", help="Máscaras a aplicar (opcional, sin valores para todas las del registro)", default=None)
+    arg_parser.add_argument("--masks-file", default=None, help="Fichero JSON con máscaras adicionales")
 
     args = arg_parser.parse_args()
 
     # InstanciaciÃ³n del scrapper
-    sc = Scrapper()
+    sc = Scrapper(MaskRegistry.from_file(args.masks_file) if args.masks_file is not None else None)
 
-    authors_ids = sc.scrape(xml_path=args.xml_path, mask=args.mask)
+    if args.mask is None:
+        authors_ids = {None: sc.scrape(xml_path=args.xml_path)}
+    else:
+        authors_ids = sc.scrape_masks(xml_path=args.xml_path, masks=args.mask or None)
 
-    # Directorio actual para almacenar las IDs
-    data_path = os.path.dirname(os.path.realpath(__file__)) + '/data'
+    # Directorio de datos para almacenar las IDs
+    data_path = data_dir()
 
     if not os.path.exists(data_path):
-        os.mkdir(data_path)
+        os.makedirs(data_path)
 
-    if args.mask is not None:
-        filename = data_path + "/{:s}-ids.txt".format(args.mask)
-    else:
-        filename = data_path + "/full-db-ids.txt"
+    for mask, ids in authors_ids.items():
+        if mask is not None:
+            filename = data_path + "/{:s}-ids.txt".format(mask)
+        else:
+            filename = data_path + "/full-db-ids.txt"
 
-    with open(filename, 'w') as fids:
-        fids.write("\n".join(authors_ids))
\ No newline at end of file
+        with open(filename, 'w') as fids:
+            fids.write("\n".join(ids))
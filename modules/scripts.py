@@ -0,0 +1,55 @@
+import os
+import glob
+import importlib.util
+
+# Directorio raíz del proyecto (donde se encuentran los scripts numerados)
+root_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Variables de entorno con los directorios de datos y resultados (graphmining.py las define al ejecutar los scripts)
+DATA_ENV = 'GRAPHMINING_DATA'
+RESULTS_ENV = 'GRAPHMINING_RESULTS'
+
+# Scripts ya importados (cada script se ejecuta una sola vez por proceso)
+_loaded = {}
+
+
+def data_dir():
+    '''
+    Directorio de datos compartido por los scripts y los módulos: el indicado en GRAPHMINING_DATA o, por defecto, el
+    directorio data de la raíz del proyecto
+    '''
+    return os.environ.get(DATA_ENV) or os.path.join(root_path, 'data')
+
+
+def results_dir():
+    '''
+    Directorio de resultados compartido por los scripts y los módulos: el indicado en GRAPHMINING_RESULTS o, por
+    defecto, el directorio results de la raíz del proyecto
+    '''
+    return os.environ.get(RESULTS_ENV) or os.path.join(root_path, 'results')
+
+
+def load_script(number):
+    '''
+    Importa uno de los scripts numerados del proyecto (sin ejecutar su bloque principal) para poder reutilizar sus funciones
+
+    Parameters
+    ----------
+        number : int
+            número del script (por ejemplo, 5 para '5. Número de Ërdos.py')
+
+    Returns
+    -------
+        module : module
+            módulo importado
+    '''
+    if number in _loaded:
+        return _loaded[number]
+
+    path = sorted(glob.glob(os.path.join(root_path, "{:d}. *.py".format(number))))[0]
+    spec = importlib.util.spec_from_file_location("script_{:d}".format(number), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _loaded[number] = module
+
+    return module
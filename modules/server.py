@@ -0,0 +1,374 @@
+import os
+import sys
+import json
+import threading
+import numpy as np
+from collections import OrderedDict
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from scipy.sparse import csgraph
+
+try:
+    from modules.compact import CompactGraph
+    from modules.scripts import data_dir, load_script
+    from modules import clustering, ppr
+    from modules.instrumentation import count
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from compact import CompactGraph
+    from scripts import data_dir, load_script
+    import clustering
+    import ppr
+    from instrumentation import count
+
+
+class LRUCache:
+    '''
+    Caché de resultados con política de reemplazo LRU (se descarta el resultado usado hace más tiempo) segura entre hilos
+
+    Parameters
+    ----------
+        maxsize : int
+            número máximo de resultados almacenados
+    '''
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, function):
+        '''
+        Devuelve el resultado asociado a key o, si no está almacenado, lo calcula con function y lo almacena
+        '''
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                count('query_cache_hits_total')
+                return self.data[key]
+
+        count('query_cache_misses_total')
+        value = function()
+
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class GraphState:
+    '''
+    Versión cargada del grafo: diccionario original, representación compacta y número de versión.
+    No se modifica una vez creada, por lo que puede compartirse entre hilos sin cerrojos.
+    '''
+    def __init__(self, graph, version):
+        self.graph = graph
+        self.version = version
+        self.compact = CompactGraph.from_graph(graph)
+        self.compact.component_labels()
+        self.compact.core_numbers()
+        # Coeficiente de clustering de todos los autores, calculado una vez por versión para las consultas /author
+        self.clustering = clustering.clustering(self.compact)
+
+
+class GraphStore:
+    '''
+    Mantiene el grafo de colaboración en memoria y lo recarga cuando cambia el fichero en disco
+
+    Parameters
+    ----------
+        path : str
+            fichero del grafo de colaboración (colab_graph.npy)
+
+        cache : LRUCache
+            caché de resultados que se vacía al recargar el grafo
+
+        interval : float
+            segundos entre comprobaciones de cambios en el fichero
+    '''
+    def __init__(self, path, cache, interval=5.0):
+        self.path = path
+        self.cache = cache
+        self.interval = interval
+        self.mtime = None
+        self.current = None
+        self.reload()
+
+    def reload(self):
+        '''
+        Carga el grafo si el fichero ha cambiado desde la última carga. El nuevo grafo se prepara por completo antes de
+        sustituir al anterior, por lo que las consultas en curso no se ven afectadas
+        '''
+        mtime = os.stat(self.path).st_mtime
+        if mtime == self.mtime:
+            return False
+
+        graph = np.load(self.path, allow_pickle=True).item()
+        version = (self.current.version + 1) if self.current is not None else 0
+        self.current = GraphState(graph, version)
+        self.mtime = mtime
+        self.cache.clear()
+        count('graph_reloads_total')
+
+        return True
+
+    def watch(self):
+        '''
+        Lanza un hilo que comprueba periódicamente si hay una nueva versión del grafo
+        '''
+        def loop():
+            stop = threading.Event()
+            while not stop.wait(self.interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    # Fichero a medio escribir o corrupto: se mantiene la versión actual y se reintentará en la siguiente
+                    # comprobación (un error no debe detener el hilo de recarga)
+                    print("Error al recargar el grafo ({:s}): {}".format(type(e).__name__, e), file=sys.stderr)
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+
+def author_props(compact, i):
+    '''
+    Propiedades básicas del autor en la posición i del grafo compacto
+    '''
+    return {'id': compact.ids[i][10:], 'name': compact.names[i], 'affiliation': compact.affiliations[i] or None}
+
+
+def erdos_query(state, author):
+    '''
+    Distancia colaborativa (número de Erdös) de todos los autores alcanzables desde 'author', con la misma definición
+    que calculate_erdos pero mediante un recorrido en anchura sobre el grafo compacto
+    '''
+    compact = state.compact
+    source = compact.index['homepages/' + author]
+    distances = csgraph.shortest_path(compact.adjacency(), directed=False, unweighted=True, indices=source)
+    reached = np.flatnonzero(np.isfinite(distances))
+    reached = reached[np.argsort(distances[reached], kind='stable')]
+
+    return [dict(author_props(compact, i), number=int(distances[i])) for i in reached]
+
+
+def pagerank_query(state):
+    '''
+    Valores de PageRank de todos los autores ordenados de mayor a menor (función pagerank de '6. PageRank.py')
+    '''
+    pagerank = load_script(6).pagerank(state.graph)
+    return [{'id': author[10:], 'name': props['name'], 'affiliation': props['affiliation'], 'pr': props['pr']}
+            for author, props in sorted(pagerank.items(), key=lambda author_pr: author_pr[1]['pr'], reverse=True)]
+
+
+def metrics_query(state, component):
+    '''
+    Métricas de la red completa o de su componente más grande (función calculate_metrics de '2. Métricas sobre el grafo.py')
+    '''
+    compact = state.compact
+    if component == 'largest':
+        compact = compact.subgraph(compact.largest_component_mask())
+    return load_script(2).calculate_metrics(compact.to_networkx(), compact)
+
+
+def author_query(state, author):
+    '''
+    Grado, peso, clustering, núcleo y componente de un autor
+    '''
+    compact = state.compact
+    i = compact.index['homepages/' + author]
+    start, end = compact.indptr[i], compact.indptr[i + 1]
+    labels = compact.component_labels()
+
+    return dict(author_props(compact, i),
+                degree=int(end - start),
+                size=int(compact.weights[start:end].sum()),
+                clustering=float(state.clustering[i]),
+                core=int(compact.core_numbers()[i]),
+                component_size=int(compact.component_sizes()[labels[i]]))
+
+
+def neighbors_query(state, author):
+    '''
+    Coautores de un autor con el número de publicaciones compartidas, ordenados de mayor a menor
+    '''
+    compact = state.compact
+    i = compact.index['homepages/' + author]
+    start, end = compact.indptr[i], compact.indptr[i + 1]
+    order = np.argsort(-compact.weights[start:end], kind='stable')
+
+    return [dict(author_props(compact, j), weight=int(w))
+            for j, w in zip(compact.indices[start:end][order], compact.weights[start:end][order])]
+
+
+def ego_query(state, author, radius):
+    '''
+    Red ego de un autor: autores a distancia menor o igual que radius y aristas entre ellos
+    '''
+    compact = state.compact
+    adjacency = compact.adjacency()
+    mask = np.zeros(compact.n, dtype=bool)
+    frontier = np.array([compact.index['homepages/' + author]])
+    mask[frontier] = True
+    for _ in range(radius):
+        frontier = np.unique(adjacency[frontier].indices)
+        frontier = frontier[~mask[frontier]]
+        mask[frontier] = True
+
+    ego = compact.subgraph(mask)
+    rows = np.repeat(np.arange(ego.n), ego.degrees())
+    upper = rows < ego.indices
+
+    return {'nodes': [author_props(ego, i) for i in range(ego.n)],
+            'edges': [[ego.ids[i][10:], ego.ids[j][10:], int(w)]
+                      for i, j, w in zip(rows[upper], ego.indices[upper], ego.weights[upper])]}
+
+
+def influence_query(state, author, k):
+    '''
+    Autores más relevantes alrededor de un autor según su PageRank personalizado (empuje local)
+    '''
+    compact = state.compact
+    p = ppr.personalized_pagerank(compact, 'homepages/' + author)
+    return [{'id': a[10:], 'name': name, 'affiliation': affiliation, 'ppr': value}
+            for a, name, affiliation, value in ppr.top_k(compact, p, k=k, exclude=[compact.index['homepages/' + author]])]
+
+
+def to_json(value):
+    '''
+    Conversión de los tipos de numpy a tipos serializables en JSON
+    '''
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(type(value))
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    '''
+    Gestor de las peticiones HTTP. Cada petición se atiende en su propio hilo y trabaja sobre la versión del grafo
+    vigente al recibirla.
+
+    Endpoints (GET, respuesta JSON):
+        /health                         versión, número de nodos y aristas
+        /erdos?id=x/y[&limit=N]         número de Erdös respecto al autor
+        /pagerank[?k=N]                 N autores con mayor PageRank
+        /metrics[?component=largest]    métricas de la red o de su componente más grande
+        /author?id=x/y                  grado, clustering, núcleo y componente del autor
+        /neighbors?id=x/y               coautores del autor
+        /ego?id=x/y[&radius=R]          red ego del autor
+        /influence?id=x/y[&k=N]         N autores más relevantes alrededor del autor (PageRank personalizado)
+    '''
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        state = self.server.store.current
+        cache = self.server.cache
+
+        if url.path in ('/erdos', '/author', '/neighbors', '/ego', '/influence') and 'id' not in params:
+            return self.respond(400, {'error': "falta el parámetro 'id'"})
+
+        try:
+            if url.path == '/health':
+                body = {'version': state.version, 'n': state.compact.n, 'm': state.compact.m}
+            elif url.path == '/erdos':
+                limit = int(params.get('limit', 0)) or None
+                body = cache.get((state.version, 'erdos', params['id']), lambda: erdos_query(state, params['id']))[:limit]
+            elif url.path == '/pagerank':
+                body = cache.get((state.version, 'pagerank'), lambda: pagerank_query(state))[:int(params.get('k', 10))]
+            elif url.path == '/metrics':
+                component = params.get('component', 'all')
+                body = cache.get((state.version, 'metrics', component), lambda: metrics_query(state, component))
+            elif url.path == '/author':
+                body = cache.get((state.version, 'author', params['id']), lambda: author_query(state, params['id']))
+            elif url.path == '/neighbors':
+                body = cache.get((state.version, 'neighbors', params['id']), lambda: neighbors_query(state, params['id']))
+            elif url.path == '/ego':
+                radius = int(params.get('radius', 1))
+                body = cache.get((state.version, 'ego', params['id'], radius), lambda: ego_query(state, params['id'], radius))
+            elif url.path == '/influence':
+                k = int(params.get('k', 20))
+                body = cache.get((state.version, 'influence', params['id'], k), lambda: influence_query(state, params['id'], k))
+            else:
+                return self.respond(404, {'error': 'endpoint no encontrado'})
+        except KeyError as e:
+            return self.respond(404, {'error': 'autor no encontrado: {}'.format(e)})
+        except ValueError as e:
+            return self.respond(400, {'error': str(e)})
+        except Exception as e:
+            print("Error en {:s} ({:s}): {}".format(self.path, type(e).__name__, e), file=sys.stderr)
+            return self.respond(500, {'error': 'error interno del servidor'})
+
+        count('query_requests_total', endpoint=url.path)
+        self.respond(200, body)
+
+    def respond(self, status, body):
+        data = json.dumps(body, default=to_json).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Sin registro por petición (el volumen de consultas del panel lo haría ilegible)
+        pass
+
+
+def make_server(path, host='127.0.0.1', port=8080, cache_size=256, interval=5.0):
+    '''
+    Crea el servidor de consultas con el grafo cargado y la recarga automática activada
+
+    Parameters
+    ----------
+        path : str
+            fichero del grafo de colaboración (colab_graph.npy)
+
+        host : str
+            dirección en la que escucha el servidor
+
+        port : int
+            puerto en el que escucha el servidor
+
+        cache_size : int
+            número máximo de resultados en la caché LRU
+
+        interval : float
+            segundos entre comprobaciones de una nueva versión del grafo
+
+    Returns
+    -------
+        server : ThreadingHTTPServer
+    '''
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    server.daemon_threads = True
+    server.cache = LRUCache(cache_size)
+    server.store = GraphStore(path, server.cache, interval=interval)
+    server.store.watch()
+
+    return server
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--graph", default=os.path.join(data_dir(), 'colab_graph.npy'), help="Fichero del grafo de colaboración")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="Dirección en la que escucha el servidor")
+    arg_parser.add_argument("--port", type=int, default=8080, help="Puerto en el que escucha el servidor")
+    arg_parser.add_argument("--cache-size", type=int, default=256, help="Número máximo de resultados en caché")
+    arg_parser.add_argument("--interval", type=float, default=5.0, help="Segundos entre comprobaciones de una nueva versión del grafo")
+
+    args = arg_parser.parse_args()
+
+    server = make_server(args.graph, host=args.host, port=args.port, cache_size=args.cache_size, interval=args.interval)
+    print("Servidor de consultas escuchando en http://{:s}:{:d}".format(args.host, args.port))
+    server.serve_forever()
@@ -0,0 +1,200 @@
+import os
+import numpy as np
+
+try:
+    from modules.compact import CompactGraph
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from compact import CompactGraph
+
+
+class TemporalGraph:
+    '''
+    Grafo de colaboración indexado por año de publicación.
+
+    Sobre la representación compacta (CSR) del grafo completo, cada arista almacena el desglose de su peso por año como
+    tramos (año, peso) ordenados: los tramos de la arista e son run_years[run_ptr[e]:run_ptr[e+1]] y
+    run_weights[run_ptr[e]:run_ptr[e+1]]. El peso de cada arista en una ventana de años se obtiene con dos búsquedas
+    binarias sobre la suma acumulada de los tramos, de forma vectorizada para todas las aristas a la vez, por lo que
+    extraer la instantánea de cualquier ventana no requiere reconstruir el grafo.
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo completo (todas las publicaciones)
+
+        run_ptr : np.ndarray
+            posición de inicio de los tramos de cada arista del CSR (longitud nnz+1)
+
+        run_years : np.ndarray
+            año de cada tramo (0 si no consta)
+
+        run_weights : np.ndarray
+            número de publicaciones compartidas de cada tramo
+    '''
+    def __init__(self, compact, run_ptr, run_years, run_weights):
+        self.compact = compact
+        self.run_ptr = run_ptr
+        self.run_years = run_years
+        self.run_weights = run_weights
+
+        # Clave ordenada (arista, año) y peso acumulado para las consultas por ventana
+        edges = np.repeat(np.arange(len(run_ptr) - 1, dtype=np.int64), np.diff(run_ptr))
+        self.keys = edges * (1 << 16) + run_years
+        self.cumulative = np.r_[0, np.cumsum(run_weights)]
+
+    @classmethod
+    def from_graph(cls, graph, compact=None):
+        '''
+        Construye el grafo temporal a partir del grafo en formato diccionario generado por build_graph a partir de datos
+        con años de publicación (cada arista con su lista 'years' de tramos (año, peso))
+
+        Parameters
+        ----------
+            graph : dict
+                grafo de colaboración (ver build_graph)
+
+            compact : CompactGraph
+                representación compacta del mismo grafo, si ya se ha construido
+
+        Returns
+        -------
+            temporal : TemporalGraph
+        '''
+        compact = compact if compact is not None else CompactGraph.from_graph(graph)
+        ids = compact.ids.tolist()
+        indices = compact.indices.tolist()
+
+        lengths = np.zeros(len(indices), dtype=np.int64)
+        run_years, run_weights = [], []
+        for i, author in enumerate(ids):
+            coauthors = graph[author]['pubs']
+            for e in range(compact.indptr[i], compact.indptr[i + 1]):
+                edge = coauthors[ids[indices[e]]]
+                runs = edge.get('years') or [(0, edge['weight'])]
+                lengths[e] = len(runs)
+                for year, weight in runs:
+                    run_years.append(year)
+                    run_weights.append(weight)
+
+        run_ptr = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=run_ptr[1:])
+
+        return cls(compact, run_ptr, np.array(run_years, dtype=np.int64), np.array(run_weights, dtype=np.int32))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        '''
+        Carga un grafo temporal almacenado con save
+        '''
+        load = lambda name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+        return cls(CompactGraph.load(path, mmap_mode=mmap_mode), load('run_ptr'), load('run_years'), load('run_weights'))
+
+    def save(self, path):
+        '''
+        Almacena el grafo compacto y los tramos por año en el directorio indicado
+        '''
+        self.compact.save(path)
+        for name in ('run_ptr', 'run_years', 'run_weights'):
+            np.save(os.path.join(path, name + '.npy'), getattr(self, name))
+
+    def years(self):
+        '''
+        Primer y último año con publicaciones (sin contar las de año desconocido)
+        '''
+        known = np.asarray(self.run_years)[np.asarray(self.run_years) > 0]
+        return (int(known.min()), int(known.max())) if len(known) else (None, None)
+
+    def window_weights(self, start, end):
+        '''
+        Peso de cada arista (en el orden del CSR) contando sólo las publicaciones de los años [start, end]
+
+        Parameters
+        ----------
+            start : int
+                primer año de la ventana (incluido)
+
+            end : int
+                último año de la ventana (incluido)
+
+        Returns
+        -------
+            weights : np.ndarray
+                publicaciones compartidas en la ventana por cada arista
+        '''
+        edges = np.arange(len(self.run_ptr) - 1, dtype=np.int64) * (1 << 16)
+        upper = np.searchsorted(self.keys, edges + end, side='right')
+        lower = np.searchsorted(self.keys, edges + start, side='left')
+        return self.cumulative[upper] - self.cumulative[lower]
+
+    def snapshot(self, start, end, drop_isolated=False):
+        '''
+        Instantánea del grafo de colaboración con las publicaciones de los años [start, end]
+
+        Parameters
+        ----------
+            start : int
+                primer año de la ventana (incluido)
+
+            end : int
+                último año de la ventana (incluido)
+
+            drop_isolated : bool
+                si se eliminan los autores sin colaboraciones en la ventana
+
+        Returns
+        -------
+            snapshot : CompactGraph
+                grafo compacto con las mismas propiedades de los autores y los pesos de la ventana
+        '''
+        compact = self.compact
+        weights = self.window_weights(start, end)
+        keep = weights > 0
+
+        rows = np.repeat(np.arange(compact.n), compact.degrees())
+        indptr = np.zeros(compact.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[keep], minlength=compact.n), out=indptr[1:])
+
+        snapshot = CompactGraph(compact.ids, indptr, compact.indices[keep], weights[keep].astype(np.int32),
+                                names=compact.names, affiliations=compact.affiliations)
+
+        if drop_isolated:
+            snapshot = snapshot.subgraph(snapshot.degrees() > 0)
+
+        return snapshot
+
+    def sliding_windows(self, width, step=1, start=None, end=None, drop_isolated=False):
+        '''
+        Genera las instantáneas de ventanas deslizantes de 'width' años, avanzando 'step' años cada vez
+
+        Parameters
+        ----------
+            width : int
+                número de años de cada ventana
+
+            step : int
+                desplazamiento entre ventanas consecutivas
+
+            start : int
+                primer año (por defecto el primer año con publicaciones)
+
+            end : int
+                último año (por defecto el último año con publicaciones)
+
+            drop_isolated : bool
+                si se eliminan los autores sin colaboraciones en cada ventana
+
+        Returns
+        -------
+            windows : generator
+                ((primer año, último año), instantánea) para cada ventana (ninguna si no hay publicaciones con año
+                conocido y no se indican start y end)
+        '''
+        first, last = self.years()
+        start = first if start is None else start
+        end = last if end is None else end
+        if start is None or end is None:
+            return
+
+        for year in range(start, end - width + 2, step):
+            yield (year, year + width - 1), self.snapshot(year, year + width - 1, drop_isolated=drop_isolated)
@@ -0,0 +1,365 @@
+import os
+import numpy as np
+from argparse import ArgumentParser
+
+try:
+    from modules.compact import worker_pool, worker_shared
+    from modules.instrumentation import timed
+    from modules.scripts import data_dir
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from compact import worker_pool, worker_shared
+    from instrumentation import timed
+    from scripts import data_dir
+
+# Número de rutas que genera cada tarea (y que se escriben a la vez en el fichero)
+CHUNK_WALKS = 1 << 14
+
+
+def alias_tables(compact):
+    '''
+    Tablas alias (método de Walker) de la lista de coautores de cada autor, con probabilidades proporcionales al número
+    de publicaciones compartidas, almacenadas en la caché del grafo compacto. Se construyen para todos los autores a la vez
+    sin recorrer las listas en Python: las aristas de cada autor con probabilidad escalada q = grado * peso / fuerza menor
+    que 1 (ligeras) se completan con las pesadas (q > 1) en orden, y el reparto se obtiene comparando las sumas
+    acumuladas de lo que falta a las ligeras y de lo que sobra a las pesadas (barrido de Hübschle-Schneider y Sanders)
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+    Returns
+    -------
+        (prob, alias) : (np.ndarray, np.ndarray)
+            para cada arista, probabilidad de quedarse con ella (float32) y posición en la lista de coautores de la
+            alternativa (int32)
+    '''
+    if 'alias_prob' in compact.cache and 'alias_index' in compact.cache:
+        return compact.cache['alias_prob'], compact.cache['alias_index']
+
+    indptr = np.asarray(compact.indptr, dtype=np.int64)
+    degrees = np.diff(indptr)
+    rows = np.repeat(np.arange(compact.n), degrees)
+    local = np.arange(len(rows)) - indptr[rows]
+
+    # Probabilidades escaladas q = grado * peso / fuerza expresadas como grado * peso sobre la fuerza de cada autor. Con
+    # pesos enteros (número de publicaciones compartidas) las sumas acumuladas son exactas, y los empates entre el
+    # déficit y el exceso acumulados (frecuentes con pesos enteros) se resuelven sin errores de redondeo
+    weights = np.asarray(compact.weights)
+    dtype = np.int64 if np.issubdtype(weights.dtype, np.integer) or np.array_equal(weights, np.round(weights)) else np.float64
+    weights = weights.astype(dtype)
+    strength = np.bincount(rows, weights=weights, minlength=compact.n).astype(dtype)
+    units = degrees[rows].astype(dtype) * weights
+    base = strength[rows]
+
+    prob = np.ones(len(rows))
+    alias = local.copy()
+
+    light = np.flatnonzero(units < base)
+    heavy = np.flatnonzero(units >= base)
+    if len(light) > 0 and len(heavy) > 0:
+        # Déficit acumulado antes y después de cada ligera y exceso acumulado hasta cada pesada (incluida). Las sumas de
+        # cada autor se compensan, por lo que los límites entre autores coinciden en ambas secuencias
+        deficit_after = np.cumsum(base[light] - units[light])
+        deficit_before = deficit_after - (base[light] - units[light])
+        excess = np.cumsum(units[heavy] - base[heavy])
+
+        # Pesadas de cada autor (primera y última posición en heavy)
+        heavy_rows = rows[heavy]
+        first_heavy = np.searchsorted(heavy_rows, rows[light], side='left')
+        last_heavy = np.searchsorted(heavy_rows, rows[light], side='right') - 1
+        has_heavy = last_heavy >= first_heavy
+
+        # Cada ligera se completa con la primera pesada cuyo exceso acumulado supera el déficit anterior a ella (si son
+        # iguales, esa pesada ya se ha agotado)
+        target = np.clip(np.searchsorted(excess, deficit_before, side='right'), first_heavy, np.maximum(last_heavy, first_heavy))
+        prob[light] = units[light] / base[light]
+        alias[light[has_heavy]] = local[heavy[target[has_heavy]]]
+        prob[light[~has_heavy]] = 1
+
+        # Una pesada pasa a ser ligera con la primera ligera que agota su exceso (si la agota exactamente, conserva
+        # probabilidad 1) y se completa con la siguiente pesada
+        light_rows = rows[light]
+        last_light = np.searchsorted(light_rows, heavy_rows, side='right') - 1
+        exhausted = np.searchsorted(deficit_after, excess, side='left')
+        next_heavy = np.append(heavy_rows[1:] == heavy_rows[:-1], False)
+        converted = (exhausted <= last_light) & next_heavy
+
+        residual = base[heavy[converted]] + excess[converted] - deficit_after[exhausted[converted]]
+        prob[heavy[converted]] = np.clip(residual / base[heavy[converted]], 0, 1)
+        alias[heavy[converted]] = local[heavy[np.flatnonzero(converted) + 1]]
+
+    compact.cache['alias_prob'] = prob.astype(np.float32)
+    compact.cache['alias_index'] = alias.astype(np.int32)
+    return compact.cache['alias_prob'], compact.cache['alias_index']
+
+
+class WalkEngine:
+    '''
+    Generador de rutas aleatorias ponderadas sobre el grafo compacto que avanza todas las rutas a la vez como vectores de
+    numpy. Cada paso elige un coautor con la tabla alias del autor actual (tiempo constante por ruta); con los sesgos de
+    node2vec (p, q) el candidato se acepta con probabilidad proporcional a su sesgo respecto al autor anterior (muestreo
+    por rechazo), de forma que no hace falta una tabla por cada par de autores consecutivos
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        p : float
+            parámetro de retorno de node2vec (sesgo 1/p para volver al autor anterior)
+
+        q : float
+            parámetro de entrada-salida de node2vec (sesgo 1/q para alejarse del autor anterior)
+    '''
+    def __init__(self, compact, p=1.0, q=1.0):
+        self.indptr = np.asarray(compact.indptr, dtype=np.int64)
+        self.indices = np.asarray(compact.indices)
+        self.degrees = np.diff(self.indptr)
+        self.weights = np.asarray(compact.weights, dtype=np.float64)
+        self.strength = np.bincount(np.repeat(np.arange(compact.n), self.degrees), weights=self.weights, minlength=compact.n)
+        self.prob, self.alias = alias_tables(compact)
+        self.p = p
+        self.q = q
+
+        # Aristas como claves ordenadas (autor * n + coautor) para comprobar la adyacencia con una búsqueda binaria
+        self.keys = None
+        if not self.first_order:
+            self.keys = np.repeat(np.arange(compact.n, dtype=np.int64), self.degrees) * compact.n + self.indices
+
+    @property
+    def first_order(self):
+        return self.p == 1 and self.q == 1
+
+    def sample(self, current, random):
+        '''
+        Un coautor de cada autor de current elegido con probabilidad proporcional al peso de la arista
+        '''
+        starts = self.indptr[current]
+        edges = starts + (random.random_sample(len(current)) * self.degrees[current]).astype(np.int64)
+        alternative = random.random_sample(len(current)) >= self.prob[edges]
+        edges[alternative] = starts[alternative] + self.alias[edges[alternative]]
+        return self.indices[edges]
+
+    def biased_sample(self, previous, current, random):
+        '''
+        Un coautor de cada autor de current con los sesgos de node2vec respecto al autor anterior de la ruta. Si el sesgo
+        de retorno 1/p supera al resto, la arista de vuelta se separa de la envolvente del muestreo por rechazo y se elige
+        directamente con su probabilidad sobrante (plegado de valores atípicos de KnightKing), de forma que la tasa de
+        aceptación no depende de p
+        '''
+        n = len(self.degrees)
+        bound = max(1, 1 / self.q)
+        chosen = np.empty(len(current), dtype=self.indices.dtype)
+        pending = np.arange(len(current))
+
+        # Peso (relativo a la fuerza del autor actual) de la arista de vuelta al autor anterior que excede la envolvente
+        back = np.searchsorted(self.keys, current * n + previous)
+        outlier = self.weights[back] / self.strength[current] * max(1 / self.p - bound, 0)
+
+        while len(pending) > 0:
+            # Retorno elegido en la zona sobrante de la envolvente
+            returned = random.random_sample(len(pending)) * (bound + outlier[pending]) >= bound
+            chosen[pending[returned]] = previous[pending[returned]]
+            pending = pending[~returned]
+
+            candidates = self.sample(current[pending], random)
+            keys = previous[pending] * n + candidates
+            positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            bias = np.where(candidates == previous[pending], min(1 / self.p, bound),
+                            np.where(self.keys[positions] == keys, 1.0, 1 / self.q))
+
+            accepted = random.random_sample(len(pending)) * bound < bias
+            chosen[pending[accepted]] = candidates[accepted]
+            pending = pending[~accepted]
+
+        return chosen
+
+    def walks(self, starts, length, random):
+        '''
+        Rutas aleatorias desde cada autor de starts
+
+        Parameters
+        ----------
+            starts : np.ndarray
+                posición del autor inicial de cada ruta
+
+            length : int
+                número de autores de cada ruta
+
+            random : np.random.RandomState
+                generador de números aleatorios
+
+        Returns
+        -------
+            walks : np.ndarray
+                (rutas, length) posiciones de los autores de cada ruta (int32). Las rutas desde autores sin coautores
+                terminan en el primero, con -1 en el resto
+        '''
+        walks = np.full((len(starts), length), -1, dtype=np.int32)
+        walks[:, 0] = starts
+
+        # En un grafo no dirigido, una ruta que sale de un autor con coautores siempre puede continuar
+        active = np.flatnonzero(self.degrees[starts] > 0)
+        for step in range(1, length):
+            current = walks[active, step - 1].astype(np.int64)
+            if step == 1 or self.first_order:
+                walks[active, step] = self.sample(current, random)
+            else:
+                walks[active, step] = self.biased_sample(walks[active, step - 2].astype(np.int64), current, random)
+
+        return walks
+
+
+def _write_chunk(path, first, starts, length, seed, engine=None):
+    '''
+    Genera las rutas de un bloque y las escribe en sus filas del fichero
+    '''
+    engine = worker_shared(engine)
+    walks = np.load(path, mmap_mode='r+')
+    walks[first:first + len(starts)] = engine.walks(starts, length, np.random.RandomState(seed))
+    walks.flush()
+    del walks
+    return len(starts)
+
+
+@timed('walks.write_walks', items=int)
+def write_walks(compact, path, walks_per_node=10, length=80, p=1.0, q=1.0, n_jobs=1, seed=0, chunk_size=CHUNK_WALKS):
+    '''
+    Genera walks_per_node rutas aleatorias desde cada autor con coautores y las escribe en un fichero .npy de enteros
+    (rutas, length) a medida que se generan, sin mantenerlas en memoria. En cada ronda los autores se recorren en un orden
+    aleatorio distinto. Las rutas se reparten en bloques de chunk_size entre los procesos, cada uno con su propia semilla,
+    por lo que el resultado no depende del número de procesos
+
+    Parameters
+    ----------
+        compact : CompactGraph
+            grafo compacto
+
+        path : str
+            fichero .npy de destino (np.load(path, mmap_mode='r') lo proyecta en memoria)
+
+        walks_per_node : int
+            número de rutas desde cada autor
+
+        length : int
+            número de autores de cada ruta
+
+        p, q : float
+            parámetros de node2vec (1 para rutas ponderadas de primer orden)
+
+        n_jobs : int
+            número de procesos
+
+        seed : int
+            semilla de los generadores
+
+        chunk_size : int
+            número de rutas de cada bloque
+
+    Returns
+    -------
+        total : int
+            número de rutas escritas
+    '''
+    engine = WalkEngine(compact, p=p, q=q)
+    nodes = np.flatnonzero(engine.degrees > 0)
+    random = np.random.RandomState(seed)
+    starts = np.concatenate([random.permutation(nodes) for _ in range(walks_per_node)]) if len(nodes) else nodes
+
+    # Cabecera del fichero con su tamaño definitivo: cada bloque se escribe en sus filas
+    walks = np.lib.format.open_memmap(path, mode='w+', dtype=np.int32, shape=(len(starts), length))
+    del walks
+
+    chunks = [(path, first, starts[first:first + chunk_size], length, seed + 1 + k)
+              for k, first in enumerate(range(0, len(starts), chunk_size))]
+
+    if n_jobs > 1 and len(chunks) > 1:
+        with worker_pool(n_jobs, engine) as executor:
+            return sum(executor.map(_write_chunk, *zip(*chunks)))
+
+    return sum(_write_chunk(*chunk, engine=engine) for chunk in chunks)
+
+
+class WalkCorpus:
+    '''
+    Rutas almacenadas por write_walks como frases de identificadores para un entrenador skip-gram (se puede recorrer
+    varias veces, como necesita gensim.models.Word2Vec)
+
+    Parameters
+    ----------
+        path : str
+            fichero de rutas
+
+        ids : np.ndarray
+            identificador de cada autor (por defecto, su posición)
+
+        chunk_size : int
+            número de rutas que se leen del fichero a la vez
+    '''
+    def __init__(self, path, ids=None, chunk_size=CHUNK_WALKS):
+        self.path = path
+        self.ids = ids
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        walks = np.load(self.path, mmap_mode='r')
+        tokens = np.asarray(self.ids).tolist() if self.ids is not None else [str(i) for i in range(int(walks.max()) + 1)]
+
+        for first in range(0, len(walks), self.chunk_size):
+            for walk in np.asarray(walks[first:first + self.chunk_size]).tolist():
+                yield [tokens[node] for node in walk if node >= 0]
+
+
+@timed('walks.train_embeddings', items=len)
+def train_embeddings(compact, path, dimensions=128, window=10, epochs=1, n_jobs=1, seed=0):
+    '''
+    Representación vectorial de cada autor entrenando skip-gram (gensim) sobre las rutas almacenadas por write_walks
+
+    Returns
+    -------
+        embeddings : np.ndarray
+            (n, dimensions) vector de cada autor en el orden del grafo compacto (ceros para los autores sin coautores)
+    '''
+    try:
+        import gensim
+        from gensim.models import Word2Vec
+    except ImportError:
+        raise ImportError("El entrenamiento de las representaciones requiere gensim (pip install gensim)")
+
+    ids = np.asarray(compact.ids)
+    sizes = {'vector_size': dimensions, 'epochs': epochs} if int(gensim.__version__.split('.')[0]) >= 4 else {'size': dimensions, 'iter': epochs}
+    model = Word2Vec(WalkCorpus(path, ids), window=window, min_count=0, sg=1, workers=n_jobs, seed=seed, **sizes)
+
+    embeddings = np.zeros((len(ids), dimensions), dtype=np.float32)
+    for i, author in enumerate(ids.tolist()):
+        if author in model.wv:
+            embeddings[i] = model.wv[author]
+    return embeddings
+
+
+if __name__ == "__main__":
+    data_path = data_dir()
+
+    arg_parser = ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("--graph", default=data_path + '/colab_graph', help="Directorio del grafo compacto")
+    arg_parser.add_argument("--output", default=data_path + '/walks.npy', help="Fichero de rutas")
+    arg_parser.add_argument("--walks", type=int, default=10, help="Número de rutas desde cada autor")
+    arg_parser.add_argument("--length", type=int, default=80, help="Número de autores de cada ruta")
+    arg_parser.add_argument("-p", type=float, default=1.0, help="Parámetro de retorno de node2vec")
+    arg_parser.add_argument("-q", type=float, default=1.0, help="Parámetro de entrada-salida de node2vec")
+    arg_parser.add_argument("--jobs", type=int, default=1, help="Número de procesos")
+
+    args = arg_parser.parse_args()
+
+    try:
+        from modules.compact import CompactGraph
+    except ImportError:
+        from compact import CompactGraph
+
+    total = write_walks(CompactGraph.load(args.graph), args.output, walks_per_node=args.walks, length=args.length,
+                        p=args.p, q=args.q, n_jobs=args.jobs)
+    print("Se han almacenado {:d} rutas en {:s}".format(total, args.output))
@@ -0,0 +1,357 @@
+import os
+import re
+import zlib
+import argparse
+import numpy as np
+
+try:
+    from modules.instrumentation import timed
+    from modules.external import pub_hash
+except ImportError:
+    # Ejecución directa del módulo (python modules/xxx.py)
+    from instrumentation import timed
+    from external import pub_hash
+
+# Elementos de primer nivel (hijos de <dblp>) del volcado
+TAGS = ('article', 'inproceedings', 'proceedings', 'book', 'incollection', 'phdthesis', 'mastersthesis', 'www', 'person', 'data')
+
+# Etiqueta de apertura de un registro: nombre del elemento y atributo key
+RECORD_RE = re.compile(rb'<(' + b'|'.join(tag.encode() for tag in TAGS) + rb')\s[^>]*?key="([^"]+)"[^>]*>')
+
+# Bytes leídos en cada bloque al recorrer el fichero
+CHUNK_SIZE = 1 << 24
+
+# Bytes (descomprimidos) de cada miembro gzip en el formato comprimido por bloques
+BLOCK_SIZE = 1 << 20
+
+# Bytes que se conservan del final de un bloque sin registros completos (una etiqueta de apertura partida)
+TAIL_SIZE = 4096
+
+
+def _raw_chunks(xml_path, chunk_size=CHUNK_SIZE):
+    '''
+    Recorre el contenido (descomprimido) del fichero por bloques. Si el fichero está comprimido con gzip, se devuelve
+    además la tabla de miembros: (desplazamiento en el fichero comprimido, desplazamiento en el contenido) del inicio de
+    cada miembro gzip, que permite empezar a descomprimir desde cualquiera de ellos
+
+    Returns
+    -------
+        (chunks, blocks) : (generator, list)
+            bloques de bytes y tabla de miembros (vacía si el fichero no está comprimido, completa al agotar el generador)
+    '''
+    blocks = []
+
+    def plain():
+        with open(xml_path, 'rb') as fxml:
+            chunk = fxml.read(chunk_size)
+            while chunk:
+                yield chunk
+                chunk = fxml.read(chunk_size)
+
+    def compressed():
+        raw_offset = compressed_offset = 0
+        with open(xml_path, 'rb') as fxml:
+            decompressor = None
+            data = fxml.read(chunk_size)
+            while data:
+                if decompressor is None:
+                    blocks.append((compressed_offset, raw_offset))
+                    decompressor = zlib.decompressobj(31)
+                chunk = decompressor.decompress(data)
+                raw_offset += len(chunk)
+                if chunk:
+                    yield chunk
+
+                if decompressor.eof:
+                    # Fin del miembro: el resto de los datos leídos pertenece al siguiente
+                    compressed_offset += len(data) - len(decompressor.unused_data)
+                    data = decompressor.unused_data or fxml.read(chunk_size)
+                    decompressor = None
+                else:
+                    compressed_offset += len(data)
+                    data = fxml.read(chunk_size)
+
+    return (compressed() if xml_path.endswith('.gz') else plain()), blocks
+
+
+def _scan(chunks):
+    '''
+    Localiza los registros de primer nivel en el contenido del fichero sin analizar el XML: etiqueta de apertura con su
+    clave y la etiqueta de cierre correspondiente (los registros de dblp no se anidan)
+
+    Returns
+    -------
+        records : generator
+            (clave, índice en TAGS, desplazamiento, longitud) de cada registro, en orden de aparición
+    '''
+    tag_codes = {tag.encode(): code for code, tag in enumerate(TAGS)}
+    buffer = b''
+    base = 0
+
+    for chunk in chunks:
+        buffer += chunk
+        pos = 0
+        while True:
+            match = RECORD_RE.search(buffer, pos)
+            if match is None:
+                pos = max(pos, len(buffer) - TAIL_SIZE)
+                break
+            tag = match.group(1)
+            end = buffer.find(b'</' + tag + b'>', match.end())
+            if end < 0:
+                # Registro incompleto: se continúa con el siguiente bloque
+                pos = match.start()
+                break
+            end += len(tag) + 3
+            yield match.group(2).decode('utf-8'), tag_codes[tag], base + match.start(), end - match.start()
+            pos = end
+
+        buffer = buffer[pos:]
+        base += pos
+
+
+def compress_blocked(src, dst, block_size=BLOCK_SIZE):
+    '''
+    Comprime el fichero XML decodificado como una secuencia de miembros gzip independientes de block_size bytes (como
+    BGZF). El resultado sigue siendo un fichero gzip válido (gzip, zcat o iterparse lo leen completo), pero con el índice
+    se puede acceder a un registro descomprimiendo sólo el miembro que lo contiene
+
+    Parameters
+    ----------
+        src : str
+            fichero XML decodificado (sin comprimir)
+
+        dst : str
+            fichero comprimido por bloques (.gz)
+
+        block_size : int
+            bytes sin comprimir de cada miembro
+
+    Returns
+    -------
+        dst : str
+    '''
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        block = fsrc.read(block_size)
+        while block:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            fdst.write(compressor.compress(block) + compressor.flush())
+            block = fsrc.read(block_size)
+
+    return dst
+
+
+class XmlIndex:
+    '''
+    Índice de los registros de primer nivel del volcado de dblp (decodificado, sin comprimir o comprimido por bloques):
+    para cada registro se almacena el hash de su clave, su tipo y su posición y longitud en bytes, ordenados por hash.
+    Un registro se obtiene con una búsqueda binaria y una única lectura, sin volver a recorrer el fichero con iterparse
+
+    Parameters
+    ----------
+        xml_path : str
+            fichero indexado
+
+        hashes, tags, offsets, lengths : np.ndarray
+            hash de la clave (ver external.pub_hash), índice en TAGS, posición y longitud de cada registro
+
+        blocks : np.ndarray
+            (posición en el fichero comprimido, posición en el contenido) de cada miembro gzip (None si no está comprimido)
+    '''
+    def __init__(self, xml_path, hashes, tags, offsets, lengths, blocks=None):
+        self.xml_path = xml_path
+        self.hashes = hashes
+        self.tags = tags
+        self.offsets = offsets
+        self.lengths = lengths
+        self.blocks = blocks
+
+    @classmethod
+    @timed('xmlindex.build', items=len)
+    def build(cls, xml_path, chunk_size=CHUNK_SIZE):
+        '''
+        Construye el índice con un único recorrido secuencial del fichero
+
+        Parameters
+        ----------
+            xml_path : str
+                fichero XML decodificado, sin comprimir o comprimido (.gz). Si está comprimido en un único miembro (como
+                el volcado original), cada consulta tiene que descomprimir desde el principio: ver compress_blocked
+
+            chunk_size : int
+                bytes leídos en cada bloque
+
+        Returns
+        -------
+            index : XmlIndex
+        '''
+        chunks, blocks = _raw_chunks(xml_path, chunk_size=chunk_size)
+
+        hashes, tags, offsets, lengths = [], [], [], []
+        for key, tag, offset, length in _scan(chunks):
+            hashes.append(pub_hash(key))
+            tags.append(tag)
+            offsets.append(offset)
+            lengths.append(length)
+
+        hashes = np.array(hashes, dtype=np.uint64)
+        order = np.argsort(hashes, kind='stable')
+
+        return cls(xml_path, hashes[order], np.array(tags, dtype=np.uint8)[order], np.array(offsets, dtype=np.int64)[order],
+                   np.array(lengths, dtype=np.int64)[order], np.array(blocks, dtype=np.int64).reshape(-1, 2) if blocks else None)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def save(self, path):
+        '''
+        Almacena el índice en un fichero .npz
+        '''
+        arrays = {'hashes': self.hashes, 'tags': self.tags, 'offsets': self.offsets, 'lengths': self.lengths}
+        if self.blocks is not None:
+            arrays['blocks'] = self.blocks
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path, xml_path):
+        '''
+        Carga el índice almacenado con save para el fichero xml_path
+        '''
+        with np.load(path) as arrays:
+            return cls(xml_path, arrays['hashes'], arrays['tags'], arrays['offsets'], arrays['lengths'],
+                       arrays['blocks'] if 'blocks' in arrays.files else None)
+
+    def counts(self):
+        '''
+        Número de registros de cada tipo
+
+        Returns
+        -------
+            counts : dict
+                {elemento: número de registros}
+        '''
+        return {tag: int(n) for tag, n in zip(TAGS, np.bincount(self.tags, minlength=len(TAGS))) if n > 0}
+
+    def _read(self, offset, length):
+        '''
+        Lee length bytes del contenido a partir de offset, descomprimiendo sólo desde el miembro gzip que lo contiene
+        '''
+        if self.blocks is None:
+            with open(self.xml_path, 'rb') as fxml:
+                fxml.seek(offset)
+                return fxml.read(length)
+
+        block = np.searchsorted(self.blocks[:, 1], offset, side='right') - 1
+        compressed_offset, raw_offset = self.blocks[block].tolist()
+        skip = offset - raw_offset
+        parts, size = [], 0
+
+        with open(self.xml_path, 'rb') as fxml:
+            fxml.seek(compressed_offset)
+            decompressor = zlib.decompressobj(31)
+            pending = b''
+            while size < skip + length:
+                # El registro continúa en el siguiente miembro
+                if decompressor.eof:
+                    pending = decompressor.unused_data
+                    decompressor = zlib.decompressobj(31)
+                data = pending or fxml.read(BLOCK_SIZE)
+                pending = b''
+                if not data:
+                    break
+                chunk = decompressor.decompress(data)
+                parts.append(chunk)
+                size += len(chunk)
+
+        return b''.join(parts)[skip:skip + length]
+
+    def find(self, key):
+        '''
+        Posición del registro con la clave indicada
+
+        Returns
+        -------
+            (tag, offset, length) : (str, int, int)
+                tipo del registro, posición y longitud en bytes (None si no está en el índice)
+        '''
+        h = np.uint64(pub_hash(key))
+        lo, hi = np.searchsorted(self.hashes, h, side='left'), np.searchsorted(self.hashes, h, side='right')
+        if hi - lo == 1:
+            return TAGS[self.tags[lo]], int(self.offsets[lo]), int(self.lengths[lo])
+
+        # Colisión del hash (muy improbable): se comprueba la clave de cada candidato
+        attribute = 'key="{:s}"'.format(key).encode('utf-8')
+        for i in range(lo, hi):
+            raw = self._read(int(self.offsets[i]), int(self.lengths[i]))
+            if attribute in raw[:raw.find(b'>') + 1]:
+                return TAGS[self.tags[i]], int(self.offsets[i]), int(self.lengths[i])
+
+        return None
+
+    def raw(self, key):
+        '''
+        Contenido en bytes del registro con la clave indicada (None si no está en el índice)
+        '''
+        found = self.find(key)
+        return self._read(found[1], found[2]) if found is not None else None
+
+    def get(self, key):
+        '''
+        Registro con la clave indicada analizado con lxml (None si no está en el índice)
+
+        Returns
+        -------
+            element : lxml.etree._Element
+        '''
+        from lxml import etree
+
+        raw = self.raw(key)
+        return etree.fromstring(raw, parser=etree.XMLParser(recover=True)) if raw is not None else None
+
+
+def index_path(xml_path):
+    '''
+    Fichero del índice asociado a un fichero XML
+    '''
+    return xml_path + '.idx.npz'
+
+
+def load_index(xml_path, build=True):
+    '''
+    Carga el índice del fichero XML o, si no existe (o es anterior al fichero) y build es True, lo construye y almacena
+
+    Returns
+    -------
+        index : XmlIndex
+    '''
+    path = index_path(xml_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(xml_path):
+        return XmlIndex.load(path, xml_path)
+    if not build:
+        return None
+
+    index = XmlIndex.build(xml_path)
+    index.save(path)
+    return index
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    # Obtención de los argumentos
+    arg_parser.add_argument("xml_path", help="Fichero XML decodificado (sin comprimir o comprimido por bloques)", type=str)
+    arg_parser.add_argument("--compress", default=None, help="Comprimir por bloques el fichero en la ruta indicada e indexar el resultado")
+    arg_parser.add_argument("--key", nargs="*", default=[], help="Claves de los registros a mostrar")
+
+    args = arg_parser.parse_args()
+
+    xml_path = compress_blocked(args.xml_path, args.compress) if args.compress is not None else args.xml_path
+    index = load_index(xml_path)
+    print("{:d} registros indexados: {}".format(len(index), index.counts()))
+
+    for key in args.key:
+        raw = index.raw(key)
+        print(raw.decode('utf-8') if raw is not None else "No se ha encontrado el registro {:s}".format(key))
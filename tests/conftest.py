@@ -0,0 +1,7 @@
+import os
+import sys
+
+root_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
@@ -0,0 +1,35 @@
+from modules.crawler import Crawler
+
+# Grafo de coautoría simulado: {autor: {coautor: publicaciones compartidas}}. El camino con más publicaciones
+# compartidas hasta X (S-A-B-X) es más largo que el camino S-C-X
+GRAPH = {
+    'S': {'A': 10, 'C': 1},
+    'A': {'S': 10, 'B': 10},
+    'B': {'A': 10, 'X': 10},
+    'C': {'S': 1, 'X': 1},
+    'X': {'B': 10, 'C': 1, 'Z': 1},
+    'Z': {'X': 1},
+}
+
+
+def mocked_crawler(monkeypatch, graph=GRAPH):
+    crawler = Crawler()
+    monkeypatch.setattr(crawler, 'crawl', lambda author, coauthors=False: (
+        author, {'name': author, 'affiliation': None, 'pubs': [], 'coauthors': dict(graph[author])}))
+    return crawler
+
+
+def test_snowball_distances(monkeypatch):
+    crawled = {author: hop for author, _, hop in mocked_crawler(monkeypatch).snowball(['S'], hops=3)}
+    assert crawled == {'S': 0, 'A': 1, 'C': 1, 'B': 2, 'X': 2, 'Z': 3}
+
+
+def test_snowball_hops_limit(monkeypatch):
+    crawled = {author: hop for author, _, hop in mocked_crawler(monkeypatch).snowball(['S'], hops=1)}
+    assert crawled == {'S': 0, 'A': 1, 'C': 1}
+
+
+def test_snowball_budget_prefers_shared(monkeypatch):
+    graph = {'S': {'A': 1, 'C': 5}, 'A': {'S': 1}, 'C': {'S': 5}}
+    crawled = [author for author, _, _ in mocked_crawler(monkeypatch, graph).snowball(['S'], hops=2, budget=2)]
+    assert crawled == ['S', 'C']
@@ -0,0 +1,57 @@
+import numpy as np
+
+from modules.compact import CompactGraph
+from modules.walks import alias_tables, WalkEngine
+
+
+def random_graph(n, m, max_weight, seed):
+    '''
+    Grafo compacto aleatorio con pesos pequeños (muchos empates en las sumas acumuladas de las tablas alias)
+    '''
+    random = np.random.RandomState(seed)
+    graph = {'homepages/{:d}'.format(i): {'name': str(i), 'affiliation': None, 'pubs': {}} for i in range(n)}
+    for u, v in random.randint(0, n, size=(m, 2)).tolist():
+        if u == v:
+            continue
+        weight = int(random.randint(1, max_weight + 1))
+        graph['homepages/{:d}'.format(u)]['pubs']['homepages/{:d}'.format(v)] = {'weight': weight}
+        graph['homepages/{:d}'.format(v)]['pubs']['homepages/{:d}'.format(u)] = {'weight': weight}
+    return CompactGraph.from_graph(graph)
+
+
+def implied_error(compact):
+    '''
+    Mayor diferencia entre la distribución de cada lista de coautores reconstruida a partir de (prob, alias) y los pesos
+    normalizados
+    '''
+    prob, alias = alias_tables(compact)
+    indptr = np.asarray(compact.indptr)
+    degrees = np.diff(indptr)
+    rows = np.repeat(np.arange(compact.n), degrees)
+    weights = np.asarray(compact.weights, dtype=np.float64)
+    strength = np.bincount(rows, weights=weights, minlength=compact.n)
+
+    implied = prob.astype(np.float64) / degrees[rows]
+    np.add.at(implied, indptr[rows] + alias, (1 - prob.astype(np.float64)) / degrees[rows])
+    return np.abs(implied - weights / strength[rows]).max()
+
+
+def test_alias_tables_integer_weights():
+    for seed in range(5):
+        assert implied_error(random_graph(3000, 9000, 3, seed)) < 1e-6
+
+
+def test_alias_tables_float_weights():
+    compact = random_graph(2000, 6000, 5, 0)
+    compact.weights = np.random.RandomState(0).rand(len(compact.weights)) * 5 + 0.1
+    assert implied_error(compact) < 1e-6
+
+
+def test_walks_follow_edges():
+    compact = random_graph(500, 2000, 3, 1)
+    engine = WalkEngine(compact, p=0.5, q=2)
+    walks = engine.walks(np.arange(compact.n), 10, np.random.RandomState(0))
+    keys = set((np.repeat(np.arange(compact.n), np.diff(compact.indptr)) * compact.n + compact.indices).tolist())
+    for walk in walks:
+        walk = walk[walk >= 0]
+        assert all(u * compact.n + v in keys for u, v in zip(walk[:-1].tolist(), walk[1:].tolist()))